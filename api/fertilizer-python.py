@@ -0,0 +1,147 @@
+"""
+Vercel Python Serverless Function for batch fertilizer recommendations.
+
+POST a JSON array of samples (or {"variety": ..., "samples": [...]}) where
+each sample has any of N, P, K, S, Zn, B and a variety name or index:
+
+    [{"N": 0.12, "P": 8.5, "variety": "Aman Rice"}, {"K": 0.2, "variety": 1}]
+
+The whole block is computed in one vectorized pass. The response is
+compact: for each sample, one entry per nutrient in `nutrients` order,
+either null (not tested) or [stvi_class, F_r, product_amount] (class and
+amounts are null when the value is outside every STVI range).
+`table_version` is the version of the recommendation tables used; the
+tables are reloaded when fertilizer_tables.json changes.
+"""
+
+from http.server import BaseHTTPRequestHandler
+import json
+import os
+import sys
+
+import numpy as np
+
+# The shared fertilizer modules live at the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fertilizer_batch import fertilizer_batch  # noqa: E402
+from fertilizer_core import TABLES  # noqa: E402
+from fertilizer_index import GAP_POLICIES  # noqa: E402
+from fertilizer_tables import TableStore  # noqa: E402
+
+MAX_SAMPLES = 100_000
+DECIMALS = 4
+
+# Shared by every request this instance serves
+STORE = TableStore(tables=TABLES)
+
+
+def _parse_variety(value, varieties):
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not 0 <= value < len(varieties):
+            raise ValueError(f"Variety index {value} out of range.")
+        return varieties[value]
+    if value not in varieties:
+        raise ValueError(f"Invalid variety selection: {value!r}.")
+    return value
+
+
+def _parse_value(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid soil test value: {value!r}.") from None
+
+
+def compute(payload, tables=None):
+    """Validate the request payload and return the response dict."""
+    # One version for the whole request, even if a reload happens meanwhile
+    tables = STORE.current() if tables is None else tables
+    nutrients = tables.nutrients
+    if isinstance(payload, dict):
+        samples = payload.get("samples")
+        default_variety = payload.get("variety")
+        gap_policy = payload.get("gap_policy")
+    else:
+        samples, default_variety, gap_policy = payload, None, None
+
+    if not isinstance(samples, list) or not samples:
+        raise ValueError("Expected a non-empty JSON array of samples.")
+    if len(samples) > MAX_SAMPLES:
+        raise ValueError(f"At most {MAX_SAMPLES} samples per request.")
+    if gap_policy is not None and gap_policy not in GAP_POLICIES:
+        raise ValueError(f"gap_policy must be one of {', '.join(GAP_POLICIES)}.")
+    if not all(isinstance(sample, dict) for sample in samples):
+        raise ValueError("Each sample must be a JSON object.")
+
+    varieties = []
+    for sample in samples:
+        variety = sample.get("variety", default_variety)
+        if variety is None:
+            raise ValueError("Each sample needs a variety (or give a top-level 'variety').")
+        varieties.append(_parse_variety(variety, tables.varieties))
+
+    columns = {
+        nutrient: np.array([_parse_value(sample.get(nutrient)) for sample in samples], dtype=np.float64)
+        for nutrient in nutrients
+    }
+    results = fertilizer_batch(columns, varieties, gap_policy, tables)
+
+    per_nutrient = []
+    for nutrient in nutrients:
+        tested = ~np.isnan(columns[nutrient])
+        result = results[nutrient]
+        classes = result["stvi_class"].tolist()
+        Fr = np.round(result["F_r"], DECIMALS).tolist()
+        amount = np.round(result["product_amount"], DECIMALS).tolist()
+        per_nutrient.append([
+            None if not is_tested
+            else [None, None, None] if cls < 0
+            else [tables.classes[cls], fr, amt]
+            for is_tested, cls, fr, amt in zip(tested.tolist(), classes, Fr, amount)
+        ])
+
+    return {
+        "table_version": tables.version,
+        "nutrients": list(nutrients),
+        "products": [tables[nutrient].product for nutrient in nutrients],
+        "fields": ["stvi_class", "F_r", "product_amount"],
+        "results": [list(row) for row in zip(*per_nutrient)],
+    }
+
+
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(body, separators=(',', ':')).encode('utf-8'))
+
+    def do_POST(self):
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
+
+            try:
+                payload = json.loads(body.decode('utf-8'))
+                result = compute(payload)
+            except (ValueError, UnicodeDecodeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+
+            self._send_json(200, result)
+
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
@@ -1,10 +1,10 @@
 import { NextResponse } from "next/server";
-import { spawn } from "child_process";
 import { tmpdir } from "os";
 import path from "path";
 import { randomUUID } from "crypto";
 import { writeFile, unlink } from "fs/promises";
 import { existsSync } from "fs";
+import { predictDisease } from "@/lib/diseaseServer";
 
 export const runtime = "nodejs";
 
@@ -28,14 +28,6 @@ function canRunPythonLocally(): boolean {
   }
 }
 
-function getPythonPath(): string {
-  const venvPython = path.join(process.cwd(), ".venv", "bin", "python");
-  if (existsSync(venvPython)) {
-    return venvPython;
-  }
-  return "python3";
-}
-
 // Call the Python serverless function on Vercel
 async function callPythonServerless(imageBase64: string, model: string, requestUrl: string): Promise<unknown> {
   // Build the URL for the Python serverless function
@@ -61,41 +53,6 @@ async function callPythonServerless(imageBase64: string, model: string, requestU
   return response.json();
 }
 
-// Run locally with Python spawn
-async function runLocalPython(tempFilePath: string, model: string): Promise<unknown> {
-  const scriptPath = path.join(process.cwd(), "scripts", "predict_disease.py");
-  const pythonPath = getPythonPath();
-
-  const result = await new Promise<string>((resolve, reject) => {
-    const proc = spawn(pythonPath, [scriptPath, model, tempFilePath], {
-      cwd: process.cwd(),
-    });
-
-    let stdout = "";
-    let stderr = "";
-
-    proc.stdout.on("data", (data) => {
-      stdout += data.toString();
-    });
-
-    proc.stderr.on("data", (data) => {
-      stderr += data.toString();
-    });
-
-    proc.on("close", (code) => {
-      if (code === 0) {
-        resolve(stdout);
-      } else {
-        reject(new Error(stderr || `Process exited with code ${code}`));
-      }
-    });
-
-    proc.on("error", reject);
-  });
-
-  return JSON.parse(result.trim());
-}
-
 export async function POST(request: Request) {
   let tempFilePath: string | null = null;
   
@@ -123,11 +80,16 @@ export async function POST(request: Request) {
       const base64Image = `data:${image.type};base64,${buffer.toString("base64")}`;
       data = await callPythonServerless(base64Image, model, request.url);
     } else {
-      // Local development with Python available: use spawn
+      // Local Python: one warm predict_disease.py process loads the models
+      // once (see lib/diseaseServer.ts)
       const extension = image.name.split(".").pop() ?? "jpg";
       tempFilePath = path.join(tmpdir(), `${randomUUID()}.${extension}`);
       await writeFile(tempFilePath, buffer);
-      data = await runLocalPython(tempFilePath, model);
+      const result = await predictDisease(model, tempFilePath);
+      if (result.error) {
+        throw new Error(result.error);
+      }
+      data = result;
     }
 
     return NextResponse.json(data);
@@ -0,0 +1,183 @@
+"""
+Disease models on ONNX Runtime (fp32 and int8) against their original
+frameworks: load time, per-image latency, peak memory and top-1 agreement
+on the images in public/samples.
+
+Each (model, runtime) pair runs in its own fresh process, so its peak RSS
+is its own. Agreement is the share of images that get the same label as
+the framework run, plus the largest confidence difference. Export the
+models first (python disease_onnx.py export).
+
+    python benchmarks/disease_onnx_bench.py --output disease_onnx_bench.json --markdown report.md
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+import disease_onnx  # noqa: E402
+from perf_utils import peak_rss_mb  # noqa: E402
+from predict_disease import BACKEND_PACKAGES, DiseaseWorker, has_packages  # noqa: E402
+
+SAMPLES_DIR = os.path.join(PROJECT_ROOT, "public", "samples")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+RUNTIMES = ("framework", "onnx", "onnx-int8")
+PERCENTILES = (50, 90, 99)
+REPEATS = 20
+
+
+def sample_images(directory=SAMPLES_DIR):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def available(backend, runtime):
+    if not has_packages(backend, runtime):
+        return False
+    return runtime == "framework" or disease_onnx.has_onnx(backend, runtime == "onnx-int8")
+
+
+def _bench(backend, runtime, paths, repeats):
+    """Runs in a fresh process: load time, latencies, predictions and peak RSS."""
+    from PIL import Image
+
+    images = []
+    for path in paths:
+        with Image.open(path) as image:
+            images.append(image.convert("RGB"))
+    worker = DiseaseWorker(max_batch=1, runtime=runtime)
+    start = time.perf_counter()
+    worker.warm_up(backend)  # load + first forward pass
+    load_s = time.perf_counter() - start
+
+    predictions = [worker.predict(backend, image) for image in images]
+    latencies = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            worker.predict(backend, image)
+            latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies)
+    return {
+        "load_s": load_s,
+        "latency_ms": {f"p{p}": float(np.percentile(latencies, p) * 1e3) for p in PERCENTILES},
+        "images_per_sec": len(latencies) / latencies.sum(),
+        "peak_rss_mb": peak_rss_mb(),
+        "predictions": [{"label": p["label"], "confidence": p["confidence"]} for p in predictions],
+    }
+
+
+def _in_fresh_process(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def agreement(predictions, reference):
+    same = [p["label"] == r["label"] for p, r in zip(predictions, reference)]
+    return {
+        "top1_agreement": sum(same) / len(same),
+        "max_confidence_diff": max(abs(p["confidence"] - r["confidence"]) for p, r in zip(predictions, reference)),
+    }
+
+
+def run_benchmarks(paths, repeats=REPEATS):
+    results = {}
+    for backend in BACKEND_PACKAGES:
+        reference = None
+        for runtime in RUNTIMES:
+            name = f"{backend} {runtime}"
+            if not available(backend, runtime):
+                results[name] = {"skipped": "required packages or exported model are missing"}
+                continue
+            result = _in_fresh_process(_bench, backend, runtime, paths, repeats)
+            if runtime == "framework":
+                reference = result["predictions"]
+            elif reference is not None:
+                result.update(agreement(result["predictions"], reference))
+            results[name] = result
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def markdown(report):
+    """The results as a Markdown table."""
+    lines = [
+        f"Disease models: ONNX Runtime vs frameworks ({report['images']} images, "
+        f"commit {report['git_commit']}, {report['platform']})",
+        "",
+        "| model | runtime | load s | p50 ms | p99 ms | images/s | peak RSS MB | top-1 agreement | max conf. diff |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for name, result in report["results"].items():
+        backend, runtime = name.split(" ", 1)
+        if "skipped" in result:
+            lines.append(f"| {backend} | {runtime} | skipped: {result['skipped']} | | | | | | |")
+            continue
+        agree = result.get("top1_agreement")
+        diff = result.get("max_confidence_diff")
+        lines.append(
+            f"| {backend} | {runtime} | {result['load_s']:.2f} | {result['latency_ms']['p50']:.1f} | "
+            f"{result['latency_ms']['p99']:.1f} | {result['images_per_sec']:.1f} | "
+            f"{result['peak_rss_mb']:.0f} | "
+            f"{'reference' if runtime == 'framework' else (f'{agree:.0%}' if agree is not None else 'n/a')} | "
+            f"{f'{diff:.4f}' if diff is not None else ''} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the disease models on ONNX Runtime with their frameworks.")
+    parser.add_argument("--images", default=SAMPLES_DIR, help="directory of leaf images")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="timed passes over the images")
+    parser.add_argument("--output", default="disease_onnx_bench.json", help="JSON file to write")
+    parser.add_argument("--markdown", help="also write the report as a Markdown table")
+    args = parser.parse_args(argv)
+
+    paths = sample_images(args.images)
+    if not paths:
+        raise SystemExit(f"No images in {args.images}")
+    report = {
+        "benchmark": "disease_onnx",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "images": len(paths),
+        "results": run_benchmarks(paths, args.repeats),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    table = markdown(report)
+    if args.markdown:
+        with open(args.markdown, "w") as f:
+            f.write(table)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark for the fertilizer recommendation path.
+
+Generates a fixed synthetic set of soil samples covering every STVI class
+of every nutrient (interior, boundary and gap values, plus out-of-range
+ones) for every entry in VARIETY_OPTIONS. It times the scalar functions
+(classify_soil_test, calculate_F_r, fertilizer_calculator,
+recommend_fertilizer) and the batch path (fertilizer_batch) at several
+batch sizes, then writes samples/sec and per-call latency percentiles
+to a JSON file.
+
+    python benchmarks/fertilizer_bench.py --output fertilizer_bench.json
+    python benchmarks/fertilizer_bench.py --compare previous.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fertilizer_core import (  # noqa: E402
+    STVI_THRESHOLDS,
+    calculate_F_r,
+    classify_soil_test,
+    fertilizer_calculator,
+    recommend_fertilizer,
+)
+from fertilizer_batch import NUTRIENTS, VARIETIES, fertilizer_batch  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+BATCH_SIZES = (1, 100, 10_000, 100_000)
+
+
+def special_values(nutrient):
+    """Boundary, gap and out-of-range values for one nutrient."""
+    bounds = list(STVI_THRESHOLDS[nutrient].values())
+    values = [-1.0, bounds[-1][1] * 2]
+    for lo, hi in bounds:
+        values += [lo, hi, (lo + hi) / 2]
+    for (_, hi), (lo, _) in zip(bounds, bounds[1:]):
+        if lo > hi:
+            values.append((hi + lo) / 2)  # inside the gap
+    return np.array(values)
+
+
+def make_samples(n, seed=0):
+    """
+    n synthetic samples: mostly uniform within a random STVI class, with
+    about 10% boundary/gap/out-of-range values and 5% untested (NaN) values.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for nutrient in NUTRIENTS:
+        bounds = np.array(list(STVI_THRESHOLDS[nutrient].values()))
+        # Cap the open-ended top class so "Very High" values stay realistic
+        bounds[-1, 1] = bounds[-1, 0] * 2
+        cls = rng.integers(0, len(bounds), n)
+        values = rng.uniform(bounds[cls, 0], bounds[cls, 1])
+
+        special = special_values(nutrient)
+        pick = rng.random(n) < 0.10
+        values[pick] = rng.choice(special, pick.sum())
+        values[rng.random(n) < 0.05] = np.nan
+        columns[nutrient] = values
+    columns["variety"] = rng.integers(0, len(VARIETIES), n)
+    return columns
+
+
+def _latencies(fn, calls):
+    """Per-call wall time in seconds for each argument tuple in `calls`."""
+    times = np.empty(len(calls))
+    clock = time.perf_counter_ns
+    for i, args in enumerate(calls):
+        start = clock()
+        fn(*args)
+        times[i] = clock() - start
+    return times / 1e9
+
+
+def _summary(latencies, samples_per_call=1):
+    total = latencies.sum()
+    return {
+        "calls": int(len(latencies)),
+        "samples_per_call": samples_per_call,
+        "samples_per_sec": samples_per_call * len(latencies) / total if total > 0 else None,
+        "latency_us": {
+            f"p{p}": float(np.percentile(latencies, p) * 1e6) for p in PERCENTILES
+        },
+        "mean_us": float(latencies.mean() * 1e6),
+    }
+
+
+def _scalar_args(samples, n):
+    rows = []
+    for i in range(n):
+        values = [
+            None if np.isnan(samples[nutrient][i]) else float(samples[nutrient][i])
+            for nutrient in NUTRIENTS
+        ]
+        rows.append(values + [VARIETIES[samples["variety"][i]]])
+    return rows
+
+
+def run_benchmarks(n_scalar=20_000, batch_sizes=BATCH_SIZES, seed=0):
+    samples = make_samples(max(n_scalar, max(batch_sizes)), seed)
+    rows = _scalar_args(samples, n_scalar)
+    results = {}
+
+    classify_calls = [
+        (nutrient, value)
+        for row in rows
+        for nutrient, value in zip(NUTRIENTS, row)
+        if value is not None
+    ]
+    results["classify_soil_test"] = _summary(_latencies(classify_soil_test, classify_calls))
+
+    F_r_calls = [(48, 12, 0.09, value % 0.09, 0.0) for _, value in classify_calls]
+    results["calculate_F_r"] = _summary(_latencies(calculate_F_r, F_r_calls))
+
+    results["fertilizer_calculator"] = _summary(_latencies(fertilizer_calculator, rows))
+    results["recommend_fertilizer"] = _summary(_latencies(recommend_fertilizer, rows))
+
+    for size in batch_sizes:
+        repeats = max(3, min(1000, 200_000 // size))
+        chunks = []
+        for r in range(repeats):
+            start = (r * size) % (len(samples["variety"]) - size + 1)
+            chunks.append(({k: v[start:start + size] for k, v in samples.items()},))
+        fertilizer_batch(*chunks[0])  # warm-up
+        results[f"fertilizer_batch[{size}]"] = _summary(_latencies(fertilizer_batch, chunks), size)
+
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print samples/sec change per benchmark against an earlier run."""
+    print(f"{'benchmark':32} {'before':>14} {'after':>14} {'change':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name, {}).get("samples_per_sec")
+        after = result["samples_per_sec"]
+        if before and after:
+            print(f"{name:32} {before:14,.0f} {after:14,.0f} {after / before - 1:+8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fertilizer recommendation path.")
+    parser.add_argument("--output", default="fertilizer_bench.json", help="JSON file to write")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--scalar-samples", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = {
+        "benchmark": "fertilizer",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": run_benchmarks(args.scalar_samples, seed=args.seed),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in report["results"].items():
+        latency = result["latency_us"]
+        print(
+            f"{name:32} {result['samples_per_sec']:14,.0f} samples/s   "
+            f"p50 {latency['p50']:10.1f} us   p99 {latency['p99']:10.1f} us"
+        )
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Startup time of the scripts/ entry points that the Next.js routes spawn.
+
+Every scenario runs a script in a fresh interpreter, as the routes do,
+several times and records the median wall time. One extra run under
+`python -X importtime` records the cumulative import time of each
+top-level module. The report is written as JSON; the checked-in
+benchmarks/startup_baseline.json is the reference run.
+
+Budgets apply to a script's own startup cost: its median minus the
+median of a bare `python -c pass` measured in the same run. That keeps
+them meaningful on slower or faster machines. --check exits with status 1
+if any scenario is over budget.
+
+    python benchmarks/startup_bench.py --check
+    python benchmarks/startup_bench.py --output startup.json --compare benchmarks/startup_baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+YIELD_SCRIPT = os.path.join(PROJECT_ROOT, "scripts", "predict_yield.py")
+DISEASE_SCRIPT = os.path.join(PROJECT_ROOT, "scripts", "predict_disease.py")
+YIELD_REQUEST = json.dumps({
+    "Soil_Type": "Loam", "Crop": "Rice", "Rainfall_mm": 850, "Temperature_Celsius": 27.5,
+    "Fertilizer_Used": True, "Irrigation_Used": False,
+})
+BARE = "python -c pass"
+TOP_IMPORTS = 10
+
+
+def _has(*modules):
+    return all(find_spec(name) is not None for name in modules)
+
+
+# (name, interpreter arguments, stdin, budget in ms over a bare start or
+# None to only report, whether it can run here)
+SCENARIOS = [
+    (BARE, ["-c", "pass"], "", None, True),
+    ("predict_yield: empty input", [YIELD_SCRIPT], "", 75, True),
+    ("predict_yield: numpy backend", [YIELD_SCRIPT, "--backend", "numpy"], YIELD_REQUEST, 300,
+     _has("numpy") and os.path.exists(os.path.join(PROJECT_ROOT, "yield_model.npz"))),
+    ("predict_yield: catboost backend", [YIELD_SCRIPT, "--backend", "catboost"], YIELD_REQUEST, None,
+     _has("numpy", "catboost")),
+    # Module import only: a real run would load TensorFlow or torch models
+    ("predict_disease: import", ["-c", f"import runpy; runpy.run_path({DISEASE_SCRIPT!r})"], "", 50, True),
+]
+
+
+def _run(args, stdin, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable] + args, input=stdin, capture_output=True, text=True, cwd=PROJECT_ROOT, env=env,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return elapsed, result.stderr
+
+
+def import_times(args, stdin):
+    """(total ms, {module: cumulative ms}) for top-level imports, from -X importtime."""
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    _, stderr = _run(args, stdin, env)
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # indented = imported by another module
+            modules[name.strip()] = int(cumulative) / 1000
+    top = dict(sorted(modules.items(), key=lambda item: -item[1])[:TOP_IMPORTS])
+    return sum(modules.values()), top
+
+
+def run_benchmarks(runs=10):
+    results = {}
+    for name, args, stdin, budget, available in SCENARIOS:
+        if not available:
+            results[name] = {"skipped": "required packages or files are missing"}
+            continue
+        _run(args, stdin)  # warm the page cache
+        times = [_run(args, stdin)[0] * 1000 for _ in range(runs)]
+        total, top = import_times(args, stdin)
+        results[name] = {
+            "runs": runs,
+            "median_ms": statistics.median(times),
+            "min_ms": min(times),
+            "budget_ms": budget,
+            "import_ms": total,
+            "top_imports_ms": top,
+        }
+
+    bare = results[BARE]["median_ms"]
+    for result in results.values():
+        if "median_ms" in result:
+            result["over_bare_ms"] = result["median_ms"] - bare
+    return results
+
+
+def over_budget(results):
+    """Names of scenarios whose startup cost is over budget."""
+    return [
+        name for name, result in results.items()
+        if result.get("budget_ms") is not None and result["over_bare_ms"] > result["budget_ms"]
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print the change in median startup time per scenario against an earlier run."""
+    print(f"{'scenario':36} {'before':>10} {'after':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name, {}).get("median_ms")
+        after = result.get("median_ms")
+        if before and after:
+            print(f"{name:36} {before:8.0f}ms {after:8.0f}ms {after / before - 1:+8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark startup time of the scripts/ entry points.")
+    parser.add_argument("--output", default="startup_bench.json", help="JSON file to write")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per scenario")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if a budget is exceeded")
+    args = parser.parse_args(argv)
+
+    report = {
+        "benchmark": "startup",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": run_benchmarks(args.runs),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in report["results"].items():
+        if "skipped" in result:
+            print(f"{name:36} skipped: {result['skipped']}")
+            continue
+        budget = result["budget_ms"]
+        budget_text = f"budget {budget:4d} ms" if budget is not None else "no budget"
+        print(
+            f"{name:36} median {result['median_ms']:7.0f} ms   "
+            f"+{result['over_bare_ms']:6.0f} ms over bare   {budget_text}   "
+            f"imports {result['import_ms']:6.0f} ms"
+        )
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    failed = over_budget(report["results"])
+    if failed:
+        print(f"Over budget: {', '.join(failed)}", file=sys.stderr)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
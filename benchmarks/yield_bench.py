@@ -0,0 +1,379 @@
+"""
+Benchmark and accuracy check for the yield prediction paths.
+
+Each path is benchmarked in its own fresh process, so its peak RSS is its
+own:
+    catboost          CatBoostRegressor on FeatureEncoder arrays
+    numpy             the NumPy export, yield_model.npz
+    service[...]      scripts/predict_yield.py's predict / predict_batch
+                      with either backend (request dicts to responses)
+    ...+explain       the same with "explain": true on every request
+It times the single-request path (service paths only) and batches of 1 to
+100k rows, reporting latency percentiles and rows/sec, then launches the
+one-shot script repeatedly to time cold starts.
+
+Accuracy: every path scores one fixed synthetic dataset (random inputs,
+inputs exactly on the model's borders and unseen categories) and is
+compared with CatBoostRegressor.predict on a DataFrame of the same rows.
+The service paths answer with two decimals, hence their tolerance.
+
+Explain budget: each +explain path's mean latency, per request or row,
+must stay within EXPLAIN_BUDGET times its plain service path's for
+single requests and batches of up to 100.
+
+--check exits with status 1 if a path is off by more than its tolerance
+or over the explain budget.
+
+    python benchmarks/yield_bench.py --output yield_bench.json
+    python benchmarks/yield_bench.py --check --compare previous.json
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+import yield_model  # noqa: E402
+from perf_utils import peak_rss_mb  # noqa: E402
+
+YIELD_SCRIPT = os.path.join(PROJECT_ROOT, "scripts", "predict_yield.py")
+PERCENTILES = (50, 90, 99)
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+SINGLE_CALLS = 2_000
+COLD_RUNS = 10
+ACCURACY_ROWS = 20_000
+
+HAS_CATBOOST = find_spec("catboost") is not None
+HAS_NUMPY_MODEL = os.path.exists(yield_model.NPZ_PATH)
+
+# name -> (backend, can run here, max |difference| from CatBoostRegressor.predict)
+PATHS = {
+    "catboost": ("catboost", HAS_CATBOOST, 1e-9),
+    "numpy": ("numpy", HAS_NUMPY_MODEL, 1e-9),
+    "service[catboost]": ("catboost", HAS_CATBOOST, 0.005 + 1e-9),
+    "service[numpy]": ("numpy", HAS_NUMPY_MODEL, 0.005 + 1e-9),
+    "service[catboost]+explain": ("catboost", HAS_CATBOOST, 0.005 + 1e-9),
+    "service[numpy]+explain": ("numpy", HAS_NUMPY_MODEL, 0.005 + 1e-9),
+}
+
+# Largest explain / plain mean latency ratio, for these cases
+EXPLAIN_BUDGET = 3.0
+BUDGET_CASES = ("single", "batch[1]", "batch[10]", "batch[100]")
+
+
+def model_borders():
+    """(rainfall borders, temperature borders) the model splits on."""
+    if not HAS_NUMPY_MODEL:
+        return np.empty(0, np.float32), np.empty(0, np.float32)
+    with np.load(yield_model.NPZ_PATH) as data:
+        feature, border = data["split_feature"][:-1], data["split_border"][:-1]  # last: padding
+    return border[feature == 0], border[feature == 1]
+
+
+def make_dataset(n, seed=0):
+    """
+    n synthetic rows as (numbers, categories) in FeatureEncoder layout:
+    uniform over a wide range, with about 10% of rainfall and temperature
+    values exactly on a model border and 2% unseen categories.
+    """
+    rng = np.random.default_rng(seed)
+    categories = np.empty((n, 2), dtype=object)
+    categories[:, 0] = rng.choice(yield_model.SOIL_TYPES + ["Unseen soil"], n, p=[0.98 / 6] * 6 + [0.02])
+    categories[:, 1] = rng.choice(yield_model.CROPS + ["Unseen crop"], n, p=[0.98 / 6] * 6 + [0.02])
+    numbers = np.empty((n, 4), dtype=np.float32)
+    numbers[:, 0] = rng.uniform(50, 1200, n)
+    numbers[:, 1] = rng.uniform(10, 45, n)
+    numbers[:, 2] = rng.random(n) < 0.5
+    numbers[:, 3] = rng.random(n) < 0.5
+    for column, borders in enumerate(model_borders()):
+        pick = rng.random(n) < 0.10
+        if len(borders):
+            numbers[pick, column] = rng.choice(borders, pick.sum())
+    return numbers, categories
+
+
+def make_records(numbers, categories):
+    """Request dicts for the same rows."""
+    return [
+        {
+            "Soil_Type": soil, "Crop": crop, "Rainfall_mm": rainfall, "Temperature_Celsius": temperature,
+            "Fertilizer_Used": bool(fertilizer), "Irrigation_Used": bool(irrigation),
+        }
+        for (soil, crop), (rainfall, temperature, fertilizer, irrigation)
+        in zip(categories.tolist(), numbers.tolist())
+    ]
+
+
+def _latencies(fn, calls):
+    """Per-call wall time in seconds for each argument in `calls`."""
+    times = np.empty(len(calls))
+    clock = time.perf_counter_ns
+    for i, arg in enumerate(calls):
+        start = clock()
+        fn(arg)
+        times[i] = clock() - start
+    return times / 1e9
+
+
+def _summary(latencies, rows_per_call=1):
+    total = latencies.sum()
+    return {
+        "calls": int(len(latencies)),
+        "rows_per_call": rows_per_call,
+        "rows_per_sec": rows_per_call * len(latencies) / total if total > 0 else None,
+        "latency_us": {f"p{p}": float(np.percentile(latencies, p) * 1e6) for p in PERCENTILES},
+        "mean_us": float(latencies.mean() * 1e6),
+    }
+
+
+def _bench_path(name, batch_sizes, single_calls, seed):
+    """Runs in a fresh process: timings, accuracy-set predictions and peak RSS of one path."""
+    import predict_yield
+
+    backend = PATHS[name][0]
+    model = predict_yield.load_model(backend=backend)
+    service = name.startswith("service")
+    explain = name.endswith("+explain")
+    explainer = predict_yield.load_explainer(model=model) if explain else None
+    if explain and explainer is None:
+        raise RuntimeError("No explainer: yield_model.npz has no SHAP tables and catboost is missing.")
+    if service:
+        def batch(records):
+            return predict_yield.predict_batch(model, records, explainer=explainer)
+
+        def to_values(responses):
+            return [float(response["prediction"].split()[0]) for response in responses]
+
+        def inputs(numbers, categories):
+            records = make_records(numbers, categories)
+            for record in records:
+                record["explain"] = explain
+            return records
+    else:
+        def batch(arrays):
+            return yield_model.predict_arrays(model, *arrays)
+
+        def to_values(predictions):
+            return np.asarray(predictions, dtype=np.float64).tolist()
+
+        def inputs(numbers, categories):
+            return numbers, categories
+
+    numbers, categories = make_dataset(max(batch_sizes), seed + 1)
+    results = {}
+    if service:
+        records = inputs(numbers[:single_calls], categories[:single_calls])
+
+        def single(data):
+            return predict_yield.predict(model, data, explainer=explainer)
+
+        single(records[0])  # warm-up
+        results["single"] = _summary(_latencies(single, records))
+    for size in batch_sizes:
+        repeats = max(3, min(200, 200_000 // size))
+        calls = []
+        for r in range(repeats):
+            start = (r * size) % (len(numbers) - size + 1)
+            calls.append(inputs(numbers[start:start + size], categories[start:start + size]))
+        batch(calls[0])  # warm-up
+        results[f"batch[{size}]"] = _summary(_latencies(batch, calls), size)
+
+    accuracy_set = inputs(*make_dataset(ACCURACY_ROWS, seed))
+    return results, to_values(batch(accuracy_set)), peak_rss_mb()
+
+
+def _reference(seed):
+    """CatBoostRegressor.predict on a DataFrame of the accuracy set."""
+    import pandas as pd
+    from catboost import CatBoostRegressor
+
+    numbers, categories = make_dataset(ACCURACY_ROWS, seed)
+    frame = pd.DataFrame(categories, columns=yield_model.CAT_FEATURES)
+    for j, feature in enumerate(yield_model.FLOAT_FEATURES):
+        frame[feature] = numbers[:, j]
+    frame = frame[yield_model.FEATURES]
+    model = CatBoostRegressor()
+    model.load_model(yield_model.CBM_PATH)
+    return model.predict(frame).tolist()
+
+
+def _in_fresh_process(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def cold_start(backend, runs=COLD_RUNS):
+    """Wall time and peak RSS of one-shot predict_yield.py runs."""
+    request = json.dumps(make_records(*make_dataset(1))[0]).encode("utf-8")
+    times, peaks = [], []
+    for _ in range(runs + 1):  # the first run only warms the page cache
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, YIELD_SCRIPT, "--backend", backend],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=PROJECT_ROOT,
+        )
+        if hasattr(os, "wait4"):
+            # wait4 reports the child's own peak RSS (kilobytes on Linux, bytes on macOS)
+            process.stdin.write(request)
+            process.stdin.close()
+            stderr = process.stderr.read()
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peaks.append(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024))
+        else:  # Windows
+            _, stderr = process.communicate(request)
+        elapsed = time.perf_counter() - start
+        if process.returncode != 0:
+            raise RuntimeError(f"predict_yield.py --backend {backend} failed:\n{stderr.decode()}")
+        times.append(elapsed)
+    times = np.array(times[1:])
+    return {
+        "runs": runs,
+        "latency_ms": {f"p{p}": float(np.percentile(times, p) * 1e3) for p in PERCENTILES},
+        "peak_rss_mb": max(peaks[1:]) if peaks else None,
+    }
+
+
+def explain_budget(results):
+    """Explain / plain latency ratio per +explain path and case, with whether it is within EXPLAIN_BUDGET."""
+    budget = {}
+    for name in PATHS:
+        if not name.endswith("+explain"):
+            continue
+        plain = name[:-len("+explain")]
+        for case in BUDGET_CASES:
+            explained, base = results.get(f"{name} {case}"), results.get(f"{plain} {case}")
+            if not explained or not base or "mean_us" not in explained or "mean_us" not in base:
+                continue
+            ratio = explained["mean_us"] / base["mean_us"]
+            budget[f"{name} {case}"] = {"ratio": ratio, "budget": EXPLAIN_BUDGET, "ok": ratio <= EXPLAIN_BUDGET}
+    return budget
+
+
+def run_benchmarks(batch_sizes=BATCH_SIZES, single_calls=SINGLE_CALLS, cold_runs=COLD_RUNS, seed=0):
+    results, accuracy, memory = {}, {}, {}
+    reference = np.array(_in_fresh_process(_reference, seed)) if HAS_CATBOOST else None
+    for name, (backend, available, tolerance) in PATHS.items():
+        if not available:
+            results[name] = {"skipped": "required packages or files are missing"}
+            continue
+        timings, predictions, peak = _in_fresh_process(_bench_path, name, batch_sizes, single_calls, seed)
+        for case, summary in timings.items():
+            results[f"{name} {case}"] = summary
+        memory[name] = peak
+        if reference is not None:
+            worst = float(np.max(np.abs(np.array(predictions) - reference)))
+            accuracy[name] = {"max_abs_diff": worst, "tolerance": tolerance, "ok": worst <= tolerance}
+
+    for backend in ("numpy", "catboost"):
+        if PATHS[backend][1]:
+            results[f"cold start[{backend}]"] = cold_start(backend, cold_runs)
+    return results, accuracy, memory
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print rows/sec change per benchmark against an earlier run."""
+    print(f"{'benchmark':36} {'before':>14} {'after':>14} {'change':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name, {}).get("rows_per_sec")
+        after = result.get("rows_per_sec")
+        if before and after:
+            print(f"{name:36} {before:14,.0f} {after:14,.0f} {after / before - 1:+8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and accuracy-check the yield prediction paths.")
+    parser.add_argument("--output", default="yield_bench.json", help="JSON file to write")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--single-calls", type=int, default=SINGLE_CALLS)
+    parser.add_argument("--cold-runs", type=int, default=COLD_RUNS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with status 1 if a path is inaccurate or explanations are over budget")
+    args = parser.parse_args(argv)
+
+    results, accuracy, memory = run_benchmarks(args.batch_sizes, args.single_calls, args.cold_runs, args.seed)
+    budget = explain_budget(results)
+    report = {
+        "benchmark": "yield",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+        "accuracy": accuracy,
+        "explain_budget": budget,
+        "peak_rss_mb": memory,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:36} skipped: {result['skipped']}")
+        elif "rows_per_sec" in result:
+            latency = result["latency_us"]
+            print(
+                f"{name:36} {result['rows_per_sec']:14,.0f} rows/s   "
+                f"p50 {latency['p50']:10.1f} us   p99 {latency['p99']:10.1f} us"
+            )
+        else:
+            latency = result["latency_ms"]
+            peak = result["peak_rss_mb"]
+            print(
+                f"{name:36} p50 {latency['p50']:7.0f} ms   p99 {latency['p99']:7.0f} ms   "
+                + (f"peak RSS {peak:.0f} MB" if peak is not None else "")
+            )
+    for name, peak in memory.items():
+        print(f"{name:36} peak RSS {peak:.0f} MB" if peak is not None else f"{name:36} peak RSS unknown")
+    if not accuracy:
+        print("Accuracy not checked: the reference needs catboost", file=sys.stderr)
+    for name, result in accuracy.items():
+        status = "ok" if result["ok"] else "OVER TOLERANCE"
+        print(f"{name:36} max |diff| {result['max_abs_diff']:.3g} (tolerance {result['tolerance']:.3g}) {status}")
+    for name, result in budget.items():
+        status = "ok" if result["ok"] else "OVER BUDGET"
+        print(f"{name:36} {result['ratio']:.2f}x plain latency (budget {result['budget']:.1f}x) {status}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    failed = [name for name, result in accuracy.items() if not result["ok"]]
+    if failed:
+        print(f"Inaccurate: {', '.join(failed)}", file=sys.stderr)
+    slow = [name for name, result in budget.items() if not result["ok"]]
+    if slow:
+        print(f"Explanations over budget: {', '.join(slow)}", file=sys.stderr)
+    if (failed or slow) and args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
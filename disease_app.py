@@ -1,19 +1,32 @@
+import os
+
 import gradio as gr
 import numpy as np
 import cv2
-import tensorflow as tf
-import torch
 from PIL import Image
 
-# ============== HF Transformers / ViT Model ==============
-from transformers import ViTImageProcessor, ViTForImageClassification
+# "framework" runs TensorFlow and PyTorch; "onnx" / "onnx-int8" run the
+# models exported by disease_onnx.py on ONNX Runtime, without either
+RUNTIME = os.environ.get("DISEASE_RUNTIME", "framework")
+if RUNTIME not in ("framework", "onnx", "onnx-int8"):
+    raise SystemExit(f"Unknown DISEASE_RUNTIME {RUNTIME!r}: use framework, onnx or onnx-int8.")
+
+if RUNTIME == "framework":
+    import tensorflow as tf
+    import torch
+    # ============== HF Transformers / ViT Model ==============
+    from transformers import ViTImageProcessor, ViTForImageClassification
+
+    # ----------- 1. Load the ViT model & processor ------------
+    vit_processor = ViTImageProcessor.from_pretrained('wambugu1738/crop_leaf_diseases_vit')
+    vit_model = ViTForImageClassification.from_pretrained(
+        'wambugu1738/crop_leaf_diseases_vit',
+        ignore_mismatched_sizes=True
+    )
+else:
+    from disease_onnx import OnnxDiseaseModel
 
-# ----------- 1. Load the ViT model & processor ------------
-vit_processor = ViTImageProcessor.from_pretrained('wambugu1738/crop_leaf_diseases_vit')
-vit_model = ViTForImageClassification.from_pretrained(
-    'wambugu1738/crop_leaf_diseases_vit',
-    ignore_mismatched_sizes=True
-)
+    vit_onnx = OnnxDiseaseModel("vit", quantized=RUNTIME == "onnx-int8")
 
 vit_label_treatment = {
     "Corn___Common_rust": "Use recommended fungicides and ensure crop rotation.",
@@ -31,20 +44,30 @@ vit_label_treatment = {
 def classify_image_vit(image):
     if not isinstance(image, Image.Image):
         image = Image.fromarray(image.astype('uint8'), 'RGB')
-    inputs = vit_processor(images=image, return_tensors="pt")
-    outputs = vit_model(**inputs)
-    logits = outputs.logits
-    predicted_class_idx = logits.argmax(-1).item()
+    if RUNTIME == "framework":
+        inputs = vit_processor(images=image, return_tensors="pt")
+        outputs = vit_model(**inputs)
+        logits = outputs.logits
+        predicted_class_idx = logits.argmax(-1).item()
+        id2label = vit_model.config.id2label
+    else:
+        predicted_class_idx = int(vit_onnx.probabilities([image])[0].argmax())
+        id2label = vit_onnx.id2label
 
     # Predicted label
-    predicted_label = vit_model.config.id2label.get(predicted_class_idx, "Unknown")
+    predicted_label = id2label.get(predicted_class_idx, "Unknown")
     treatment_text = vit_label_treatment.get(predicted_label, "No specific treatment available.")
     return predicted_label, treatment_text
 
 
 # ============== TensorFlow Model (plant_model_v5-beta.h5) ==============
 # Load the model
-keras_model = tf.keras.models.load_model('plant_model_v5-beta.h5')
+KERAS_MODEL_PATH = 'plant_model_v5-beta.h5'
+if RUNTIME == "framework":
+    keras_model = tf.keras.models.load_model(KERAS_MODEL_PATH)
+else:
+    # Its own export: plant_model_v5-beta.onnx / .int8.onnx
+    keras_onnx = OnnxDiseaseModel("keras", quantized=RUNTIME == "onnx-int8", h5_path=KERAS_MODEL_PATH)
 
 # Define the class names
 class_names = {
@@ -132,23 +155,32 @@ keras_treatments = {
     'Unknown': "No specific treatment available."
 }
 
-def edge_and_cut(img, threshold1, threshold2):
+def edge_box(edges):
+    """
+    (row_min, row_max, col_min, col_max) of the nonzero pixels of an edge
+    map, or None if there are none. Row/column reductions run in NumPy,
+    so even a 12 MP map takes milliseconds.
+    """
+    rows = np.flatnonzero(edges.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(edges.any(axis=0))
+    return int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
+
+
+def edge_and_cut(img, threshold1, threshold2, return_box=False):
+    """
+    The image with a white box around its Canny edges. With return_box,
+    (image, (row_min, row_max, col_min, col_max) or None).
+    """
     emb_img = img.copy()
     edges = cv2.Canny(img, threshold1, threshold2)
-    edge_coors = []
-    for i in range(edges.shape[0]):
-        for j in range(edges.shape[1]):
-            if edges[i][j] != 0:
-                edge_coors.append((i, j))
+    box = edge_box(edges)
 
-    if len(edge_coors) == 0:
-        return emb_img
+    if box is None:
+        return (emb_img, None) if return_box else emb_img
 
-    row_min = edge_coors[np.argsort([coor[0] for coor in edge_coors])[0]][0]
-    row_max = edge_coors[np.argsort([coor[0] for coor in edge_coors])[-1]][0]
-    col_min = edge_coors[np.argsort([coor[1] for coor in edge_coors])[0]][1]
-    col_max = edge_coors[np.argsort([coor[1] for coor in edge_coors])[-1]][1]
-    new_img = img[row_min:row_max, col_min:col_max]
+    row_min, row_max, col_min, col_max = box
 
     # Simple bounding box in white
     emb_color = np.array([255], dtype=np.uint8)
@@ -157,16 +189,20 @@ def edge_and_cut(img, threshold1, threshold2):
     emb_img[row_min:row_max, col_min-10:col_min+10] = emb_color
     emb_img[row_min:row_max, col_max-10:col_max+10] = emb_color
 
-    return emb_img
+    return (emb_img, box) if return_box else emb_img
 
 def classify_and_visualize_keras(image):
-    # Preprocess the image
-    img_array = tf.image.resize(image, [256, 256])
-    img_array = tf.expand_dims(img_array, 0) / 255.0
+    if RUNTIME == "framework":
+        # Preprocess the image
+        img_array = tf.image.resize(image, [256, 256])
+        img_array = tf.expand_dims(img_array, 0) / 255.0
 
-    # Make a prediction
-    prediction = keras_model.predict(img_array)
-    predicted_class_idx = tf.argmax(prediction[0], axis=-1).numpy()
+        # Make a prediction
+        prediction = keras_model.predict(img_array)
+    else:
+        # disease_onnx preprocesses the same way
+        prediction = keras_onnx.probabilities([image])
+    predicted_class_idx = int(np.argmax(prediction[0]))
     confidence = np.max(prediction[0])
     
     # Obtain the predicted label
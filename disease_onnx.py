@@ -0,0 +1,256 @@
+"""
+ONNX Runtime (CPU) backend for the disease models, with optional dynamic
+int8 quantization.
+
+Export once, with the training frameworks installed (tensorflow and
+tf2onnx for the Keras model; torch and transformers for the ViT):
+
+    python disease_onnx.py export                  # both models, fp32 and int8
+    python disease_onnx.py export --model vit --no-quantize
+    python disease_onnx.py export --model keras --h5 plant_model_v5-beta.h5
+
+Files, in the project root:
+    <name>.onnx, <name>.int8.onnx                  each Keras <name>.h5: NHWC
+                                                   float32 256x256 images in [0, 1]
+    crop_leaf_vit.onnx, crop_leaf_vit.int8.onnx    ViT: NCHW normalized
+                                                   pixel_values -> logits
+    crop_leaf_vit.json                             ViT labels and preprocessing
+Inference needs only numpy, Pillow and onnxruntime. The preprocessing is
+reimplemented in NumPy to match tf.image.resize (Keras) and
+ViTImageProcessor (ViT), so neither framework is imported.
+
+Dynamic quantization stores MatMul/Gemm weights as int8 and quantizes
+activations per call: mostly a speedup for the ViT's matrix products.
+Convolutions stay float: int8 ConvInteger has no kernel on ONNX Runtime's
+CPU provider, so only the Keras model's dense layers are quantized. It
+can change predictions; benchmarks/disease_onnx_bench.py reports the
+agreement.
+"""
+
+import argparse
+import json
+import os
+import sys
+from importlib.util import find_spec
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+KERAS_MODEL_PATHS = [
+    os.path.join(PROJECT_ROOT, "plant_disease.h5"),
+    os.path.join(PROJECT_ROOT, "plant_model_v5-beta.h5"),
+]
+VIT_MODEL_NAME = "wambugu1738/crop_leaf_diseases_vit"
+# Keras exports are named after their .h5 file; these are the defaults
+ONNX_NAMES = {"keras": "plant_disease", "vit": "crop_leaf_vit"}
+KERAS_SIZE = 256
+OPSET = 17
+
+HAS_ONNXRUNTIME = find_spec("onnxruntime") is not None
+
+
+def _onnx_name(h5_path):
+    return os.path.splitext(os.path.basename(h5_path))[0]
+
+
+def default_keras_h5():
+    """
+    The Keras model predict_disease.py loads: the first of KERAS_MODEL_PATHS
+    that exists, as .h5 or as an export.
+    """
+    for path in KERAS_MODEL_PATHS:
+        if os.path.exists(path) or os.path.exists(onnx_path("keras", h5_path=path)):
+            return path
+    return KERAS_MODEL_PATHS[0]
+
+
+def onnx_path(backend, quantized=False, h5_path=None):
+    """The export of `backend`; for Keras, of `h5_path` (default: default_keras_h5())."""
+    if backend == "keras":
+        name = _onnx_name(h5_path or default_keras_h5())
+    else:
+        name = ONNX_NAMES[backend]
+    return os.path.join(PROJECT_ROOT, name + (".int8.onnx" if quantized else ".onnx"))
+
+
+def vit_config_path():
+    return os.path.join(PROJECT_ROOT, ONNX_NAMES["vit"] + ".json")
+
+
+def has_onnx(backend, quantized=False, h5_path=None):
+    """Whether onnxruntime is installed and `backend` has been exported."""
+    files = [onnx_path(backend, quantized, h5_path)] + ([vit_config_path()] if backend == "vit" else [])
+    return HAS_ONNXRUNTIME and all(os.path.exists(path) for path in files)
+
+
+# ------------------------------------
+# EXPORT (needs the training frameworks)
+# ------------------------------------
+def export_keras(output_path, h5_path):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(h5_path)
+    signature = [tf.TensorSpec((None, KERAS_SIZE, KERAS_SIZE, 3), tf.float32, name="image")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=OPSET, output_path=output_path)
+
+
+def export_vit(output_path, config_path):
+    import torch
+    from transformers import ViTForImageClassification, ViTImageProcessor
+
+    processor = ViTImageProcessor.from_pretrained(VIT_MODEL_NAME)
+    model = ViTForImageClassification.from_pretrained(VIT_MODEL_NAME, ignore_mismatched_sizes=True)
+    model.eval()
+    model.config.return_dict = False  # a plain logits tuple traces cleanly
+    size = (processor.size["height"], processor.size["width"])
+    dummy = torch.zeros((1, 3) + size)
+    torch.onnx.export(
+        model, (dummy,), output_path,
+        input_names=["pixel_values"], output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=OPSET,
+    )
+    config = {
+        "id2label": {str(k): v for k, v in model.config.id2label.items()},
+        "size": list(size),
+        "resample": int(processor.resample),
+        "rescale_factor": processor.rescale_factor,
+        "image_mean": list(processor.image_mean),
+        "image_std": list(processor.image_std),
+    }
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=1)
+
+
+# Only ops with int8 CPU kernels (MatMulInteger); not Conv (ConvInteger)
+QUANTIZED_OPS = ["MatMul", "Gemm"]
+
+
+def quantize(input_path, output_path):
+    """Dynamic int8 quantization of an ONNX model's MatMul/Gemm weights."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        input_path, output_path, op_types_to_quantize=QUANTIZED_OPS, weight_type=QuantType.QInt8,
+    )
+
+
+# ------------------------------------
+# PREPROCESSING (NumPy / Pillow only)
+# ------------------------------------
+def resize_bilinear(image, height, width):
+    """
+    float32 (height, width, channels) resize matching tf.image.resize's
+    default: bilinear, half-pixel centres, no antialiasing.
+    """
+    image = np.asarray(image, dtype=np.float32)
+    in_h, in_w = image.shape[:2]
+
+    def axis(out_size, in_size):
+        coords = np.maximum((np.arange(out_size) + 0.5) * (in_size / out_size) - 0.5, 0.0)
+        lower = np.minimum(np.floor(coords).astype(np.intp), in_size - 1)
+        upper = np.minimum(lower + 1, in_size - 1)
+        return lower, upper, (coords - lower).astype(np.float32)
+
+    y0, y1, wy = axis(height, in_h)
+    x0, x1, wx = axis(width, in_w)
+    wy, wx = wy[:, None, None], wx[None, :, None]
+    top = image[y0][:, x0] * (1 - wx) + image[y0][:, x1] * wx
+    bottom = image[y1][:, x0] * (1 - wx) + image[y1][:, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def keras_inputs(images):
+    """NHWC batch for the Keras model, as predict_keras prepares it."""
+    return np.stack([resize_bilinear(image, KERAS_SIZE, KERAS_SIZE) for image in images]) / np.float32(255)
+
+
+def vit_inputs(images, config):
+    """NCHW pixel_values, as ViTImageProcessor prepares them."""
+    from PIL import Image
+
+    height, width = config["size"]
+    mean = np.array(config["image_mean"], dtype=np.float32)
+    std = np.array(config["image_std"], dtype=np.float32)
+    batch = []
+    for image in images:
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(np.asarray(image, dtype=np.uint8))
+        resized = np.asarray(image.convert("RGB").resize((width, height), config["resample"]), dtype=np.float32)
+        batch.append((resized * np.float32(config["rescale_factor"]) - mean) / std)
+    return np.stack(batch).transpose(0, 3, 1, 2)
+
+
+# ------------------------------------
+# INFERENCE
+# ------------------------------------
+class OnnxDiseaseModel:
+    """An exported disease model on ONNX Runtime's CPU provider."""
+
+    def __init__(self, backend, quantized=False, threads=None, h5_path=None):
+        import onnxruntime as ort
+
+        if backend not in ONNX_NAMES:
+            raise ValueError(f"backend must be one of {', '.join(ONNX_NAMES)}.")
+        self.backend = backend
+        self.quantized = quantized
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            onnx_path(backend, quantized, h5_path), options, providers=["CPUExecutionProvider"],
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.config = None
+        if backend == "vit":
+            with open(vit_config_path()) as f:
+                self.config = json.load(f)
+            self.id2label = {int(k): v for k, v in self.config["id2label"].items()}
+
+    def probabilities(self, images):
+        """(n, classes) class probabilities for a list of RGB images (PIL or arrays)."""
+        if self.backend == "keras":
+            # The Keras model ends in a softmax
+            return self.session.run(None, {self.input_name: keras_inputs(images)})[0]
+        logits = self.session.run(None, {self.input_name: vit_inputs(images, self.config)})[0]
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the disease models to ONNX.")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--model", action="append", choices=list(ONNX_NAMES),
+                        help="model to export (repeatable; default: both)")
+    parser.add_argument("--h5", action="append",
+                        help="Keras model file, exported as <name>.onnx (repeatable; default: every one present "
+                             "of plant_disease.h5 and plant_model_v5-beta.h5)")
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 copies")
+    args = parser.parse_args(argv)
+
+    exports = []
+    for backend in args.model or list(ONNX_NAMES):
+        if backend == "keras":
+            h5_paths = args.h5 or [path for path in KERAS_MODEL_PATHS if os.path.exists(path)]
+            if not h5_paths:
+                parser.error("No Keras model file found.")
+            exports += [(backend, h5_path) for h5_path in h5_paths]
+        else:
+            exports.append((backend, None))
+
+    for backend, h5_path in exports:
+        path = onnx_path(backend, h5_path=h5_path)
+        if backend == "keras":
+            export_keras(path, h5_path)
+        else:
+            export_vit(path, vit_config_path())
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)", file=sys.stderr)
+        if not args.no_quantize:
+            quantized = onnx_path(backend, quantized=True, h5_path=h5_path)
+            quantize(path, quantized)
+            print(f"Wrote {quantized} ({os.path.getsize(quantized) / 1e6:.1f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+District-level fertilizer product tonnage.
+
+Sums product amount x field area over all fields, grouped by district,
+variety, nutrient and STVI class. Input is split into chunks that are
+reduced in a process pool (np.bincount per chunk), and the partial sums
+are merged at the end. Parquet row groups go to the workers whole, and
+each worker reads its row group in batches of --chunk-size rows.
+
+    python fertilizer_aggregate.py fields.csv tonnage.csv --workers 8
+
+Input columns: N, P, K, S, Zn, B (any subset), variety, area_ha and
+optionally district. Output: one row per group with the number of
+fields, total area (ha) and product tonnage (t).
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fertilizer_batch import NUTRIENTS, PRODUCTS, STVI_CLASSES, VARIETIES, encode_varieties, fertilizer_batch
+from fertilizer_cli import DEFAULT_CHUNK_SIZE, HAS_PYARROW, read_chunks
+from fertilizer_index import DEFAULT_GAP_POLICY, GAP_POLICIES
+from perf_utils import peak_rss_mb
+
+if HAS_PYARROW:
+    import pyarrow.parquet as pq
+
+ALL_DISTRICTS = "(all)"
+
+
+def aggregate_chunk(chunk, variety=None, gap_policy=None):
+    """
+    Partial sums for one chunk:
+    {(district, variety, nutrient, stvi_class): [fields, area_ha, tonnes]}.
+    Rows with no area or no STVI class for a nutrient are left out of that
+    nutrient's totals.
+    """
+    n = len(chunk)
+    if n == 0:
+        return {}
+    if variety is None:
+        variety = chunk["variety"]
+    variety_codes = encode_varieties(variety, n)
+    area = np.asarray(chunk["area_ha"], dtype=np.float64)
+
+    if "district" in chunk:
+        district_codes, districts = pd.factorize(chunk["district"], use_na_sentinel=False)
+    else:
+        district_codes, districts = np.zeros(n, dtype=np.intp), [ALL_DISTRICTS]
+
+    n_varieties, n_classes = len(VARIETIES), len(STVI_CLASSES)
+    n_groups = len(districts) * n_varieties * n_classes
+    results = fertilizer_batch(chunk, variety_codes, gap_policy)
+
+    partial = {}
+    for nutrient, result in results.items():
+        codes = result["stvi_class"]
+        keep = (codes >= 0) & ~np.isnan(area)
+        group = (district_codes[keep] * n_varieties + variety_codes[keep]) * n_classes + codes[keep]
+
+        fields = np.bincount(group, minlength=n_groups)
+        area_sum = np.bincount(group, weights=area[keep], minlength=n_groups)
+        # kg/ha x ha -> kg, reported in tonnes
+        tonnes = np.bincount(group, weights=result["product_amount"][keep] * area[keep], minlength=n_groups) / 1000
+
+        for g in np.flatnonzero(fields):
+            d, rest = divmod(int(g), n_varieties * n_classes)
+            v, c = divmod(rest, n_classes)
+            partial[(districts[d], VARIETIES[v], nutrient, STVI_CLASSES[c])] = [
+                int(fields[g]), float(area_sum[g]), float(tonnes[g]),
+            ]
+    return partial
+
+
+def _empty_totals():
+    return defaultdict(lambda: [0, 0.0, 0.0])
+
+
+def merge(total, partial):
+    for key, (fields, area, tonnes) in partial.items():
+        entry = total[key]
+        entry[0] += fields
+        entry[1] += area
+        entry[2] += tonnes
+    return total
+
+
+def _aggregate_row_group(path, row_group, chunk_size, variety, gap_policy):
+    # Batches rather than the whole row group, however large it was written
+    total = _empty_totals()
+    rows = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, row_groups=[row_group]):
+        chunk = batch.to_pandas()
+        rows += len(chunk)
+        merge(total, aggregate_chunk(chunk, variety, gap_policy))
+    return rows, dict(total)
+
+
+def _aggregate_frame(chunk, variety, gap_policy):
+    return len(chunk), aggregate_chunk(chunk, variety, gap_policy)
+
+
+def _tasks(path, chunk_size):
+    """
+    (function, first argument) pairs for the pool. Parquet row groups are
+    read by the workers themselves; other formats are read here in chunks.
+    """
+    if HAS_PYARROW and os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        for row_group in range(pq.ParquetFile(path).num_row_groups):
+            yield _aggregate_row_group, (path, row_group, chunk_size)
+    else:
+        for chunk in read_chunks(path, chunk_size):
+            yield _aggregate_frame, (chunk,)
+
+
+def aggregate_file(path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, variety=None, gap_policy=None):
+    """Aggregate a whole file; returns (totals dict, rows)."""
+    workers = workers or os.cpu_count() or 1
+    total = _empty_totals()
+    rows = 0
+
+    if workers == 1:
+        for fn, args in _tasks(path, chunk_size):
+            n, partial = fn(*args, variety, gap_policy)
+            rows += n
+            merge(total, partial)
+        return total, rows
+
+    # Keep a bounded number of chunks in flight so memory stays flat
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for fn, args in _tasks(path, chunk_size):
+            pending.append(pool.submit(fn, *args, variety, gap_policy))
+            if len(pending) >= max_pending:
+                n, partial = pending.pop(0).result()
+                rows += n
+                merge(total, partial)
+        for future in pending:
+            n, partial = future.result()
+            rows += n
+            merge(total, partial)
+    return total, rows
+
+
+def totals_frame(total):
+    """Totals dict as a sorted DataFrame."""
+    records = [
+        {
+            "district": district,
+            "variety": variety,
+            "nutrient": nutrient,
+            "product": PRODUCTS[nutrient],
+            "stvi_class": stvi_class,
+            "fields": fields,
+            "area_ha": area,
+            "tonnes": tonnes,
+        }
+        for (district, variety, nutrient, stvi_class), (fields, area, tonnes) in total.items()
+    ]
+    df = pd.DataFrame(records, columns=[
+        "district", "variety", "nutrient", "product", "stvi_class", "fields", "area_ha", "tonnes",
+    ])
+    order = {
+        "variety": {name: i for i, name in enumerate(VARIETIES)},
+        "nutrient": {name: i for i, name in enumerate(NUTRIENTS)},
+        "stvi_class": {name: i for i, name in enumerate(STVI_CLASSES)},
+    }
+    return df.sort_values(
+        ["district", "variety", "nutrient", "stvi_class"],
+        key=lambda col: col.map(order[col.name]) if col.name in order else col.astype(str),
+    ).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="District-level fertilizer product tonnage.")
+    parser.add_argument("input", help="CSV, Parquet or Arrow IPC file with one row per field")
+    parser.add_argument("output", help="CSV file to write the totals to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--variety", help="variety name or index for every field (default: the 'variety' column)")
+    parser.add_argument("--gap-policy", choices=GAP_POLICIES, default=DEFAULT_GAP_POLICY)
+    args = parser.parse_args(argv)
+
+    variety = args.variety
+    if variety is not None and variety.isdigit():
+        if int(variety) >= len(VARIETIES):
+            parser.error(f"variety index must be below {len(VARIETIES)}")
+        variety = VARIETIES[int(variety)]
+
+    start = time.perf_counter()
+    total, rows = aggregate_file(args.input, args.workers, args.chunk_size, variety, args.gap_policy)
+    totals_frame(total).to_csv(args.output, index=False)
+    seconds = time.perf_counter() - start
+
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"Aggregated {rows} fields into {len(total)} groups in {seconds:.2f} s ({rate:,.0f} rows/s)", file=sys.stderr)
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS (main process): {peak:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
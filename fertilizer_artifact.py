@@ -0,0 +1,227 @@
+"""
+Precomputed recommendation artifact (fertilizer_tables.bin).
+
+Within one STVI class, F_r is linear in the soil value:
+
+    F_r = U_f - (C_i / C_s) * (S_t - L_s) = intercept + slope * S_t
+
+so every (variety, nutrient) pair reduces to the class boundaries plus one
+intercept and one slope per class. The build step writes those arrays to a
+small binary file that both this module and the Next.js route
+(lib/fertilizerTables.ts) load, so every surface serves the same numbers.
+At runtime a recommendation is one searchsorted plus one multiply-add.
+
+File layout (little-endian):
+
+    bytes 0-3    magic b"FRTB"
+    bytes 4-7    uint32 format version
+    bytes 8-11   uint32 length of the JSON header
+    bytes 12-    JSON header, space-padded so the data starts 8-byte aligned
+    data         float64 arrays; offsets (in values) and shapes in the header
+
+The header also records the table "version" the file was built from;
+readers reload the file when it changes and tag results with it.
+Header arrays: lo, hi [nutrient, class]; intercept, slope
+[variety, nutrient, class]; ratio [nutrient]. Missing recommendation
+ranges are NaN. Gaps between classes have no class, as with the default
+"reject" gap policy.
+
+    python fertilizer_artifact.py build            # from fertilizer_tables.json
+    python fertilizer_artifact.py verify
+    python fertilizer_artifact.py check            # fails if the .bin is stale
+    python fertilizer_artifact.py check --rebuild  # rebuilds it instead
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from fertilizer_index import NO_CLASS
+from fertilizer_tables import TABLE_FILE, load_tables
+
+MAGIC = b"FRTB"
+FORMAT_VERSION = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fertilizer_tables.bin")
+
+
+def compile_artifact(tables):
+    """Header dict and named float64 arrays for a CompiledTables."""
+    nutrients = tables.nutrients
+    lo = np.array([tables[n].index.lo for n in nutrients])
+    hi = np.array([tables[n].index.hi for n in nutrients])
+    ratio = np.array([tables[n].ratio for n in nutrients], dtype=np.float64)
+
+    # rec arrays are [variety, class] per nutrient -> [variety, nutrient, class]
+    Uf = np.stack([tables[n].rec_hi for n in nutrients], axis=1)
+    Ci = Uf - np.stack([tables[n].rec_lo for n in nutrients], axis=1)
+    Cs = hi - lo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.where(Cs == 0, 0.0, Ci / Cs)
+    intercept = Uf + k * lo
+    slope = -k
+
+    arrays = {"lo": lo, "hi": hi, "intercept": intercept, "slope": slope, "ratio": ratio}
+    header = {
+        "version": tables.version,
+        "nutrients": list(nutrients),
+        "classes": list(tables.classes),
+        "varieties": list(tables.varieties),
+        "products": [tables[n].product for n in nutrients],
+        "arrays": {},
+    }
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": offset, "shape": list(array.shape)}
+        offset += array.size
+    return header, arrays
+
+
+def build_artifact(tables, path=DEFAULT_PATH):
+    """
+    Atomically replace `path` with the artifact for `tables`, so a reader
+    reloading it never sees it half written.
+    """
+    header, arrays = compile_artifact(tables)
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix = 12 + len(header_bytes)
+    header_bytes += b" " * (-prefix % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".fertilizer_tables.", suffix=".bin")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<II", FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for array in arrays.values():
+                f.write(np.ascontiguousarray(array, dtype="<f8").tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def artifact_version(path=DEFAULT_PATH):
+    """The table version `path` was built from, or None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(12)
+            if len(prefix) < 12 or prefix[:4] != MAGIC:
+                return None
+            version, header_len = struct.unpack_from("<II", prefix, 4)
+            if version != FORMAT_VERSION:
+                return None
+            return json.loads(f.read(header_len).decode("utf-8")).get("version")
+    except (OSError, ValueError):
+        return None
+
+
+class RecommendationArtifact:
+    """A loaded fertilizer_tables.bin."""
+
+    def __init__(self, header, data):
+        self.header = header
+        self.version = header.get("version")
+        self.nutrients = tuple(header["nutrients"])
+        self.classes = tuple(header["classes"])
+        self.varieties = tuple(header["varieties"])
+        self.products = dict(zip(self.nutrients, header["products"]))
+        self._nutrient_index = {n: j for j, n in enumerate(self.nutrients)}
+        for name, spec in header["arrays"].items():
+            size = int(np.prod(spec["shape"]))
+            view = data[spec["offset"]:spec["offset"] + size].reshape(spec["shape"])
+            setattr(self, name, view)
+
+    def recommend(self, nutrient, values, variety_codes):
+        """
+        (class codes, F_r, product amount) arrays for one nutrient.
+        Class code is NO_CLASS and F_r NaN where the value has no class.
+        """
+        j = self._nutrient_index[nutrient]
+        values = np.asarray(values, dtype=np.float64)
+        lo, hi = self.lo[j], self.hi[j]
+
+        idx = np.searchsorted(lo, values, side="right") - 1
+        safe = np.maximum(idx, 0)
+        valid = (idx >= 0) & (values <= hi.take(safe))
+
+        flat = np.asarray(variety_codes) * len(lo) + safe
+        Fr = self.intercept[:, j, :].ravel().take(flat) + self.slope[:, j, :].ravel().take(flat) * values
+        np.maximum(Fr, 0, out=Fr)
+        Fr[~valid] = np.nan
+        codes = np.where(valid, idx, NO_CLASS).astype(np.int8)
+        return codes, Fr, Fr * self.ratio[j]
+
+
+def load_artifact(path=DEFAULT_PATH):
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw[:4] != MAGIC:
+        raise ValueError(f"{path} is not a fertilizer tables artifact.")
+    version, header_len = struct.unpack_from("<II", raw, 4)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported artifact format version {version}.")
+    header = json.loads(raw[12:12 + header_len].decode("utf-8"))
+    data = np.frombuffer(raw, dtype="<f8", offset=12 + header_len)
+    return RecommendationArtifact(header, data)
+
+
+def verify(artifact, n=200_000, seed=0):
+    """Largest |F_r| difference between the artifact and fertilizer_batch."""
+    from fertilizer_batch import fertilizer_batch
+    from fertilizer_core import STVI_THRESHOLDS
+
+    rng = np.random.default_rng(seed)
+    variety_codes = rng.integers(0, len(artifact.varieties), n)
+    columns = {
+        nutrient: rng.uniform(-0.1, STVI_THRESHOLDS[nutrient]["Very High"][0] * 1.5, n)
+        for nutrient in artifact.nutrients
+    }
+    expected = fertilizer_batch(columns, variety_codes)
+
+    worst = 0.0
+    for nutrient in artifact.nutrients:
+        codes, Fr, _ = artifact.recommend(nutrient, columns[nutrient], variety_codes)
+        if not np.array_equal(codes, expected[nutrient]["stvi_class"]):
+            raise AssertionError(f"{nutrient}: STVI classes differ from fertilizer_batch.")
+        diff = np.nanmax(np.abs(Fr - expected[nutrient]["F_r"]))
+        worst = max(worst, float(diff))
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check fertilizer_tables.bin.")
+    parser.add_argument("command", choices=["build", "verify", "check"])
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--tables", default=TABLE_FILE, help="table file to build from")
+    parser.add_argument("--rebuild", action="store_true", help="with check: rebuild a stale artifact")
+    args = parser.parse_args(argv)
+
+    if args.command in ("build", "check"):
+        try:
+            tables = load_tables(args.tables)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            raise SystemExit(f"{args.tables}: {e}")
+        built = artifact_version(args.path)
+        if args.command == "check" and built == tables.version:
+            print(f"{args.path}: up to date (version {built})", file=sys.stderr)
+            return
+        if args.command == "check" and not args.rebuild:
+            raise SystemExit(
+                f"{args.path} is stale: built from version {built}, {args.tables} is version "
+                f"{tables.version}. Run `python fertilizer_artifact.py build`."
+            )
+        build_artifact(tables, args.path)
+        print(f"Wrote {args.path} (version {tables.version}, {os.path.getsize(args.path)} bytes)", file=sys.stderr)
+    else:
+        worst = verify(load_artifact(args.path))
+        print(f"Max |F_r| difference vs fertilizer_batch: {worst:.3g} kg/ha", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Vectorized fertilizer recommendations for many soil samples at once.
+
+Uses the same tables and F_r formula as fertilizer_core.fertilizer_calculator,
+but works on whole NumPy columns instead of one field at a time.
+"""
+
+import numpy as np
+
+from fertilizer_core import TABLES
+from fertilizer_index import NO_CLASS
+
+NUTRIENTS = TABLES.nutrients
+STVI_CLASSES = TABLES.classes
+VARIETIES = TABLES.varieties
+
+# Rows processed per block in recommend_nutrient
+_BLOCK = 8192
+
+
+def classify_soil_tests(nutrient, values, gap_policy=None, tables=None):
+    """
+    Array version of classify_soil_test: returns int8 class codes (indexes
+    into STVI_CLASSES), NO_CLASS for NaN or out-of-range values.
+    """
+    tables = TABLES if tables is None else tables
+    return tables[nutrient].index.lookup_array(values, gap_policy).astype(np.int8)
+
+
+def encode_varieties(varieties, n, tables=None):
+    """
+    Map variety names to integer codes (indexes into VARIETIES, or into
+    tables.varieties when `tables` is given). A single name is broadcast to
+    all n samples; an integer array is taken as codes already.
+    """
+    tables = TABLES if tables is None else tables
+    names, name_codes = tables.varieties, tables.variety_codes
+    if hasattr(varieties, "cat"):
+        # pandas categorical column: only the categories need a lookup
+        categories = varieties.cat.categories.to_numpy()
+        return encode_varieties(categories, len(categories), tables).take(varieties.cat.codes.to_numpy())
+    if hasattr(varieties, "to_numpy"):
+        varieties = varieties.to_numpy()
+
+    try:
+        if isinstance(varieties, str):
+            return np.full(n, name_codes[varieties], dtype=np.intp)
+        if isinstance(varieties, np.ndarray) and varieties.dtype.kind in "iu":
+            codes = varieties.astype(np.intp, copy=False)
+            if codes.size and (codes.min() < 0 or codes.max() >= len(names)):
+                bad = codes[(codes < 0) | (codes >= len(names))][0]
+                raise KeyError(int(bad))
+            return codes
+        if isinstance(varieties, np.ndarray) and varieties.dtype.kind == "U":
+            codes = np.full(len(varieties), -1, dtype=np.intp)
+            for code, name in enumerate(names):
+                codes[varieties == name] = code
+            if (codes < 0).any():
+                raise KeyError(str(varieties[np.argmax(codes < 0)]))
+            return codes
+        # A dict lookup per row is much cheaper than sorting long strings
+        return np.fromiter(
+            (name_codes[name] for name in varieties), dtype=np.intp, count=len(varieties)
+        )
+    except KeyError as e:
+        raise KeyError(f"Unknown variety: {e.args[0]!r}") from None
+
+
+def recommend_nutrient(nutrient, values, variety_codes, gap_policy=None, tables=None):
+    """
+    Compute STVI class codes, F_r (kg/ha) and product amount (kg/ha) for one
+    nutrient column. Rows without a class get NaN for F_r and amount.
+    The result also carries the "table_version" that produced it.
+    """
+    tables = TABLES if tables is None else tables
+    table = tables[nutrient]
+    values = np.asarray(values, dtype=np.float64)
+    result = {
+        "stvi_class": np.empty(values.shape, dtype=np.int8),
+        "F_r": np.empty(values.shape, dtype=np.float64),
+        "product_amount": np.empty(values.shape, dtype=np.float64),
+        "table_version": tables.version,
+    }
+    # Working in cache-sized blocks keeps the temporaries out of main memory
+    for start in range(0, len(values), _BLOCK):
+        block = slice(start, start + _BLOCK)
+        _recommend_block(
+            table, gap_policy, values[block], variety_codes[block],
+            result["stvi_class"][block], result["F_r"][block], result["product_amount"][block],
+        )
+    return result
+
+
+def _recommend_block(table, gap_policy, values, variety_codes, codes_out, Fr_out, amount_out):
+    idx = table.index.lookup_array(values, gap_policy)
+    codes_out[:] = idx
+
+    # NO_CLASS rows pick up the NaN padding entry (see NutrientTable)
+    flat = variety_codes * table.stride + idx
+    Uf = table.Uf.take(flat)
+    slope = table.slope.take(flat)
+    Ls = table.Ls.take(idx)
+
+    # Same expression as calculate_F_r: U_f - (C_i / C_s) * (S_t - L_s)
+    np.subtract(values, Ls, out=Fr_out)
+    Fr_out *= slope
+    np.subtract(Uf, Fr_out, out=Fr_out)
+    np.maximum(Fr_out, 0, out=Fr_out)
+    np.multiply(Fr_out, table.ratio, out=amount_out)
+
+
+def fertilizer_batch(samples, variety=None, gap_policy=None, tables=None):
+    """
+    Vectorized fertilizer_calculator.
+
+    `samples` is a dict of columns or a pandas DataFrame with any of the
+    N, P, K, S, Zn, B columns (NaN/None = not tested). `variety` is a single
+    variety name, an array of names, or None to read samples["variety"].
+    `gap_policy` is passed on to the STVI lookup (see classify_soil_test).
+    `tables` is a CompiledTables to use instead of TABLES, e.g. from a
+    fertilizer_tables.TableStore; the whole batch uses that one version.
+
+    Returns {nutrient: {"stvi_class", "F_r", "product_amount"}} of arrays,
+    plus each nutrient's "table_version".
+    """
+    tables = TABLES if tables is None else tables
+    if variety is None:
+        variety = samples["variety"]
+
+    columns = {
+        nutrient: np.asarray(samples[nutrient], dtype=np.float64)
+        for nutrient in tables.nutrients
+        if nutrient in samples
+    }
+    if not columns:
+        raise ValueError("No nutrient columns given.")
+    n = len(next(iter(columns.values())))
+
+    variety_codes = encode_varieties(variety, n, tables)
+    if len(variety_codes) != n:
+        raise ValueError("Variety column length does not match the sample columns.")
+
+    return {
+        nutrient: recommend_nutrient(nutrient, values, variety_codes, gap_policy, tables)
+        for nutrient, values in columns.items()
+    }
+
+
+def stvi_class_names(codes, tables=None):
+    """
+    Convert class codes back to STVI class names (None for NO_CLASS), from
+    tables.classes when `tables` is given.
+    """
+    tables = TABLES if tables is None else tables
+    names = np.array(tables.classes + (None,), dtype=object)
+    return names[np.asarray(codes)]
+
+
+# Long-format record layout for columnar storage / JSON: one row per
+# (sample, nutrient). The product name follows from the nutrient, see PRODUCTS.
+RECOMMENDATION_DTYPE = np.dtype([
+    ("sample", np.int64),
+    ("nutrient", "U2"),
+    ("stvi_class", np.int8),
+    ("F_r", np.float64),
+    ("product_amount", np.float64),
+])
+
+PRODUCTS = {nutrient: TABLES[nutrient].product for nutrient in NUTRIENTS}
+
+
+def to_records(results):
+    """
+    Flatten fertilizer_batch output into a RECOMMENDATION_DTYPE structured
+    array, sample-major (all nutrients of sample 0 first).
+    """
+    nutrients = list(results)
+    n = len(results[nutrients[0]]["F_r"]) if nutrients else 0
+    records = np.empty((n, len(nutrients)), dtype=RECOMMENDATION_DTYPE)
+    records["sample"] = np.arange(n)[:, None]
+    for j, nutrient in enumerate(nutrients):
+        column = records[:, j]
+        column["nutrient"] = nutrient
+        column["stvi_class"] = results[nutrient]["stvi_class"]
+        column["F_r"] = results[nutrient]["F_r"]
+        column["product_amount"] = results[nutrient]["product_amount"]
+    return records.reshape(-1)
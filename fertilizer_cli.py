@@ -0,0 +1,203 @@
+"""
+Command-line fertilizer recommendations for soil lab exports.
+
+Reads a CSV (or Parquet / Arrow IPC when pyarrow is installed) in chunks,
+runs the vectorized recommendation logic on each chunk and streams the
+results to the output file, so memory stays flat however large the input.
+
+    python fertilizer_cli.py samples.csv recommendations.csv
+    python fertilizer_cli.py samples.parquet out.parquet --variety "Aman Rice"
+
+Input columns: any of N, P, K, S, Zn, B (blank = not tested) and a
+`variety` column holding either the variety name or its index in
+VARIETY_OPTIONS. Other columns are copied to the output as text, and a
+`table_version` column records the recommendation tables used.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from fertilizer_batch import fertilizer_batch
+from fertilizer_core import TABLES
+from fertilizer_index import DEFAULT_GAP_POLICY, GAP_POLICIES
+from fertilizer_tables import load_tables
+from perf_utils import peak_rss_mb
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    return "csv"
+
+
+def _require_pyarrow(path):
+    if not HAS_PYARROW:
+        raise SystemExit(f"pyarrow is required to read or write {path}; install it or use CSV.")
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV/Parquet/Arrow file."""
+    fmt = _file_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    _require_pyarrow(path)
+    if fmt == "parquet":
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+    else:
+        # Memory-mapped, so record batches are read lazily
+        source = pa.memory_map(path, "r")
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            batches = pa.ipc.open_stream(source)
+    for batch in batches:
+        for start in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(start, chunk_size).to_pandas()
+
+
+def recommend_chunk(chunk, variety=None, gap_policy=None, tables=None):
+    """Append class / F_r / product amount columns for every nutrient present."""
+    if variety is None and "variety" not in chunk:
+        raise SystemExit("Input has no 'variety' column; pass --variety.")
+    tables = TABLES if tables is None else tables
+    results = fertilizer_batch(chunk, variety=variety, gap_policy=gap_policy, tables=tables)
+    out = chunk.copy()
+    # Passthrough columns as strings: a column that is blank (float) or
+    # numeric in one chunk and text in a later one must keep one type
+    for column in out.columns:
+        if column not in results:
+            out[column] = out[column].astype("string")
+    for nutrient, result in results.items():
+        # Same float dtype in every chunk, so the output schema stays stable
+        out[nutrient] = out[nutrient].astype("float64")
+        # Code -1 (no class) becomes a missing value
+        out[f"{nutrient}_class"] = pd.Categorical.from_codes(result["stvi_class"], tables.classes)
+        out[f"{nutrient}_F_r"] = result["F_r"]
+        out[f"{nutrient}_product"] = result["product_amount"]
+    out["table_version"] = tables.version
+    return out
+
+
+class ChunkWriter:
+    """
+    Streams DataFrame chunks to CSV or Parquet, writing the header once.
+    Uses pyarrow's writers when available (much faster than DataFrame.to_csv).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = _file_format(path)
+        if self.format == "arrow":
+            raise SystemExit("Arrow output is not supported; use .csv or .parquet.")
+        if self.format == "parquet":
+            _require_pyarrow(path)
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, df):
+        if not HAS_PYARROW:
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+            self._started = True
+            return
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa_csv.CSVWriter(self.path, self._schema)
+        elif table.schema != self._schema:
+            # Only nullability can differ now that recommend_chunk fixes the types
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run(input_path, output_path, variety=None, chunk_size=DEFAULT_CHUNK_SIZE, gap_policy=None, tables=None):
+    """Process the whole file with one table version; returns (rows, seconds)."""
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            writer.write(recommend_chunk(chunk, variety, gap_policy, tables))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fertilizer recommendations for a soil lab export.")
+    parser.add_argument("input", nargs="?", help="CSV, Parquet (.parquet) or Arrow IPC (.arrow/.feather) file")
+    parser.add_argument("output", nargs="?", help="CSV or Parquet (.parquet) file to write")
+    parser.add_argument(
+        "--variety",
+        help="variety name or index for every row (default: the 'variety' column)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--gap-policy", choices=GAP_POLICIES, default=DEFAULT_GAP_POLICY)
+    parser.add_argument("--tables", help="table file to use instead of fertilizer_tables.json")
+    parser.add_argument("--list-varieties", action="store_true", help="print variety indexes and exit")
+    args = parser.parse_args(argv)
+
+    try:
+        tables = load_tables(args.tables) if args.tables else TABLES
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot load {args.tables}: {e}")
+    varieties = tables.varieties
+
+    if args.list_varieties:
+        for code, name in enumerate(varieties):
+            print(f"{code}: {' '.join(name.split())}")
+        return
+    if not args.input or not args.output:
+        parser.error("input and output files are required")
+
+    variety = args.variety
+    if variety is not None and variety.isdigit():
+        if int(variety) >= len(varieties):
+            parser.error(f"variety index must be below {len(varieties)} (see --list-varieties)")
+        variety = varieties[int(variety)]
+    elif variety is not None and variety not in varieties:
+        parser.error(f"unknown variety {variety!r} (see --list-varieties)")
+
+    rows, seconds = run(args.input, args.output, variety, args.chunk_size, args.gap_policy, tables)
+
+    rate = rows / seconds if seconds > 0 else float("inf")
+    peak = peak_rss_mb()
+    print(
+        f"Processed {rows} rows in {seconds:.2f} s ({rate:,.0f} rows/s), tables version {tables.version}",
+        file=sys.stderr,
+    )
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
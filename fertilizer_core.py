@@ -0,0 +1,192 @@
+"""
+Fertilizer recommendation tables and the F_r calculation shared by the
+Gradio app (fertilizer_app.py) and the batch tools.
+"""
+
+from fertilizer_index import NO_CLASS
+from fertilizer_tables import TABLE_FILE, load_tables
+
+# ------------------------------------
+# 1-3. STVI THRESHOLDS, RECOMMENDED RANGES PER VARIETY/YIELD,
+#      FERTILIZER CONVERSIONS
+# ------------------------------------
+# Maintained in fertilizer_tables.json. Compiled once at import (fails fast
+# on overlapping or unsorted ranges); long-running services that should
+# pick up edits without a restart use fertilizer_tables.TableStore and
+# pass its tables to the functions below.
+TABLES = load_tables(TABLE_FILE)
+TABLE_VERSION = TABLES.version
+STVI_THRESHOLDS = TABLES.thresholds
+VARIETY_OPTIONS = TABLES.variety_options
+FERTILIZER_CONVERSION = TABLES.conversions
+
+
+def classify_soil_test(nutrient, value, gap_policy=None, tables=None):
+    """
+    Determine the STVI class (Very Low, Low, Medium, etc.) for a given nutrient
+    based on the user-supplied soil test 'value'.
+
+    Values between two classes are handled per `gap_policy` (see
+    fertilizer_index.GAP_POLICIES); by default they have no class.
+    `tables` is a CompiledTables to use instead of TABLES.
+    """
+    if tables is None:
+        tables = TABLES
+    if nutrient not in tables:
+        return None
+
+    index = tables[nutrient].index
+    code = index.lookup(value, gap_policy)
+    if code == NO_CLASS:
+        return None
+    return index.names[code]
+
+def calculate_F_r(Uf, Ci, Cs, St, Ls):
+    """
+    Fertilizer requirement formula:
+      F_r = U_f - (C_i / C_s) * (S_t - L_s)
+    """
+    if Cs == 0:  # Avoid division by zero
+        return Uf
+    return Uf - (Ci / Cs) * (St - Ls)  # Corrected variable name to Ls
+
+# ------------------------------------
+# 5. MAIN CALCULATION LOGIC
+# ------------------------------------
+class NutrientRecommendation:
+    """
+    Result for one nutrient. When no recommendation could be made,
+    stvi_class / F_r may be None and `note` says why. `table_version` is
+    the version of the tables that produced it.
+    """
+
+    __slots__ = (
+        "nutrient", "soil_value", "stvi_class", "F_r", "product", "product_amount", "note", "table_version",
+    )
+
+    def __init__(self, nutrient, soil_value, stvi_class=None, F_r=None,
+                 product=None, product_amount=None, note=None, table_version=None):
+        self.nutrient = nutrient
+        self.soil_value = soil_value
+        self.stvi_class = stvi_class
+        self.F_r = F_r
+        self.product = product
+        self.product_amount = product_amount
+        self.note = note
+        self.table_version = table_version
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"NutrientRecommendation({fields})"
+
+
+def recommend_nutrient(nutrient_name, soil_value, variety_choice, gap_policy=None, tables=None):
+    """Compute the NutrientRecommendation for one soil test value."""
+    if tables is None:
+        tables = TABLES
+    version = tables.version
+    rec_dict = tables.variety_options[variety_choice]
+
+    stvi_class = classify_soil_test(nutrient_name, soil_value, gap_policy, tables)
+    if stvi_class is None:
+        return NutrientRecommendation(
+            nutrient_name, soil_value, note=f"Soil test value {soil_value} out of range or no data.",
+            table_version=version,
+        )
+
+    if nutrient_name not in rec_dict:
+        return NutrientRecommendation(
+            nutrient_name, soil_value, stvi_class, note=f"No recommendation data for {variety_choice}.",
+            table_version=version,
+        )
+    if stvi_class not in rec_dict[nutrient_name]:
+        return NutrientRecommendation(
+            nutrient_name, soil_value, stvi_class,
+            note=f"No recommended range for STVI class '{stvi_class}'.",
+            table_version=version,
+        )
+
+    (range_lo, range_hi) = rec_dict[nutrient_name][stvi_class]
+    # U_f = the upper limit of that recommended range
+    Uf = range_hi
+    Ci = range_hi - range_lo
+
+    # The STVI boundaries for that class
+    (class_lo, class_hi) = tables.thresholds[nutrient_name][stvi_class]
+    Ls = class_lo
+    Cs = class_hi - class_lo
+    St = soil_value
+
+    # Calculate F_r
+    Fr = calculate_F_r(Uf, Ci, Cs, St, Ls)
+    Fr = max(0, Fr)  # Ensure no negative
+
+    conversions = tables.conversions
+    if nutrient_name in conversions:
+        fert_prod = conversions[nutrient_name]["product"]
+        ratio = conversions[nutrient_name]["ratio"]
+        return NutrientRecommendation(
+            nutrient_name, soil_value, stvi_class, Fr, fert_prod, Fr * ratio, table_version=version
+        )
+    return NutrientRecommendation(nutrient_name, soil_value, stvi_class, Fr, table_version=version)
+
+
+def recommend_fertilizer(
+    soilN, soilP, soilK, soilS, soilZn, soilB,
+    variety_choice, gap_policy=None, tables=None
+):
+    """
+    Structured version of fertilizer_calculator: a list of
+    NutrientRecommendation, one per nutrient that has a soil value.
+    """
+    if tables is None:
+        tables = TABLES
+    tables.variety_options[variety_choice]  # unknown variety => KeyError, even with no inputs
+    return [
+        recommend_nutrient(nname, sval, variety_choice, gap_policy, tables)
+        for nname, sval in [
+            ("N",  soilN),
+            ("P",  soilP),
+            ("K",  soilK),
+            ("S",  soilS),
+            ("Zn", soilZn),
+            ("B",  soilB),
+        ]
+        if sval is not None  # user left it blank => skip
+    ]
+
+
+def format_recommendation(rec):
+    """One line of calculator output for a NutrientRecommendation."""
+    if rec.note is not None:
+        return f"{rec.nutrient}: {rec.note}"
+    if rec.product is not None:
+        return (
+            f"{rec.nutrient} - STVI: {rec.stvi_class} | "
+            f"Recommended Nutrient = {rec.F_r:.2f} kg/ha | "
+            f"{rec.product} needed ≈ {rec.product_amount:.2f} kg/ha"
+        )
+    return (
+        f"{rec.nutrient} - STVI: {rec.stvi_class} | "
+        f"Recommended Nutrient = {rec.F_r:.2f} kg/ha | "
+        f"No fertilizer product data."
+    )
+
+
+def fertilizer_calculator(
+    soilN, soilP, soilK, soilS, soilZn, soilB,
+    variety_choice, gap_policy=None, tables=None
+):
+    """Text output for the Gradio app, one line per nutrient."""
+    results = [
+        format_recommendation(rec)
+        for rec in recommend_fertilizer(
+            soilN, soilP, soilK, soilS, soilZn, soilB, variety_choice, gap_policy, tables
+        )
+    ]
+    if not results:
+        return "No valid nutrient inputs given."
+    return "\n".join(results)
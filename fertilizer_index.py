@@ -0,0 +1,209 @@
+"""
+Compiled lookup structures for the fertilizer tables.
+
+The dict tables (see fertilizer_tables) are compiled once into sorted boundary
+arrays: STVI lookups become a binary search (scalar) or a vectorized
+search (arrays) instead of a walk over every (lo, hi) tuple.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+# Class code used for missing values and values outside every STVI range
+NO_CLASS = -1
+
+# What to do with a value that falls in a gap between two STVI classes,
+# e.g. P = 6.05 between "Very Low" (0.0-6.0) and "Low" (6.1-12.0):
+#   "reject"  - no class (the original behaviour, reported as out of range)
+#   "lower"   - use the class below the gap
+#   "upper"   - use the class above the gap
+#   "nearest" - use whichever class boundary is closer (ties go lower)
+GAP_POLICIES = ("reject", "lower", "upper", "nearest")
+DEFAULT_GAP_POLICY = "reject"
+
+# Up to this many classes, counting comparisons beats np.searchsorted
+_LINEAR_SEARCH_MAX = 8
+
+
+def _check_gap_policy(gap_policy):
+    if gap_policy not in GAP_POLICIES:
+        raise ValueError(
+            f"Unknown gap policy {gap_policy!r}; expected one of {', '.join(GAP_POLICIES)}."
+        )
+    return gap_policy
+
+
+class ThresholdIndex:
+    """
+    Sorted, validated STVI class boundaries for one nutrient.
+
+    `classes` maps class name -> (lo, hi), both inclusive, in ascending
+    order. Raises ValueError for inverted, unsorted or overlapping ranges.
+    """
+
+    def __init__(self, classes, nutrient="", gap_policy=DEFAULT_GAP_POLICY):
+        self.nutrient = nutrient
+        self.gap_policy = _check_gap_policy(gap_policy)
+        self.names = tuple(classes)
+
+        prev_name, prev_hi = None, None
+        for name, (lo, hi) in classes.items():
+            if not lo <= hi:
+                raise ValueError(f"{nutrient} '{name}': lower bound {lo} is above upper bound {hi}.")
+            if prev_hi is not None and not prev_hi < lo:
+                raise ValueError(
+                    f"{nutrient} '{name}' ({lo}-{hi}) overlaps or is not sorted after "
+                    f"'{prev_name}' (ends at {prev_hi})."
+                )
+            prev_name, prev_hi = name, hi
+
+        bounds = [classes[name] for name in self.names]
+        self._lo = [float(lo) for lo, _ in bounds]
+        self._hi = [float(hi) for _, hi in bounds]
+        self.lo = np.array(self._lo, dtype=np.float64)
+        self.hi = np.array(self._hi, dtype=np.float64)
+        # Padded so that gathering with NO_CLASS (-1) never matches
+        self._hi_pad = np.append(self.hi, -np.inf)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, value, gap_policy=None):
+        """Class code for a single value, or NO_CLASS."""
+        if value != value:  # NaN
+            return NO_CLASS
+        i = bisect_right(self._lo, value) - 1
+        if i < 0:
+            return NO_CLASS
+        if value <= self._hi[i]:
+            return i
+        if i == len(self._lo) - 1:
+            return NO_CLASS  # above the last class
+
+        policy = self.gap_policy if gap_policy is None else _check_gap_policy(gap_policy)
+        if policy == "lower":
+            return i
+        if policy == "upper":
+            return i + 1
+        if policy == "nearest":
+            return i + 1 if self._lo[i + 1] - value < value - self._hi[i] else i
+        return NO_CLASS
+
+    def lookup_array(self, values, gap_policy=None):
+        """Class codes (intp) for an array of values; NO_CLASS where none."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(self._lo) <= _LINEAR_SEARCH_MAX:
+            # Number of lower bounds <= value; NaN compares False everywhere
+            idx = np.full(values.shape, NO_CLASS, dtype=np.intp)
+            for lo in self._lo:
+                idx += values >= lo
+        else:
+            idx = np.searchsorted(self.lo, values, side="right") - 1
+
+        outside = ~(values <= self._hi_pad.take(idx))
+        policy = self.gap_policy if gap_policy is None else _check_gap_policy(gap_policy)
+        if policy != "reject":
+            # Inside a gap: above class idx but below the last class
+            in_gap = outside & (idx >= 0) & (idx < len(self._lo) - 1)
+            if in_gap.any():
+                gap_idx = idx[in_gap]
+                gap_values = values[in_gap]
+                if policy == "upper":
+                    gap_idx = gap_idx + 1
+                elif policy == "nearest":
+                    closer_above = self.lo[gap_idx + 1] - gap_values < gap_values - self.hi[gap_idx]
+                    gap_idx = gap_idx + closer_above
+                idx[in_gap] = gap_idx
+                outside &= ~in_gap
+        idx[outside] = NO_CLASS
+        return idx
+
+
+class NutrientTable:
+    """
+    Everything needed to compute F_r for one nutrient: the STVI index, the
+    recommended ranges for every variety as (variety, class) arrays, and the
+    fertilizer product conversion.
+    """
+
+    def __init__(self, index, rec_bounds, conversion):
+        self.index = index
+        n_varieties, n_classes = rec_bounds.shape[:2]
+        self.rec_lo = rec_bounds[:, :, 0]
+        self.rec_hi = rec_bounds[:, :, 1]
+        self.product = conversion["product"] if conversion else None
+        self.ratio = conversion["ratio"] if conversion else np.nan
+
+        # U_f is the upper limit of the recommended range, C_i its width,
+        # C_s the width of the STVI class. Precomputing C_i / C_s keeps the
+        # same rounding as calculate_F_r.
+        Uf = self.rec_hi
+        Ci = Uf - self.rec_lo
+        Cs = index.hi - index.lo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(Cs == 0, 0.0, Ci / Cs)
+
+        # Flattened (variety, class) tables with one NaN padding column, so
+        # that gathering with NO_CLASS (-1) gives NaN without a mask pass.
+        pad = np.full((n_varieties, 1), np.nan)
+        self.stride = n_classes + 1
+        self.Uf = np.hstack([Uf, pad]).ravel()
+        self.slope = np.hstack([slope, pad]).ravel()
+        self.Ls = np.append(index.lo, np.nan)
+
+
+class CompiledTables:
+    """
+    The STVI thresholds, variety recommendation ranges and fertilizer
+    conversions compiled into per-nutrient NutrientTable objects.
+
+    Every nutrient must list the same STVI classes in the same ascending
+    order, and every variety must give a (lo, hi) range with lo <= hi for
+    each class it lists. Missing classes compile to NaN ranges.
+
+    `version` identifies the table data (see fertilizer_tables); the source
+    dicts are kept as `thresholds`, `variety_options` and `conversions`.
+    """
+
+    def __init__(self, thresholds, variety_options, conversions, gap_policy=DEFAULT_GAP_POLICY,
+                 version=None):
+        self.gap_policy = _check_gap_policy(gap_policy)
+        self.version = version
+        self.thresholds = thresholds
+        self.variety_options = variety_options
+        self.conversions = conversions
+        self.nutrients = tuple(thresholds)
+        self.varieties = tuple(variety_options)
+        self.variety_codes = {name: code for code, name in enumerate(self.varieties)}
+
+        self.classes = None
+        self.tables = {}
+        for nutrient in self.nutrients:
+            index = ThresholdIndex(thresholds[nutrient], nutrient, gap_policy)
+            if self.classes is None:
+                self.classes = index.names
+            elif index.names != self.classes:
+                raise ValueError(f"{nutrient}: STVI classes {index.names} differ from {self.classes}.")
+
+            rec_bounds = np.full((len(self.varieties), len(index), 2), np.nan)
+            for v, variety in enumerate(self.varieties):
+                for c, stvi_class in enumerate(index.names):
+                    bounds = variety_options[variety].get(nutrient, {}).get(stvi_class)
+                    if bounds is None:
+                        continue
+                    lo, hi = bounds
+                    if not lo <= hi:
+                        raise ValueError(
+                            f"{variety!r} {nutrient} '{stvi_class}': lower bound {lo} "
+                            f"is above upper bound {hi}."
+                        )
+                    rec_bounds[v, c] = (lo, hi)
+
+            self.tables[nutrient] = NutrientTable(index, rec_bounds, conversions.get(nutrient))
+
+    def __getitem__(self, nutrient):
+        return self.tables[nutrient]
+
+    def __contains__(self, nutrient):
+        return nutrient in self.tables
@@ -0,0 +1,209 @@
+"""
+Spatial interpolation of scattered soil tests onto fields or grids.
+
+Soil samples with coordinates are indexed in a KD-tree (scipy cKDTree);
+every target point (field centroid or grid cell) is filled from its k
+nearest samples by inverse-distance weighting, or by the plain mean of the
+k nearest ("nearest", k=1 is nearest-neighbour). Queries are vectorized,
+so hundreds of thousands of targets take seconds instead of the all-pairs
+distance loop. Interpolated columns go straight into fertilizer_batch.
+
+    python fertilizer_interpolate.py samples.csv fields.csv out.csv --lonlat --variety 0
+
+Samples need x/y (or lon/lat with --lonlat) and any of N, P, K, S, Zn, B
+(blank = not tested). Targets need the same coordinate columns; their
+other columns, including `variety`, are copied to the output.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from fertilizer_batch import NUTRIENTS, VARIETIES
+from fertilizer_cli import DEFAULT_CHUNK_SIZE, ChunkWriter, read_chunks, recommend_chunk
+from fertilizer_index import DEFAULT_GAP_POLICY, GAP_POLICIES
+from perf_utils import peak_rss_mb
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+METHODS = ("idw", "nearest")
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def project_lonlat(lon, lat, lat0):
+    """
+    Equirectangular projection to metres around latitude lat0. Accurate to
+    well under 1% over a district, which is plenty for neighbour weights.
+    """
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    return np.column_stack((EARTH_RADIUS_M * np.cos(np.radians(lat0)) * lon, EARTH_RADIUS_M * lat))
+
+
+class SoilInterpolator:
+    """
+    KD-tree interpolator over soil samples.
+
+    `values` maps nutrient -> array of soil test values at (x, y); NaN marks
+    an untested nutrient, so each nutrient only uses the samples that have
+    it (nutrients tested at the same points share one tree). With
+    `lonlat`, x and y are longitude and latitude in degrees and distances
+    are in metres. Targets with no sample within `max_distance` get NaN.
+    """
+
+    def __init__(self, x, y, values, k=8, power=2.0, method="idw", max_distance=None, lonlat=False):
+        if not HAS_SCIPY:
+            raise ImportError("scipy is required for spatial interpolation.")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}. Expected one of {', '.join(METHODS)}.")
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+        self.k = k
+        self.power = power
+        self.method = method
+        self.max_distance = np.inf if max_distance is None else max_distance
+        self.lat0 = float(np.nanmean(y)) if lonlat else None
+
+        points = self._project(x, y)
+        trees = {}
+        self._tables = {}
+        for nutrient, column in values.items():
+            column = np.asarray(column, dtype=np.float64)
+            valid = ~np.isnan(column) & np.isfinite(points).all(axis=1)
+            if not valid.any():
+                raise ValueError(f"No {nutrient} samples with coordinates to interpolate from.")
+            key = valid.tobytes()
+            if key not in trees:
+                trees[key] = cKDTree(points[valid])
+            self._tables[nutrient] = (trees[key], column[valid])
+
+    def _project(self, x, y):
+        if self.lat0 is not None:
+            return project_lonlat(x, y, self.lat0)
+        return np.column_stack((np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)))
+
+    def interpolate(self, x, y):
+        """{nutrient: interpolated values} at the target points."""
+        targets = self._project(x, y)
+        finite = np.isfinite(targets).all(axis=1)
+        # Query each tree once, whichever nutrients use it
+        neighbours = {}
+        out = {}
+        for nutrient, (tree, column) in self._tables.items():
+            if id(tree) not in neighbours:
+                neighbours[id(tree)] = self._query(tree, targets, finite)
+            dist, idx = neighbours[id(tree)]
+            out[nutrient] = self._combine(dist, idx, column)
+        return out
+
+    def _query(self, tree, targets, finite):
+        k = min(self.k, tree.n)
+        dist = np.full((len(targets), k), np.inf)
+        idx = np.full((len(targets), k), tree.n, dtype=np.intp)
+        d, i = tree.query(targets[finite], k=k, distance_upper_bound=self.max_distance, workers=-1)
+        dist[finite], idx[finite] = d.reshape(-1, k), i.reshape(-1, k)
+        return dist, idx
+
+    def _combine(self, dist, idx, column):
+        # Missing neighbours come back as inf distance / index tree.n: pad
+        # the column with a NaN there and give them zero weight
+        padded = np.append(column, np.nan)
+        found = np.isfinite(dist)
+        neighbour_values = np.where(found, padded.take(idx), 0.0)
+
+        if self.method == "nearest":
+            weights = found.astype(np.float64)
+        else:
+            with np.errstate(divide="ignore"):
+                weights = np.where(found, dist ** -self.power, 0.0)
+            # A target on top of a sample takes that sample's value
+            exact = dist == 0
+            hit = exact.any(axis=1)
+            weights[hit] = exact[hit]
+
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = (weights * neighbour_values).sum(axis=1) / total
+        result[total == 0] = np.nan
+        return result
+
+
+def interpolate_chunk(interpolator, chunk, x_col, y_col):
+    """Copy of chunk with the interpolated nutrient columns added."""
+    out = chunk.copy()
+    for nutrient, values in interpolator.interpolate(chunk[x_col], chunk[y_col]).items():
+        out[nutrient] = values
+    return out
+
+
+def run(samples_path, targets_path, output_path, x_col="x", y_col="y", variety=None,
+        chunk_size=DEFAULT_CHUNK_SIZE, gap_policy=None, **options):
+    """Interpolate and recommend for every target; returns (targets, seconds)."""
+    start = time.perf_counter()
+    samples = pd.concat(read_chunks(samples_path, chunk_size), ignore_index=True)
+    values = {nutrient: samples[nutrient] for nutrient in NUTRIENTS if nutrient in samples}
+    if not values:
+        raise SystemExit(f"{samples_path} has none of the columns {', '.join(NUTRIENTS)}.")
+    interpolator = SoilInterpolator(samples[x_col], samples[y_col], values, **options)
+
+    writer = ChunkWriter(output_path)
+    rows = 0
+    try:
+        for chunk in read_chunks(targets_path, chunk_size):
+            chunk = interpolate_chunk(interpolator, chunk, x_col, y_col)
+            writer.write(recommend_chunk(chunk, variety, gap_policy))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interpolate soil tests to fields and recommend fertilizer.")
+    parser.add_argument("samples", help="CSV, Parquet or Arrow file of soil samples with coordinates")
+    parser.add_argument("targets", help="CSV, Parquet or Arrow file of field centroids / grid cells")
+    parser.add_argument("output", help="CSV or Parquet file to write")
+    parser.add_argument("--lonlat", action="store_true", help="coordinates are lon/lat degrees (columns lon, lat)")
+    parser.add_argument("--x", help="x / longitude column (default: x, or lon with --lonlat)")
+    parser.add_argument("--y", help="y / latitude column (default: y, or lat with --lonlat)")
+    parser.add_argument("--method", choices=METHODS, default="idw")
+    parser.add_argument("--k", type=int, default=8, help="neighbours per target")
+    parser.add_argument("--power", type=float, default=2.0, help="IDW distance power")
+    parser.add_argument("--max-distance", type=float, help="ignore samples further away (metres with --lonlat)")
+    parser.add_argument("--variety", help="variety name or index for every target (default: the 'variety' column)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="targets per chunk")
+    parser.add_argument("--gap-policy", choices=GAP_POLICIES, default=DEFAULT_GAP_POLICY)
+    args = parser.parse_args(argv)
+
+    if not HAS_SCIPY:
+        raise SystemExit("scipy is required for spatial interpolation; install it first.")
+    x_col = args.x or ("lon" if args.lonlat else "x")
+    y_col = args.y or ("lat" if args.lonlat else "y")
+
+    variety = args.variety
+    if variety is not None and variety.isdigit():
+        if int(variety) >= len(VARIETIES):
+            parser.error(f"variety index must be below {len(VARIETIES)}")
+        variety = VARIETIES[int(variety)]
+
+    rows, seconds = run(
+        args.samples, args.targets, args.output, x_col, y_col, variety, args.chunk_size, args.gap_policy,
+        k=args.k, power=args.power, method=args.method, max_distance=args.max_distance, lonlat=args.lonlat,
+    )
+
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"Interpolated {rows} targets in {seconds:.2f} s ({rate:,.0f} targets/s)", file=sys.stderr)
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Raster mode: fertilizer recommendations for gridded soil nutrient maps.
+
+Each nutrient layer is a 2-D .npy array (NaN = no data) that is memory
+mapped and processed tile by tile with the vectorized recommendation math.
+For each layer, F_r and product amount rasters (and optionally the STVI
+class codes) are written as memory-mapped .npy files, so peak memory
+depends on the tile size, not the map size: the files are mapped again
+for every (rows x cols) tile, so resident pages stay bounded by one tile
+however wide the map is.
+
+    python fertilizer_raster.py out_dir --variety 0 --layer N=n.npy --layer P=p.npy
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from fertilizer_batch import NUTRIENTS, VARIETIES, encode_varieties, recommend_nutrient
+from fertilizer_index import DEFAULT_GAP_POLICY, GAP_POLICIES
+from perf_utils import peak_rss_mb
+
+DEFAULT_TILE = (1024, 1024)
+
+
+def _tiles(shape, tile):
+    """(rows, cols) slice pairs of each tile, row by row."""
+    rows, cols = shape
+    tile_rows, tile_cols = tile
+    for r in range(0, rows, tile_rows):
+        for c in range(0, cols, tile_cols):
+            yield slice(r, min(r + tile_rows, rows)), slice(c, min(c + tile_cols, cols))
+
+
+def recommend_raster(layers, variety, out_dir, tile=DEFAULT_TILE, gap_policy=None,
+                     dtype=np.float32, write_classes=False):
+    """
+    `layers` maps nutrient -> path of a 2-D .npy soil test layer; all layers
+    must have the same shape. Writes <nutrient>_F_r.npy and
+    <nutrient>_product.npy (plus <nutrient>_class.npy, int8 with -1 for no
+    class, if write_classes) to out_dir. Returns {nutrient: {name: path}}.
+    """
+    unknown = set(layers) - set(NUTRIENTS)
+    if unknown:
+        raise ValueError(f"Unknown nutrient layer(s): {', '.join(sorted(unknown))}.")
+
+    shapes = {np.load(path, mmap_mode="r").shape for path in layers.values()}
+    if len(shapes) != 1 or len(next(iter(shapes))) != 2:
+        raise ValueError(f"Layers must be 2-D and share one shape, got {sorted(shapes)}.")
+    shape = shapes.pop()
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for nutrient in layers:
+        names = {"F_r": dtype, "product": dtype}
+        if write_classes:
+            names["class"] = np.int8
+        paths[nutrient] = {}
+        for name, out_dtype in names.items():
+            path = os.path.join(out_dir, f"{nutrient}_{name}.npy")
+            # Create the file with its .npy header; tiles are written below
+            np.lib.format.open_memmap(path, mode="w+", dtype=out_dtype, shape=shape).flush()
+            paths[nutrient][name] = path
+
+    variety_code = encode_varieties(variety, 1)[0]
+    for rows, cols in _tiles(shape, tile):
+        for nutrient, layer_path in layers.items():
+            # Map the files again for every tile and drop the maps afterwards,
+            # so resident pages never exceed one tile per file
+            src = np.load(layer_path, mmap_mode="r")
+            out = {name: np.load(path, mmap_mode="r+") for name, path in paths[nutrient].items()}
+            values = np.asarray(src[rows, cols], dtype=np.float64)
+            codes = np.full(values.size, variety_code, dtype=np.intp)
+            result = recommend_nutrient(nutrient, values.ravel(), codes, gap_policy)
+            out["F_r"][rows, cols] = result["F_r"].reshape(values.shape)
+            out["product"][rows, cols] = result["product_amount"].reshape(values.shape)
+            if write_classes:
+                out["class"][rows, cols] = result["stvi_class"].reshape(values.shape)
+            for array in out.values():
+                array.flush()
+            del src, out
+    return paths
+
+
+def _parse_layer(text):
+    nutrient, sep, path = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NUTRIENT=path.npy, got {text!r}")
+    return nutrient, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fertilizer recommendation rasters from nutrient grids.")
+    parser.add_argument("out_dir", help="directory for the output .npy rasters")
+    parser.add_argument("--layer", type=_parse_layer, action="append", required=True,
+                        help="NUTRIENT=path.npy, repeat for each layer")
+    parser.add_argument("--variety", required=True, help="variety name or index")
+    parser.add_argument("--tile", type=int, nargs=2, default=DEFAULT_TILE, metavar=("ROWS", "COLS"))
+    parser.add_argument("--gap-policy", choices=GAP_POLICIES, default=DEFAULT_GAP_POLICY)
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32")
+    parser.add_argument("--classes", action="store_true", help="also write STVI class code rasters")
+    args = parser.parse_args(argv)
+
+    variety = args.variety
+    if variety.isdigit():
+        if int(variety) >= len(VARIETIES):
+            parser.error(f"variety index must be below {len(VARIETIES)}")
+        variety = VARIETIES[int(variety)]
+    elif variety not in VARIETIES:
+        parser.error(f"unknown variety {variety!r}; give a variety name or an index below {len(VARIETIES)}")
+
+    start = time.perf_counter()
+    paths = recommend_raster(
+        dict(args.layer), variety, args.out_dir, tuple(args.tile), args.gap_policy,
+        np.dtype(args.dtype), args.classes,
+    )
+    seconds = time.perf_counter() - start
+
+    cells = np.load(next(iter(paths.values()))["F_r"], mmap_mode="r").size
+    rate = cells * len(paths) / seconds if seconds > 0 else float("inf")
+    print(f"Processed {len(paths)} layer(s) of {cells} cells in {seconds:.2f} s "
+          f"({rate:,.0f} cells/s)", file=sys.stderr)
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Versioned recommendation tables (fertilizer_tables.json) with hot reload.
+
+The STVI thresholds, variety recommendation ranges and fertilizer
+conversions live in a JSON data file with a "version" string. Each version
+is compiled once into a CompiledTables. A TableStore watches the file and,
+when it changes, compiles the new version and swaps it in with a single
+reference assignment: callers take `store.current()` once per request or
+batch, so in-flight work finishes on the version it started with and
+every result can be tagged with that version. A file that fails to load
+or validate is reported and the previous version stays in service.
+
+Replace the file atomically (write_table_file does this) so a reader
+never sees it half written. The Next.js route reads the compiled
+fertilizer_tables.bin instead; rebuild it after a new version goes in
+(it reloads the file when it changes):
+
+    python fertilizer_tables.py check new_tables.json
+    python fertilizer_artifact.py check --rebuild
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from fertilizer_index import DEFAULT_GAP_POLICY, CompiledTables
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fertilizer_tables.json")
+
+# Seconds between file checks in TableStore.current()
+DEFAULT_CHECK_INTERVAL = 2.0
+
+
+def _ranges(table, name):
+    if not isinstance(table, dict):
+        raise ValueError(f"{name} must be an object.")
+    out = {}
+    for key, value in table.items():
+        if isinstance(value, dict):
+            out[key] = _ranges(value, f"{name}.{key}")
+        elif isinstance(value, list) and len(value) == 2:
+            out[key] = tuple(value)
+        else:
+            raise ValueError(f"{name}.{key} must be a [lo, hi] pair.")
+    return out
+
+
+def read_table_file(path=TABLE_FILE):
+    """
+    Parse a table file into {"version", "stvi_thresholds", "variety_options",
+    "fertilizer_conversion", "units"} with (lo, hi) tuples, as the tables
+    were written in fertilizer_core. Raises ValueError if it is malformed.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object.")
+    missing = {"version", "stvi_thresholds", "variety_options", "fertilizer_conversion"} - set(data)
+    if missing:
+        raise ValueError(f"{path}: missing {', '.join(sorted(missing))}.")
+    if not isinstance(data["version"], str) or not data["version"]:
+        raise ValueError(f"{path}: version must be a non-empty string.")
+    return {
+        "version": data["version"],
+        "units": data.get("units", {}),
+        "stvi_thresholds": _ranges(data["stvi_thresholds"], "stvi_thresholds"),
+        "variety_options": _ranges(data["variety_options"], "variety_options"),
+        "fertilizer_conversion": data["fertilizer_conversion"],
+    }
+
+
+def load_tables(path=TABLE_FILE, gap_policy=DEFAULT_GAP_POLICY):
+    """Read and compile a table file; raises ValueError if it is invalid."""
+    data = read_table_file(path)
+    return CompiledTables(
+        data["stvi_thresholds"], data["variety_options"], data["fertilizer_conversion"],
+        gap_policy, version=data["version"],
+    )
+
+
+def write_table_file(data, path=TABLE_FILE):
+    """
+    Atomically replace `path` with `data` (same layout as read_table_file).
+    The new file is written next to the old one and renamed over it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".fertilizer_tables.", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class TableStore:
+    """
+    The current CompiledTables for a table file, reloaded when the file's
+    modification time or size changes. current() stats the file at most
+    once every `check_interval` seconds, so it is cheap to call per request.
+    """
+
+    def __init__(self, path=TABLE_FILE, check_interval=DEFAULT_CHECK_INTERVAL, tables=None):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        # An already compiled copy of this file can be passed in to skip a compile
+        self._tables = tables if tables is not None else load_tables(path)
+        self._next_check = time.monotonic() + check_interval
+
+    @property
+    def version(self):
+        return self._tables.version
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self):
+        """The tables to use for the next request or batch."""
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._tables
+
+    def refresh(self):
+        """
+        Reload now if the file changed. Returns True when a new version was
+        swapped in. Only one thread reloads; the others keep the current one.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                stamp = self._file_stamp()
+            except OSError as e:
+                self._report(e)
+                return False
+            if stamp == self._stamp:
+                return False
+            # Record the stamp first, so a bad file is reported once rather
+            # than recompiled on every check until it is fixed
+            self._stamp = stamp
+            try:
+                tables = load_tables(self.path)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                self._report(e)
+                return False
+            self._tables = tables
+            self.last_error = None
+            self.reloads += 1
+            print(f"Loaded fertilizer tables version {tables.version} from {self.path}", file=sys.stderr)
+            return True
+        finally:
+            self._lock.release()
+
+    def _report(self, error):
+        self.last_error = error
+        print(
+            f"Keeping fertilizer tables version {self._tables.version}; "
+            f"could not load {self.path}: {error}",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a fertilizer table file.")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("path", nargs="?", default=TABLE_FILE)
+    args = parser.parse_args(argv)
+
+    try:
+        tables = load_tables(args.path)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        raise SystemExit(f"{args.path}: {e}")
+    print(
+        f"{args.path}: version {tables.version}, {len(tables.nutrients)} nutrients, "
+        f"{len(tables.varieties)} varieties"
+    )
+
+
+if __name__ == "__main__":
+    main()
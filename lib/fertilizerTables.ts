@@ -0,0 +1,191 @@
+import { readFileSync, statSync } from "fs";
+import path from "path";
+
+// Reader for fertilizer_tables.bin, built by `python fertilizer_artifact.py build`.
+// See fertilizer_artifact.py for the file layout.
+//
+// The file is reloaded when its modification time or size changes, checked
+// at most every CHECK_INTERVAL_MS, as fertilizer_tables.py does for the
+// JSON tables. A file that fails to load is reported and the previous
+// tables stay in service.
+
+const MAGIC = "FRTB";
+const FORMAT_VERSION = 1;
+const CHECK_INTERVAL_MS = 2000;
+
+type ArraySpec = { offset: number; shape: number[] };
+
+type Header = {
+  version?: string | null;
+  nutrients: string[];
+  classes: string[];
+  varieties: string[];
+  products: (string | null)[];
+  arrays: Record<"lo" | "hi" | "intercept" | "slope" | "ratio", ArraySpec>;
+};
+
+export type FertilizerTables = {
+  version: string | null;
+  nutrients: string[];
+  classes: string[];
+  varieties: string[];
+  products: (string | null)[];
+  lo: Float64Array;
+  hi: Float64Array;
+  intercept: Float64Array;
+  slope: Float64Array;
+  ratio: Float64Array;
+};
+
+export type NutrientRecommendation = {
+  stviClass: string;
+  Fr: number;
+  product: string | null;
+  productAmount: number;
+};
+
+type Cached = {
+  tables: FertilizerTables;
+  stamp: string;
+  nextCheck: number;
+};
+
+const cache = new Map<string, Cached>();
+
+const fileStamp = (file: string) => {
+  const stat = statSync(file);
+  return `${stat.mtimeMs}:${stat.size}`;
+};
+
+export function loadFertilizerTables(
+  file: string = path.join(process.cwd(), "fertilizer_tables.bin")
+): FertilizerTables {
+  const cached = cache.get(file);
+  const now = Date.now();
+  if (cached && now < cached.nextCheck) {
+    return cached.tables;
+  }
+
+  let stamp: string;
+  try {
+    stamp = fileStamp(file);
+  } catch (error) {
+    if (!cached) {
+      throw error;
+    }
+    cached.nextCheck = now + CHECK_INTERVAL_MS;
+    console.error(`Keeping fertilizer tables version ${cached.tables.version}: ${error}`);
+    return cached.tables;
+  }
+  if (cached) {
+    cached.nextCheck = now + CHECK_INTERVAL_MS;
+    if (stamp === cached.stamp) {
+      return cached.tables;
+    }
+    // Record the stamp first, so a bad file is reported once rather than
+    // reread on every check until it is fixed
+    cached.stamp = stamp;
+  }
+
+  try {
+    const tables = readTables(file);
+    cache.set(file, { tables, stamp, nextCheck: now + CHECK_INTERVAL_MS });
+    if (cached) {
+      console.error(`Loaded fertilizer tables version ${tables.version} from ${file}`);
+    }
+    return tables;
+  } catch (error) {
+    if (!cached) {
+      throw error;
+    }
+    console.error(
+      `Keeping fertilizer tables version ${cached.tables.version}; could not load ${file}: ${error}`
+    );
+    return cached.tables;
+  }
+}
+
+function readTables(file: string): FertilizerTables {
+  const raw = readFileSync(file);
+  // Copy into an 8-byte aligned buffer so the Float64Array views are valid
+  const buffer = new ArrayBuffer(raw.length);
+  new Uint8Array(buffer).set(raw);
+  const view = new DataView(buffer);
+
+  if (raw.subarray(0, 4).toString("ascii") !== MAGIC) {
+    throw new Error(`${file} is not a fertilizer tables artifact.`);
+  }
+  const version = view.getUint32(4, true);
+  if (version !== FORMAT_VERSION) {
+    throw new Error(`${file}: unsupported artifact format version ${version}.`);
+  }
+  const headerLength = view.getUint32(8, true);
+  const header: Header = JSON.parse(raw.subarray(12, 12 + headerLength).toString("utf-8"));
+  const dataStart = 12 + headerLength;
+
+  const array = (spec: ArraySpec) => {
+    const size = spec.shape.reduce((a, b) => a * b, 1);
+    return new Float64Array(buffer, dataStart + spec.offset * 8, size);
+  };
+
+  return {
+    version: header.version ?? null,
+    nutrients: header.nutrients,
+    classes: header.classes,
+    varieties: header.varieties,
+    products: header.products,
+    lo: array(header.arrays.lo),
+    hi: array(header.arrays.hi),
+    intercept: array(header.arrays.intercept),
+    slope: array(header.arrays.slope),
+    ratio: array(header.arrays.ratio),
+  };
+}
+
+// Index of the last class whose lower bound is <= value, or -1
+const classIndex = (lo: Float64Array, start: number, count: number, value: number) => {
+  let left = 0;
+  let right = count;
+  while (left < right) {
+    const mid = (left + right) >> 1;
+    if (lo[start + mid] <= value) {
+      left = mid + 1;
+    } else {
+      right = mid;
+    }
+  }
+  return left - 1;
+};
+
+/**
+ * Recommendation for one soil test value, or null when the value is
+ * outside every STVI class. Fr is NaN when the variety has no
+ * recommended range for that class.
+ */
+export function recommendNutrient(
+  tables: FertilizerTables,
+  nutrient: string,
+  variety: string,
+  value: number
+): NutrientRecommendation | null {
+  const n = tables.nutrients.indexOf(nutrient);
+  const v = tables.varieties.indexOf(variety);
+  if (n < 0 || v < 0) {
+    return null;
+  }
+
+  const k = tables.classes.length;
+  const c = classIndex(tables.lo, n * k, k, value);
+  if (c < 0 || !(value <= tables.hi[n * k + c])) {
+    return null;
+  }
+
+  const at = (v * tables.nutrients.length + n) * k + c;
+  const Fr = Math.max(0, tables.intercept[at] + tables.slope[at] * value);
+  return {
+    stviClass: tables.classes[c],
+    Fr,
+    product: tables.products[n],
+    productAmount: Fr * tables.ratio[n],
+  };
+}
@@ -0,0 +1,143 @@
+import { spawn } from "child_process";
+import { existsSync } from "fs";
+import net from "net";
+import path from "path";
+import type { Readable, Writable } from "stream";
+
+// Client for `scripts/predict_yield.py --serve`. Requests and responses are
+// line-delimited JSON matched by "id", so any number of requests can be in
+// flight on one connection.
+//
+// With YIELD_SERVER_ADDRESS set ("host:port" or a Unix socket path) it
+// connects to an already running server. Otherwise it starts one warm
+// `--serve --stdio` process per Next.js server and reuses it.
+
+export type YieldExplanation = {
+  base_value: number;
+  contributions: Record<string, number>;
+};
+
+export type YieldResponse = {
+  prediction?: string;
+  explanation?: YieldExplanation | null;
+  // Rainfall/temperature filled in from climate normals for lat/lon requests
+  climate?: Record<string, number>;
+  error?: string;
+};
+
+type Pending = {
+  resolve: (response: YieldResponse) => void;
+  reject: (error: Error) => void;
+};
+
+type Connection = {
+  input: Writable;
+  pending: Map<number, Pending>;
+  close: () => void;
+};
+
+// A request without a response by then is rejected (YIELD_REQUEST_TIMEOUT_MS)
+const REQUEST_TIMEOUT_MS = Number(process.env.YIELD_REQUEST_TIMEOUT_MS) || 30_000;
+
+let connection: Connection | null = null;
+let nextId = 1;
+
+function getPythonPath(): string {
+  const venvPython = path.join(process.cwd(), ".venv", "bin", "python");
+  if (existsSync(venvPython)) {
+    return venvPython;
+  }
+  return "python3";
+}
+
+function attach(output: Readable, input: Writable, close: () => void): Connection {
+  const conn: Connection = { input, pending: new Map(), close };
+  let buffered = "";
+
+  output.on("data", (chunk: Buffer) => {
+    buffered += chunk.toString("utf-8");
+    let newline = buffered.indexOf("\n");
+    while (newline >= 0) {
+      const line = buffered.slice(0, newline).trim();
+      buffered = buffered.slice(newline + 1);
+      newline = buffered.indexOf("\n");
+      if (!line) {
+        continue;
+      }
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        // The stream is out of sync: fail everything in flight and reconnect
+        fail(conn, new Error(`Invalid response from yield server: ${line.slice(0, 200)}`));
+        return;
+      }
+      const { id, ...response } = message;
+      const request = conn.pending.get(id);
+      if (request) {
+        conn.pending.delete(id);
+        request.resolve(response);
+      }
+    }
+  });
+  return conn;
+}
+
+function fail(conn: Connection, error: Error) {
+  if (connection === conn) {
+    connection = null;
+  }
+  for (const request of conn.pending.values()) {
+    request.reject(error);
+  }
+  conn.pending.clear();
+  conn.close();
+}
+
+function connect(): Connection {
+  const address = process.env.YIELD_SERVER_ADDRESS;
+  if (address) {
+    const [host, port] = address.split(":");
+    const socket = port ? net.connect(Number(port), host) : net.connect(address);
+    const conn = attach(socket, socket, () => socket.destroy());
+    socket.on("error", (error) => fail(conn, error));
+    socket.on("close", () => fail(conn, new Error("Yield server connection closed")));
+    return conn;
+  }
+
+  const scriptPath = path.join(process.cwd(), "scripts", "predict_yield.py");
+  const proc = spawn(getPythonPath(), [scriptPath, "--serve", "--stdio"], {
+    cwd: process.cwd(),
+    stdio: ["pipe", "pipe", "inherit"],
+  });
+  const conn = attach(proc.stdout, proc.stdin, () => proc.kill());
+  proc.on("error", (error) => fail(conn, error));
+  proc.on("exit", (code) => fail(conn, new Error(`Yield server exited with code ${code}`)));
+  proc.stdin.on("error", (error) => fail(conn, error));
+  return conn;
+}
+
+export function predictYield(input: Record<string, unknown>): Promise<YieldResponse> {
+  if (!connection) {
+    connection = connect();
+  }
+  const conn = connection;
+  const id = nextId++;
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      conn.pending.delete(id);
+      reject(new Error(`Yield request timed out after ${REQUEST_TIMEOUT_MS} ms`));
+    }, REQUEST_TIMEOUT_MS);
+    conn.pending.set(id, {
+      resolve: (response) => {
+        clearTimeout(timer);
+        resolve(response);
+      },
+      reject: (error) => {
+        clearTimeout(timer);
+        reject(error);
+      },
+    });
+    conn.input.write(JSON.stringify({ ...input, id }) + "\n");
+  });
+}
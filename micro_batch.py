@@ -0,0 +1,133 @@
+"""
+Dynamic micro-batching: callers submit single items and a scheduler
+thread runs them through a batch function together.
+
+The scheduler takes the oldest waiting item and keeps collecting until
+the batch is full (max_batch) or that item has waited max_wait_ms, then
+makes one batch call and hands each caller its own result. Under load the
+queue refills while a batch runs, so batches fill without waiting; when
+idle, an item waits at most max_wait_ms. Larger limits trade latency for
+throughput; stats() reports queue depth, batch sizes and wait times to
+tune them.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 10.0
+RECENT = 1000  # requests/batches kept for the latency percentiles
+
+_STOP = object()
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] for p in (50, 90, 99)}
+
+
+class MicroBatcher:
+    """
+    Runs `run_batch(items) -> results` (one result per item, in order) on
+    a scheduler thread. A batch that raises fails all of its callers.
+    """
+
+    def __init__(self, run_batch, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, name="batcher"):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative.")
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._batch_sizes = Counter()
+        self._wait_ms = deque(maxlen=RECENT)
+        self._run_ms = deque(maxlen=RECENT)
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """A Future for the result of `item`."""
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def __call__(self, item):
+        """The result for `item` (blocks until its batch has run)."""
+        return self.submit(item).result()
+
+    def close(self):
+        """Stop the scheduler after the items already queued."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self):
+        """The next batch, or None to stop."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                # Past the deadline, still take what is already queued
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)  # stop after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            start = time.monotonic()
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items.")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] += 1
+                self._wait_ms.extend((start - enqueued) * 1000 for _, _, enqueued in batch)
+                self._run_ms.append((time.monotonic() - start) * 1000)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": self._requests / self._batches if self._batches else None,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "wait_ms": _percentiles(self._wait_ms),
+                "batch_run_ms": _percentiles(self._run_ms),
+            }
@@ -1,7 +1,10 @@
 import type { NextConfig } from "next";
 
 const nextConfig: NextConfig = {
-  /* config options here */
+  // Read at runtime with fs, so it has to be traced into the function bundle
+  outputFileTracingIncludes: {
+    "/api/fertilizer": ["./fertilizer_tables.bin"],
+  },
 };
 
 export default nextConfig;
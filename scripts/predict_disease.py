@@ -1,20 +1,85 @@
+"""
+Plant disease detection from a leaf image, with the Keras model
+(plant_disease.h5) or the ViT model from the Hugging Face hub.
+
+One-shot: print {"label", "confidence", "treatment"} for one image.
+
+    python scripts/predict_disease.py keras leaf.jpg
+
+Server mode: load each backend once, warm it up with a dummy forward pass
+and answer line-delimited JSON requests, {"model": "keras" | "vit",
+"image_path": ...}, with the one-shot response; an "id" is echoed back.
+{"command": "stats"} returns the batching metrics. Requests on one
+connection are handled concurrently and answered as they finish, so a
+client must match responses by "id".
+
+Concurrent requests for a backend are micro-batched (micro_batch.py): one
+forward pass for up to --max-batch images, each request waiting at most
+--max-wait-ms for its batch to fill. --max-batch 1 turns batching off.
+
+--runtime onnx / onnx-int8 runs the models exported by disease_onnx.py on
+ONNX Runtime instead of TensorFlow / PyTorch; "auto" does so for every
+model that has been exported. The default stays "framework": ONNX is
+opt-in until benchmarks/disease_onnx_bench.py shows its top-1 agreement
+on public/samples.
+The Next.js route keeps one `--serve --stdio` process warm
+(lib/diseaseServer.ts).
+
+    python scripts/predict_disease.py --serve --socket /tmp/disease.sock
+    python scripts/predict_disease.py --serve --port 8766 --warm keras
+    python scripts/predict_disease.py --serve --stdio
+"""
+
+import argparse
 import json
 import os
+import signal
+import socketserver
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
 
-# Check if ML packages are available
-try:
-    import numpy as np
-    from PIL import Image
-    import tensorflow as tf
-    import torch
-    from transformers import ViTImageProcessor, ViTForImageClassification
-    HAS_ML_PACKAGES = True
-except ImportError:
-    HAS_ML_PACKAGES = False
-    # Minimal imports for simulation
+if TYPE_CHECKING:
     from PIL import Image
 
+# Packages each backend needs. Only their presence is checked here; they
+# are imported when that backend runs, so simulation mode and the other
+# backend do not pay for loading them.
+BACKEND_PACKAGES = {
+    "vit": ("PIL", "torch", "transformers"),
+    "keras": ("PIL", "numpy", "tensorflow"),
+}
+
+
+# Packages for running either exported model on ONNX Runtime (disease_onnx.py)
+ONNX_PACKAGES = ("PIL", "numpy", "onnxruntime")
+RUNTIMES = ("auto", "framework", "onnx", "onnx-int8")
+
+
+def has_packages(model_choice, runtime="framework"):
+    """
+    Whether the packages for a backend ("vit", anything else = keras) are
+    installed, for its own framework or for an ONNX runtime.
+    """
+    if runtime.startswith("onnx"):
+        packages = ONNX_PACKAGES
+    else:
+        packages = BACKEND_PACKAGES["vit" if model_choice == "vit" else "keras"]
+    return all(find_spec(name) is not None for name in packages)
+
+
+HAS_ML_PACKAGES = all(has_packages(choice) for choice in BACKEND_PACKAGES)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+VIT_MODEL_NAME = "wambugu1738/crop_leaf_diseases_vit"
+DEFAULT_PORT = 8766
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 10.0
+
 
 VIT_LABEL_TREATMENT = {
     "Corn___Common_rust": "Use recommended fungicides and ensure crop rotation.",
@@ -114,10 +179,10 @@ KERAS_TREATMENTS = {
 
 
 def load_keras_model():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    model_path = os.path.join(project_root, "plant_disease.h5")
-    fallback_path = os.path.join(project_root, "plant_model_v5-beta.h5")
+    import tensorflow as tf
+
+    model_path = os.path.join(PROJECT_ROOT, "plant_disease.h5")
+    fallback_path = os.path.join(PROJECT_ROOT, "plant_model_v5-beta.h5")
     if os.path.exists(model_path):
         return tf.keras.models.load_model(model_path)
     if os.path.exists(fallback_path):
@@ -125,38 +190,53 @@ def load_keras_model():
     raise FileNotFoundError("No Keras model file found.")
 
 
-def predict_vit(image: Image.Image):
-    processor = ViTImageProcessor.from_pretrained("wambugu1738/crop_leaf_diseases_vit")
-    model = ViTForImageClassification.from_pretrained(
-        "wambugu1738/crop_leaf_diseases_vit", ignore_mismatched_sizes=True
-    )
+def load_vit():
+    """(processor, model) for the ViT backend."""
+    from transformers import ViTForImageClassification, ViTImageProcessor
+
+    processor = ViTImageProcessor.from_pretrained(VIT_MODEL_NAME)
+    model = ViTForImageClassification.from_pretrained(VIT_MODEL_NAME, ignore_mismatched_sizes=True)
+    model.eval()
+    return processor, model
+
+
+def predict_vit_batch(images, vit=None):
+    """Predictions for a list of images with one forward pass, using a load_vit() result."""
+    import torch
 
-    inputs = processor(images=image, return_tensors="pt")
+    processor, model = vit if vit is not None else load_vit()
+
+    inputs = processor(images=list(images), return_tensors="pt")
     with torch.no_grad():
         outputs = model(**inputs)
-    logits = outputs.logits
-    probs = torch.softmax(logits, dim=-1)
-    predicted_class_idx = probs.argmax(-1).item()
-    confidence = float(probs.max().item())
-    predicted_label = model.config.id2label.get(predicted_class_idx, "Unknown")
-    treatment = VIT_LABEL_TREATMENT.get(predicted_label, "No specific treatment available.")
+    probs = torch.softmax(outputs.logits, dim=-1)
+    confidences, indices = probs.max(-1)
+    return [
+        _vit_result(predicted_class_idx, confidence, model.config.id2label)
+        for predicted_class_idx, confidence in zip(indices.tolist(), confidences.tolist())
+    ]
+
 
+def _vit_result(predicted_class_idx, confidence, id2label):
+    predicted_label = id2label.get(predicted_class_idx, "Unknown")
+    treatment = VIT_LABEL_TREATMENT.get(predicted_label, "No specific treatment available.")
     return {
         "label": predicted_label,
-        "confidence": confidence,
+        "confidence": float(confidence),
         "treatment": treatment,
     }
 
 
-def predict_keras(image: Image.Image):
-    model = load_keras_model()
+def predict_vit(image: "Image.Image", vit=None):
+    """Prediction with a load_vit() result, loaded here if not given."""
+    return predict_vit_batch([image], vit)[0]
 
-    img_array = tf.image.resize(np.array(image), [256, 256])
-    img_array = tf.expand_dims(img_array, 0) / 255.0
 
-    prediction = model.predict(img_array)
-    predicted_class_idx = int(tf.argmax(prediction[0], axis=-1).numpy())
-    confidence = float(np.max(prediction[0]))
+def _keras_result(probabilities):
+    import numpy as np
+
+    predicted_class_idx = int(np.argmax(probabilities))
+    confidence = float(np.max(probabilities))
 
     predicted_label = CLASS_NAMES.get(predicted_class_idx, "Unknown")
 
@@ -175,6 +255,36 @@ def predict_keras(image: Image.Image):
     }
 
 
+def predict_keras_batch(images, model=None):
+    """Predictions for a list of images with one forward pass, using a load_keras_model() result."""
+    import numpy as np
+    import tensorflow as tf
+
+    if model is None:
+        model = load_keras_model()
+
+    # Images differ in size, so each is resized before stacking
+    img_array = tf.stack([tf.image.resize(np.array(image), [256, 256]) for image in images]) / 255.0
+
+    # Calling the model directly skips predict()'s per-call dataset setup,
+    # which dominates for small batches
+    prediction = model(img_array, training=False).numpy()
+    return [_keras_result(row) for row in prediction]
+
+
+def predict_keras(image: "Image.Image", model=None):
+    """Prediction with a load_keras_model() result, loaded here if not given."""
+    return predict_keras_batch([image], model)[0]
+
+
+def predict_onnx_batch(images, model):
+    """Predictions for a list of images with a disease_onnx.OnnxDiseaseModel."""
+    probabilities = model.probabilities(images)
+    if model.backend == "keras":
+        return [_keras_result(row) for row in probabilities]
+    return [_vit_result(int(row.argmax()), row.max(), model.id2label) for row in probabilities]
+
+
 def simulate_prediction(image_path: str, model_choice: str):
     """Simulation mode when ML packages are not installed"""
     # Extract filename for demo purposes
@@ -214,28 +324,254 @@ def simulate_prediction(image_path: str, model_choice: str):
         }
 
 
-def main():
-    if len(sys.argv) < 3:
-        print(json.dumps({"error": "Usage: predict_disease.py <model> <image_path>"}))
-        return
+def backend_name(model_choice):
+    return "vit" if model_choice == "vit" else "keras"
 
-    model_choice = sys.argv[1].lower()
-    image_path = sys.argv[2]
 
-    if not HAS_ML_PACKAGES:
-        # Run in simulation mode
-        result = simulate_prediction(image_path, model_choice)
-        print(json.dumps(result))
-        return
+class DiseaseWorker:
+    """
+    Loads each backend once, on first use or by warm_up(), and runs
+    predictions through a MicroBatcher per backend: concurrent requests
+    are grouped into one forward pass of up to max_batch images, waiting
+    at most max_wait_ms for the batch to fill. Thread-safe.
+
+    `runtime` is "framework" (TensorFlow / PyTorch), "onnx" or "onnx-int8"
+    (disease_onnx.py), or "auto": ONNX when the backend has been exported
+    and onnxruntime is installed, otherwise its framework.
+    """
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, runtime="framework"):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"runtime must be one of {', '.join(RUNTIMES)}.")
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.runtime = runtime
+        self._models = {}
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def runtime_for(self, backend):
+        """The runtime that serves `backend`, with "auto" resolved."""
+        if self.runtime != "auto":
+            return self.runtime
+        if has_packages(backend, "onnx"):
+            from disease_onnx import has_onnx
+
+            if has_onnx(backend):
+                return "onnx"
+        return "framework"
+
+    def _load(self, backend):
+        """(runtime, model) for a backend."""
+        runtime = self.runtime_for(backend)
+        if runtime.startswith("onnx"):
+            from disease_onnx import OnnxDiseaseModel
+
+            return runtime, OnnxDiseaseModel(backend, quantized=runtime == "onnx-int8")
+        return runtime, load_vit() if backend == "vit" else load_keras_model()
+
+    def _run_batch(self, backend, images):
+        # Runs on the backend's scheduler thread only, so loading needs no lock
+        if backend not in self._models:
+            self._models[backend] = self._load(backend)
+        runtime, model = self._models[backend]
+        if runtime.startswith("onnx"):
+            return predict_onnx_batch(images, model)
+        if backend == "vit":
+            return predict_vit_batch(images, model)
+        return predict_keras_batch(images, model)
+
+    def _batcher(self, backend):
+        from micro_batch import MicroBatcher
+
+        with self._lock:
+            if backend not in self._batchers:
+                self._batchers[backend] = MicroBatcher(
+                    lambda images: self._run_batch(backend, images),
+                    self.max_batch, self.max_wait_ms, name=f"disease-{backend}",
+                )
+            return self._batchers[backend]
+
+    def predict(self, model_choice, image: "Image.Image"):
+        return self._batcher(backend_name(model_choice))(image)
+
+    def warm_up(self, model_choice):
+        """Load a backend and run one forward pass on a blank image."""
+        from PIL import Image
+
+        self.predict(model_choice, Image.new("RGB", (256, 256)))
+
+    def predict_file(self, model_choice, image_path):
+        """One-shot response for an image file (simulation without packages)."""
+        if not has_packages(model_choice, self.runtime_for(backend_name(model_choice))):
+            return simulate_prediction(image_path, model_choice)
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            return self.predict(model_choice, image.convert("RGB"))
+
+    def stats(self):
+        """Scheduler metrics per loaded backend."""
+        with self._lock:
+            batchers = dict(self._batchers)
+        return {backend: batcher.stats() for backend, batcher in batchers.items()}
+
+
+def handle_line(worker, line):
+    """Response dict for one line of line-delimited JSON."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return {"error": "Invalid JSON"}
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}
+    if data.get("command") == "stats":
+        return {"batching": worker.stats()}
 
-    image = Image.open(image_path).convert("RGB")
+    image_path = data.get("image_path")
+    if not isinstance(image_path, str) or not image_path:
+        response = {"error": "Missing image_path"}
+    else:
+        try:
+            response = worker.predict_file(str(data.get("model", "keras")).lower(), image_path)
+        except Exception as e:
+            response = {"error": str(e)}
+    if "id" in data:
+        response["id"] = data["id"]
+    return response
+
+
+def serve_lines(worker, rfile, wfile):
+    """
+    Answer requests from rfile until EOF (binary file objects). Lines are
+    handled concurrently, so requests pipelined on one connection can share
+    a batch; responses are written as they finish, matched by "id".
+    """
+    write_lock = threading.Lock()
+    # Enough handlers to fill a batch per backend while the previous one runs
+    in_flight = threading.BoundedSemaphore(max(4, 4 * worker.max_batch))
+
+    def respond(line):
+        try:
+            response = handle_line(worker, line)
+            with write_lock:
+                try:
+                    wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                    wfile.flush()
+                except (BrokenPipeError, ConnectionResetError, ValueError):
+                    pass  # client gone
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max(4, 4 * worker.max_batch)) as pool:
+        for line in rfile:
+            line = line.strip()
+            if not line:
+                continue
+            in_flight.acquire()
+            pool.submit(respond, line)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            serve_lines(self.server.worker, self.rfile, self.wfile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:  # Windows
+    _UnixServer = None
 
-    if model_choice == "vit":
-        result = predict_vit(image)
+
+def serve(worker, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    """Run the line-delimited JSON server until interrupted."""
+    if socket_path:
+        if _UnixServer is None:
+            raise SystemExit("Unix sockets are not supported on this platform; use --port.")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixServer(socket_path, _Handler)
+        address = socket_path
     else:
-        result = predict_keras(image)
+        server = _TCPServer((host, port), _Handler)
+        address = "%s:%d" % server.server_address[:2]
+    server.worker = worker
+    # Exit through the finally block below on SIGTERM too, removing the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Disease prediction server listening on {address}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def warm_up(worker, backends):
+    """Load and warm up backends one after another, logging failures."""
+    for backend in backends:
+        try:
+            worker.warm_up(backend)
+            print(f"Disease backend {backend} ready", file=sys.stderr, flush=True)
+        except Exception as e:
+            print(f"Disease backend {backend} failed to load: {e}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plant disease detection.")
+    parser.add_argument("model", nargs="?", help="keras or vit")
+    parser.add_argument("image_path", nargs="?")
+    parser.add_argument("--serve", action="store_true", help="load models once and serve line-delimited JSON")
+    parser.add_argument("--stdio", action="store_true", help="with --serve: serve stdin/stdout (one client)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="with --serve: listen on this Unix socket instead of TCP")
+    parser.add_argument("--warm", action="append", choices=list(BACKEND_PACKAGES),
+                        help="with --serve: backend to load at startup (repeatable; default: all installed)")
+    parser.add_argument("--runtime", choices=RUNTIMES, default="framework",
+                        help="framework: TensorFlow/PyTorch; onnx, onnx-int8: models exported by "
+                             "disease_onnx.py; auto: ONNX for exported models, else framework")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="with --serve: most images per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="with --serve: longest a request waits for its batch to fill")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        worker = DiseaseWorker(args.max_batch, args.max_wait_ms, args.runtime)
+        backends = args.warm or [
+            name for name in BACKEND_PACKAGES if has_packages(name, worker.runtime_for(name))
+        ]
+        # Requests are accepted meanwhile; they wait for their backend to load
+        threading.Thread(target=warm_up, args=(worker, backends), daemon=True).start()
+        if args.stdio:
+            print("Disease prediction server ready on stdin/stdout", file=sys.stderr, flush=True)
+            serve_lines(worker, sys.stdin.buffer, sys.stdout.buffer)
+        else:
+            serve(worker, args.host, args.port, args.socket)
+        return
+
+    if args.image_path is None:
+        print(json.dumps({"error": "Usage: predict_disease.py <model> <image_path>"}))
+        return
+
+    model_choice = args.model.lower()
+    image_path = args.image_path
 
-    print(json.dumps(result))
+    # Simulation mode when the backend's packages are missing
+    worker = DiseaseWorker(max_batch=1, runtime=args.runtime)
+    print(json.dumps(worker.predict_file(model_choice, image_path)))
 
 
 if __name__ == "__main__":
@@ -1,63 +1,633 @@
+"""
+Crop yield prediction with the CatBoost model in yield_model.cbm.
+
+One-shot runs evaluate the model from its NumPy export, yield_model.npz
+(see yield_model.py), when that file is present: no catboost import, so
+startup is much faster. The long-running modes (--serve, --jsonl) pay
+the import once and use CatBoost itself when it is installed. Either way
+the other backend is the fallback, and without both, simulation mode.
+--backend picks one explicitly. Requests are encoded
+straight into reused input arrays (yield_model.FeatureEncoder), so neither
+backend needs pandas.
+
+One-shot: read one JSON object from stdin, print {"prediction": "..."}
+and exit.
+
+    echo '{"Soil_Type": "Loam", ...}' | python scripts/predict_yield.py
+
+Server mode: load the model once and answer line-delimited JSON, one
+request object per line and one response object per line in the same
+shape as the one-shot output. A request may carry an "id", which is
+echoed back. Clients are served concurrently, one thread each. The
+Next.js route keeps one `--serve --stdio` process warm (lib/yieldServer.ts).
+
+    python scripts/predict_yield.py --serve --port 8765
+    python scripts/predict_yield.py --serve --socket /tmp/yield.sock
+    python scripts/predict_yield.py --serve --stdio
+
+Batch mode: read JSON lines from stdin in chunks, score each chunk with one
+model.predict call and write one response line per input line, in order.
+Memory stays constant however many lines are piped through.
+
+    python scripts/predict_yield.py --jsonl < scenarios.jsonl > predictions.jsonl
+
+Both long-running modes take --cache-size N to keep an LRU cache of
+predictions keyed on the categorical features plus rainfall and
+temperature rounded to --rainfall-decimals / --temperature-decimals.
+With the cache on, the model always scores the rounded values, so a
+prediction does not depend on which query filled the cache first. In
+server mode {"command": "stats"} returns the hit/miss counters.
+
+Explanations: a request with "explain": true also gets "explanation",
+{"base_value": ..., "contributions": {feature: ...}}, the CatBoost SHAP
+values of its prediction (yield_explain.py). They come from the SHAP
+tables in yield_model.npz, at about the cost of the prediction itself;
+without them, from CatBoost, in one call per batch and cached exactly
+(--explain-cache-size), and without either, null. Server mode loads and
+warms the explainer in the background at startup.
+
+Location: a request may give "lat" and "lon" instead of Rainfall_mm and
+Temperature_Celsius. The missing values are filled in from the local
+climate normals store (yield_climate.py; climate_normals.npy, or
+--climate), with one lookup per batch, and echoed back as "climate".
+Values given explicitly are kept.
+"""
+
+import argparse
 import json
 import os
+import signal
+import socketserver
 import sys
+import threading
+from collections import OrderedDict
+from importlib.util import find_spec
 
-# Check if catboost is available
-try:
-    import pandas as pd
-    from catboost import CatBoostRegressor
-    HAS_CATBOOST = True
-except ImportError:
-    HAS_CATBOOST = False
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
 
+# Check which backends are available. Only presence is checked here:
+# numpy (through yield_model) and catboost are imported once a model is
+# loaded, so bad input and simulation mode answer without loading them.
+HAS_NUMPY_MODEL = find_spec("numpy") is not None
+HAS_CATBOOST = HAS_NUMPY_MODEL and find_spec("catboost") is not None
 
-def main():
-    payload = sys.stdin.read().strip()
-    if not payload:
-        print(json.dumps({"error": "Missing input payload"}))
-        return
+MODEL_PATH = os.path.join(PROJECT_ROOT, "yield_model.cbm")
+NUMPY_MODEL_PATH = os.path.join(PROJECT_ROOT, "yield_model.npz")
+BACKENDS = ("auto", "numpy", "catboost")
+DEFAULT_PORT = 8765
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_CACHE_SIZE = 0  # off
+DEFAULT_RAINFALL_DECIMALS = 0
+DEFAULT_TEMPERATURE_DECIMALS = 1
+DEFAULT_EXPLAIN_CACHE_SIZE = 10_000
+CLIMATE_PATH = os.path.join(PROJECT_ROOT, "climate_normals.npy")
+CLIMATE_FEATURES = ("Rainfall_mm", "Temperature_Celsius")
 
-    data = json.loads(payload)
 
-    if not HAS_CATBOOST:
-        # Simulation mode when packages not installed
-        # Return a plausible prediction based on inputs
-        base_yield = 3.5
-        if data.get("Fertilizer_Used"):
-            base_yield += 0.8
-        if data.get("Irrigation_Used"):
-            base_yield += 0.6
-        if data.get("Soil_Type") == "Loam":
-            base_yield += 0.4
-        elif data.get("Soil_Type") == "Clay":
-            base_yield += 0.2
-        rainfall = float(data.get("Rainfall_mm", 800))
-        if 700 < rainfall < 1200:
-            base_yield += 0.3
-        print(json.dumps({"prediction": f"{base_yield:.2f} tons per hectare (simulation mode - install catboost for real predictions)"}))
-        return
+def simulate_prediction(data):
+    """Simulation mode when packages not installed: a plausible prediction based on inputs."""
+    base_yield = 3.5
+    if data.get("Fertilizer_Used"):
+        base_yield += 0.8
+    if data.get("Irrigation_Used"):
+        base_yield += 0.6
+    if data.get("Soil_Type") == "Loam":
+        base_yield += 0.4
+    elif data.get("Soil_Type") == "Clay":
+        base_yield += 0.2
+    rainfall = float(data.get("Rainfall_mm", 800))
+    if 700 < rainfall < 1200:
+        base_yield += 0.3
+    return {"prediction": f"{base_yield:.2f} tons per hectare (simulation mode - install catboost for real predictions)"}
 
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    model_path = os.path.join(project_root, "yield_model.cbm")
+
+def load_model(model_path=None, backend="auto", long_running=False):
+    """
+    The model for `backend`, or None in simulation mode. "auto" prefers
+    the NumPy export for a cold start, and CatBoost for a `long_running`
+    process, which amortizes its import. A model_path ending in .npz is a
+    NumPy export, anything else a CatBoost model file.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}.")
+    if model_path is not None and backend == "auto":
+        backend = "numpy" if model_path.endswith(".npz") else "catboost"
+
+    if backend == "auto":
+        has_numpy = HAS_NUMPY_MODEL and os.path.exists(NUMPY_MODEL_PATH)
+        has_catboost = HAS_CATBOOST and os.path.exists(MODEL_PATH)
+        if has_catboost and (long_running or not has_numpy):
+            backend = "catboost"
+        elif has_numpy:
+            backend = "numpy"
+        elif HAS_CATBOOST:
+            backend = "catboost"
+        else:
+            return None
+
+    if backend == "numpy":
+        if not HAS_NUMPY_MODEL:
+            raise RuntimeError("The NumPy backend needs numpy installed.")
+        import yield_model
+
+        return yield_model.load_model(model_path or NUMPY_MODEL_PATH)
+    if not HAS_CATBOOST:
+        raise RuntimeError("The CatBoost backend needs catboost installed.")
+    from catboost import CatBoostRegressor
 
     model = CatBoostRegressor()
-    model.load_model(model_path)
-
-    input_data = pd.DataFrame(
-        {
-            "Soil_Type": [data.get("Soil_Type")],
-            "Crop": [data.get("Crop")],
-            "Rainfall_mm": [float(data.get("Rainfall_mm"))],
-            "Temperature_Celsius": [float(data.get("Temperature_Celsius"))],
-            "Fertilizer_Used": [bool(data.get("Fertilizer_Used"))],
-            "Irrigation_Used": [bool(data.get("Irrigation_Used"))],
-        }
+    model.load_model(model_path or MODEL_PATH)
+    return model
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions keyed on quantized feature rows.
+    Thread-safe; counts hits, misses and evictions.
+    """
+
+    def __init__(self, maxsize, rainfall_decimals=DEFAULT_RAINFALL_DECIMALS,
+                 temperature_decimals=DEFAULT_TEMPERATURE_DECIMALS):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.rainfall_decimals = rainfall_decimals
+        self.temperature_decimals = temperature_decimals
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def quantize(self, row):
+        """A feature_row with rainfall and temperature rounded."""
+        soil, crop, rainfall, temperature, fertilizer, irrigation = row
+        # + 0.0 turns -0.0 into 0.0
+        return (
+            soil, crop,
+            round(rainfall, self.rainfall_decimals) + 0.0,
+            round(temperature, self.temperature_decimals) + 0.0,
+            fertilizer, irrigation,
+        )
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def count_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+def _format(prediction):
+    return {"prediction": f"{prediction:.2f} tons per hectare"}
+
+
+def load_explainer(model_path=None, cache_size=DEFAULT_EXPLAIN_CACHE_SIZE, model=None):
+    """
+    A YieldExplainer (the model loads on first use), or None if nothing
+    can explain: the NumPy export's SHAP tables when present (NumPy only),
+    otherwise CatBoost. With a model_path, the explainer of that file.
+    `model` is the prediction model; a CatBoost one routes rows to their
+    leaves for the SHAP tables.
+    """
+    if not HAS_NUMPY_MODEL:
+        return None
+    from yield_explain import YieldExplainer, has_shap_tables
+    from yield_model import ObliviousTreeModel
+
+    catboost_model = None
+    if model_path is None:
+        if has_shap_tables(NUMPY_MODEL_PATH):
+            model_path = NUMPY_MODEL_PATH
+            if model is not None and not isinstance(model, ObliviousTreeModel):
+                catboost_model = model
+        else:
+            model_path = MODEL_PATH
+    if not model_path.endswith(".npz") and not HAS_CATBOOST:
+        return None
+    return YieldExplainer(model_path, max(cache_size, 0), catboost_model)
+
+
+def load_climate(path=None):
+    """
+    The climate normals store at `path` (default climate_normals.npy if
+    present), or None. The grid is memory-mapped, so this is cheap.
+    """
+    if path is None:
+        if not (HAS_NUMPY_MODEL and os.path.exists(CLIMATE_PATH)):
+            return None
+        path = CLIMATE_PATH
+    from yield_climate import ClimateNormals
+
+    return ClimateNormals(path)
+
+
+def _wants_location(data):
+    return (
+        isinstance(data, dict) and "lat" in data and "lon" in data
+        and any(data.get(name) is None for name in CLIMATE_FEATURES)
     )
 
-    prediction = model.predict(input_data)[0]
-    print(json.dumps({"prediction": f"{prediction:.2f} tons per hectare"}))
+
+def _locate(climate, records):
+    """
+    Climate values for the records that give lat/lon instead of rainfall
+    or temperature, with one store lookup for all of them. Returns
+    ({position: {feature: value}}, {position: error message}).
+    """
+    located, errors = {}, {}
+    positions, lats, lons = [], [], []
+    for i, data in enumerate(records):
+        if not _wants_location(data):
+            continue
+        if climate is None:
+            errors[i] = "Location lookup needs climate normals (climate_normals.npy or --climate)"
+            continue
+        try:
+            lat, lon = float(data["lat"]), float(data["lon"])
+        except (TypeError, ValueError):
+            errors[i] = "Invalid input: lat and lon must be numbers"
+            continue
+        positions.append(i)
+        lats.append(lat)
+        lons.append(lon)
+    if not positions:
+        return located, errors
+
+    values = climate.lookup(lats, lons)
+    for k, i in enumerate(positions):
+        climate_values = [float(column[k]) for column in values]
+        if any(value != value for value in climate_values):  # NaN
+            errors[i] = "No climate normals for this location"
+            continue
+        located[i] = {
+            name: round(value, 2)
+            for name, value in zip(CLIMATE_FEATURES, climate_values)
+            if records[i].get(name) is None
+        }
+    return located, errors
+
+
+# One reusable FeatureEncoder per server thread
+_encoders = threading.local()
+
+
+def _predict_rows(model, rows):
+    """Predictions for a list of feature rows, with one model call."""
+    from yield_model import FeatureEncoder, predict_rows
+
+    encoder = getattr(_encoders, "encoder", None)
+    if encoder is None:
+        encoder = _encoders.encoder = FeatureEncoder()
+    return predict_rows(model, rows, encoder)
+
+
+def _explain(explainer, rows):
+    """Explanations for feature rows; None each without an explainer."""
+    if explainer is None:
+        return [None] * len(rows)
+    return explainer.explain_rows(rows)
+
+
+def _scores(explainer):
+    """Whether the explainer predicts explained rows too (SHAP tables)."""
+    return explainer is not None and explainer.numpy
+
+
+def predict(model, data, cache=None, explainer=None, climate=None):
+    """Response dict for one request dict."""
+    located = None
+    if _wants_location(data):
+        found, errors = _locate(climate, [data])
+        if errors:
+            return {"error": errors[0]}
+        located = found[0]
+        data = {**data, **located}
+    if model is None:
+        response = simulate_prediction(data)
+        if located is not None:
+            response["climate"] = located
+        return response
+    from yield_model import feature_row
+
+    row = feature_row(data)
+    if cache is not None:
+        row = cache.quantize(row)
+    if data.get("explain") and _scores(explainer):
+        predictions, explanations = explainer.score_rows([row])
+        response = _format(predictions[0])
+        response["explanation"] = explanations[0]
+    else:
+        prediction = cache.get(row) if cache is not None else None
+        if prediction is None:
+            prediction = float(_predict_rows(model, [row])[0])
+            if cache is not None:
+                cache.put(row, prediction)
+        response = _format(prediction)
+        if data.get("explain"):
+            response["explanation"] = _explain(explainer, [row])[0]
+    if located is not None:
+        response["climate"] = located
+    return response
+
+
+def predict_batch(model, records, cache=None, explainer=None, climate=None):
+    """
+    Response dicts for a list of request dicts, in order, with a single
+    model.predict call for everything not in the cache (and one explainer
+    call for all records asking for explanations, one climate lookup for
+    all records giving a location). With SHAP tables the explainer also
+    scores the records it explains. Records with invalid inputs get an
+    error response.
+    """
+    scores = _scores(explainer)
+    responses = [None] * len(records)
+    located, errors = _locate(climate, records)
+    rows, positions = [], []
+    explain_rows, explain_positions = [], []
+    pending = {}  # quantized row -> later records in this batch with that row
+    if model is not None:
+        from yield_model import feature_row
+    for i, data in enumerate(records):
+        if not isinstance(data, dict):
+            responses[i] = {"error": "Expected a JSON object"}
+            continue
+        if i in errors:
+            responses[i] = {"error": errors[i]}
+            continue
+        if i in located:
+            data = {**data, **located[i]}
+        try:
+            if model is None:
+                responses[i] = simulate_prediction(data)
+                continue
+            row = feature_row(data)
+        except (TypeError, ValueError) as e:
+            responses[i] = {"error": f"Invalid input: {e}"}
+            continue
+        if cache is not None:
+            row = cache.quantize(row)
+        if data.get("explain"):
+            explain_rows.append(row)
+            explain_positions.append(i)
+            if scores:
+                continue
+        if cache is not None:
+            if row in pending:
+                # Repeat of a miss earlier in this batch: score it once
+                pending[row].append(i)
+                cache.count_hit()
+                continue
+            cached = cache.get(row)
+            if cached is not None:
+                responses[i] = _format(cached)
+                continue
+            pending[row] = []
+        rows.append(row)
+        positions.append(i)
+
+    if rows:
+        predictions = _predict_rows(model, rows)
+        for i, row, prediction in zip(positions, rows, predictions):
+            responses[i] = _format(prediction)
+            if cache is not None:
+                cache.put(row, float(prediction))
+                for j in pending[row]:
+                    responses[j] = responses[i].copy()
+
+    if scores and explain_rows:
+        predictions, explanations = explainer.score_rows(explain_rows)
+        for i, prediction, explanation in zip(explain_positions, predictions, explanations):
+            responses[i] = _format(prediction)
+            responses[i]["explanation"] = explanation
+    elif not scores:
+        for i, explanation in zip(explain_positions, _explain(explainer, explain_rows)):
+            responses[i]["explanation"] = explanation
+
+    for i, climate_values in located.items():
+        if "error" not in responses[i]:
+            responses[i]["climate"] = climate_values
+    for data, response in zip(records, responses):
+        if isinstance(data, dict) and "id" in data:
+            response["id"] = data["id"]
+    return responses
+
+
+_INVALID_JSON = object()
+
+
+def run_jsonl(model, rfile, wfile, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, explainer=None, climate=None):
+    """Score JSON lines from rfile in chunks; returns the number of lines."""
+    count = 0
+    chunk = []
+
+    def flush():
+        records = []
+        for line in chunk:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(_INVALID_JSON)
+        responses = predict_batch(model, records, cache, explainer, climate)
+        for record, response in zip(records, responses):
+            if record is _INVALID_JSON:
+                response = {"error": "Invalid JSON"}
+            wfile.write(json.dumps(response) + "\n")
+        wfile.flush()
+        chunk.clear()
+
+    for line in rfile:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        count += 1
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return count
+
+
+def handle_line(model, line, cache=None, explainer=None, climate=None):
+    """Response dict for one line of line-delimited JSON."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return {"error": "Invalid JSON"}
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}
+    if data.get("command") == "stats":
+        return {
+            "cache": cache.stats() if cache is not None else None,
+            "explain_cache": explainer.stats() if explainer is not None else None,
+        }
+
+    try:
+        response = predict(model, data, cache, explainer, climate)
+    except (TypeError, ValueError) as e:
+        response = {"error": f"Invalid input: {e}"}
+    except Exception as e:
+        response = {"error": str(e)}
+    if "id" in data:
+        response["id"] = data["id"]
+    return response
+
+
+def serve_lines(model, rfile, wfile, cache=None, explainer=None, climate=None):
+    """Answer requests from rfile until EOF (binary file objects)."""
+    for line in rfile:
+        line = line.strip()
+        if not line:
+            continue
+        response = handle_line(model, line, cache, explainer, climate)
+        wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            serve_lines(
+                self.server.model, self.rfile, self.wfile,
+                self.server.cache, self.server.explainer, self.server.climate,
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:  # Windows
+    _UnixServer = None
+
+
+def serve(model, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, cache=None, explainer=None,
+          climate=None):
+    """Run the line-delimited JSON server until interrupted."""
+    if socket_path:
+        if _UnixServer is None:
+            raise SystemExit("Unix sockets are not supported on this platform; use --port.")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixServer(socket_path, _Handler)
+        address = socket_path
+    else:
+        server = _TCPServer((host, port), _Handler)
+        address = "%s:%d" % server.server_address[:2]
+    server.model = model
+    server.cache = cache
+    server.explainer = explainer
+    server.climate = climate
+    # Exit through the finally block below on SIGTERM too, removing the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Yield prediction server listening on {address}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crop yield prediction.")
+    parser.add_argument("--serve", action="store_true", help="load the model once and serve line-delimited JSON")
+    parser.add_argument("--stdio", action="store_true", help="with --serve: serve stdin/stdout (one client)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="with --serve: listen on this Unix socket instead of TCP")
+    parser.add_argument("--jsonl", action="store_true", help="score JSON lines from stdin in chunks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="with --jsonl: lines per model call")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="with --serve/--jsonl: cache up to N predictions (0 = off)")
+    parser.add_argument("--rainfall-decimals", type=int, default=DEFAULT_RAINFALL_DECIMALS,
+                        help="rainfall rounding for the cache key")
+    parser.add_argument("--temperature-decimals", type=int, default=DEFAULT_TEMPERATURE_DECIMALS,
+                        help="temperature rounding for the cache key")
+    parser.add_argument("--explain-cache-size", type=int, default=DEFAULT_EXPLAIN_CACHE_SIZE,
+                        help="cache up to N explanations (they are exact, so on by default)")
+    parser.add_argument("--model", help="model file (.npz NumPy export or CatBoost .cbm)")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="auto: CatBoost for --serve/--jsonl, yield_model.npz for one-shot "
+                             "runs, each falling back to the other")
+    parser.add_argument("--climate", help="climate normals store for lat/lon requests "
+                                          "(default: climate_normals.npy if present)")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache_size > 0:
+        cache = PredictionCache(args.cache_size, args.rainfall_decimals, args.temperature_decimals)
+
+    if args.jsonl:
+        model = load_model(args.model, args.backend, long_running=True)
+        explainer = load_explainer(args.model, args.explain_cache_size, model)
+        run_jsonl(model, sys.stdin, sys.stdout, args.chunk_size, cache, explainer, load_climate(args.climate))
+        if cache is not None:
+            print(f"Cache: {json.dumps(cache.stats())}", file=sys.stderr)
+        if explainer is not None and explainer.hits + explainer.misses:
+            print(f"Explain cache: {json.dumps(explainer.stats())}", file=sys.stderr)
+        return
+    if args.serve:
+        model = load_model(args.model, args.backend, long_running=True)
+        explainer = load_explainer(args.model, args.explain_cache_size, model)
+        climate = load_climate(args.climate)
+        if explainer is not None:
+            # Predictions are served meanwhile; explanations wait for the model load
+            threading.Thread(target=explainer.warm_up, daemon=True).start()
+        if args.stdio:
+            print("Yield prediction server ready on stdin/stdout", file=sys.stderr, flush=True)
+            serve_lines(model, sys.stdin.buffer, sys.stdout.buffer, cache, explainer, climate)
+        else:
+            serve(model, args.host, args.port, args.socket, cache, explainer, climate)
+        return
+
+    payload = sys.stdin.read().strip()
+    if not payload:
+        print(json.dumps({"error": "Missing input payload"}))
+        return
+
+    data = json.loads(payload)
+    explainer = load_explainer(args.model, args.explain_cache_size) if data.get("explain") else None
+    climate = load_climate(args.climate) if _wants_location(data) else None
+    model = load_model(args.model, args.backend)
+    print(json.dumps(predict(model, data, explainer=explainer, climate=climate)))
 
 
 if __name__ == "__main__":
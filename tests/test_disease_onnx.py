@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+import disease_onnx  # noqa: E402
+import predict_disease  # noqa: E402
+
+SAMPLE = os.path.join(PROJECT_ROOT, "public", "samples", "corn.jpg")
+
+
+def test_resize_bilinear_upscale_clamps_edges():
+    # 2 -> 4 with half-pixel centres samples at -0.25 (clamped), 0.25, 0.75, 1.25 (clamped)
+    image = np.array([[0, 10], [20, 30]], dtype=np.float32)[:, :, None]
+    image = np.concatenate([image, 2 * image], axis=2)
+    out = disease_onnx.resize_bilinear(image, 4, 4)
+
+    steps = np.array([0, 0.25, 0.75, 1], dtype=np.float32)
+    expected = 20 * steps[:, None] + 10 * steps[None, :]
+    assert out.shape == (4, 4, 2)
+    np.testing.assert_allclose(out[:, :, 0], expected, atol=1e-5)
+    np.testing.assert_allclose(out[:, :, 1], 2 * expected, atol=1e-5)
+
+
+def test_resize_bilinear_downscale():
+    # image[y, x] = 4y + x; 4 -> 2 samples at 0.5 and 2.5, 4 -> 3 at 1/6, 3/2 and 17/6
+    image = (4 * np.arange(4)[:, None] + np.arange(4)[None, :]).astype(np.float32)[:, :, None]
+    out = disease_onnx.resize_bilinear(image, 2, 3)
+
+    rows = np.array([0.5, 2.5])
+    cols = np.array([1 / 6, 3 / 2, 17 / 6])
+    assert out.shape == (2, 3, 1)
+    np.testing.assert_allclose(out[:, :, 0], 4 * rows[:, None] + cols[None, :], atol=1e-5)
+    np.testing.assert_allclose(disease_onnx.resize_bilinear(image, 1, 1)[0, 0, 0], 4 * 1.5 + 1.5, atol=1e-5)
+
+
+def test_vit_inputs_normalizes_to_nchw():
+    from PIL import Image
+
+    config = {
+        "size": [2, 3],
+        "resample": 0,  # nearest: a uniform image stays uniform
+        "rescale_factor": 1 / 255,
+        "image_mean": [0.5, 0.25, 0.0],
+        "image_std": [0.5, 0.25, 2.0],
+    }
+    colours = [(255, 0, 51), (0, 102, 255)]
+    images = [
+        Image.new("RGB", (7, 5), colours[0]),
+        np.full((4, 6, 3), colours[1], dtype=np.uint8),
+    ]
+    batch = disease_onnx.vit_inputs(images, config)
+
+    assert batch.shape == (2, 3, 2, 3)
+    assert batch.dtype == np.float32
+    for pixels, colour in zip(batch, colours):
+        expected = (np.array(colour) / 255 - config["image_mean"]) / config["image_std"]
+        np.testing.assert_allclose(pixels, np.broadcast_to(expected[:, None, None], (3, 2, 3)), atol=1e-6)
+
+
+class StubSession:
+    """An onnxruntime.InferenceSession that answers "Apple___healthy" for every image."""
+
+    batches = []
+
+    def __init__(self, path, options=None, providers=None):
+        self.path = path
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="image")]
+
+    def run(self, outputs, feeds):
+        images = feeds["image"]
+        StubSession.batches.append(images.shape)
+        probabilities = np.zeros((len(images), len(predict_disease.CLASS_NAMES)), dtype=np.float32)
+        probabilities[:, 3] = 1.0
+        return [probabilities]
+
+
+@pytest.fixture
+def stub_onnxruntime(monkeypatch):
+    StubSession.batches = []
+    module = types.SimpleNamespace(SessionOptions=types.SimpleNamespace, InferenceSession=StubSession)
+    monkeypatch.setitem(sys.modules, "onnxruntime", module)
+    monkeypatch.setattr(predict_disease, "has_packages", lambda *args: True)
+    return StubSession
+
+
+def test_onnx_worker_batches_through_onnx_model(stub_onnxruntime):
+    worker = predict_disease.DiseaseWorker(max_batch=8, max_wait_ms=50, runtime="onnx")
+    n = 16
+    lines = b"".join(
+        json.dumps({"id": i, "model": "keras", "image_path": SAMPLE}).encode() + b"\n" for i in range(n)
+    )
+    out = io.BytesIO()
+    predict_disease.serve_lines(worker, io.BytesIO(lines), out)
+
+    runtime, model = worker._models["keras"]
+    assert runtime == "onnx"
+    assert isinstance(model, disease_onnx.OnnxDiseaseModel)
+    assert model.session.path == disease_onnx.onnx_path("keras")
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(response["id"] for response in responses) == list(range(n))
+    assert all(response["label"] == "Apple___healthy" for response in responses)
+    shapes = stub_onnxruntime.batches
+    assert sum(shape[0] for shape in shapes) == n
+    assert all(shape[1:] == (disease_onnx.KERAS_SIZE, disease_onnx.KERAS_SIZE, 3) for shape in shapes)
+    assert max(shape[0] for shape in shapes) > 1
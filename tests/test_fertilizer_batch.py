@@ -0,0 +1,56 @@
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fertilizer_core  # noqa: E402
+from fertilizer_batch import fertilizer_batch, stvi_class_names  # noqa: E402
+from fertilizer_index import GAP_POLICIES, CompiledTables  # noqa: E402
+
+TABLES = fertilizer_core.TABLES
+
+
+def boundary_values(nutrient):
+    """Every class bound, the middle of every gap, NaN and values below/above all classes."""
+    classes = list(TABLES.thresholds[nutrient].values())
+    values = [float("nan"), -1.0, -1e-9, classes[-1][1] + 1]
+    for lo, hi in classes:
+        values += [lo, hi, (lo + hi) / 2]
+    for (_, hi), (lo, _) in zip(classes, classes[1:]):
+        values += [(hi + lo) / 2, hi + (lo - hi) / 4, lo - (lo - hi) / 4]
+    return values
+
+
+def _same(batch_value, scalar_value):
+    if scalar_value is None:
+        return math.isnan(batch_value)
+    return batch_value == scalar_value
+
+
+@pytest.mark.parametrize("gap_policy", GAP_POLICIES)
+@pytest.mark.parametrize("compiled", [False, True], ids=["gap_policy argument", "CompiledTables default"])
+def test_batch_matches_recommend_nutrient(gap_policy, compiled):
+    if compiled:
+        # The policy is the tables' default instead of an argument
+        tables = CompiledTables(
+            TABLES.thresholds, TABLES.variety_options, TABLES.conversions, gap_policy, TABLES.version,
+        )
+        policy_argument = None
+    else:
+        tables, policy_argument = TABLES, gap_policy
+
+    # Every nutrient has the same classes, so the columns line up
+    columns = {nutrient: boundary_values(nutrient) for nutrient in TABLES.nutrients}
+    for variety in TABLES.varieties:
+        result = fertilizer_batch(columns, variety, policy_argument, tables)
+        for nutrient, values in columns.items():
+            names = stvi_class_names(result[nutrient]["stvi_class"], tables)
+            for i, value in enumerate(values):
+                expected = fertilizer_core.recommend_nutrient(nutrient, value, variety, policy_argument, tables)
+                case = f"{variety!r} {nutrient}={value} ({gap_policy})"
+                assert names[i] == expected.stvi_class, case
+                assert _same(result[nutrient]["F_r"][i], expected.F_r), case
+                assert _same(result[nutrient]["product_amount"][i], expected.product_amount), case
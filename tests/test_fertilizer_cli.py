@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fertilizer_cli import HAS_PYARROW, read_chunks, run  # noqa: E402
+
+
+@pytest.mark.parametrize("output", [
+    "out.csv",
+    pytest.param("out.parquet", marks=pytest.mark.skipif(not HAS_PYARROW, reason="needs pyarrow")),
+])
+def test_passthrough_column_blank_in_first_chunk(tmp_path, output):
+    # "note" is blank (read as float) in chunk 1 and text in chunk 2
+    samples = tmp_path / "samples.csv"
+    pd.DataFrame({
+        "N": [0.05, 0.15, 0.25, 0.4],  # Very Low to High
+        "P": [5.0, 8.0, None, 12.0],
+        "note": ["", "", "resampled", "plot 7"],
+        "variety": ["Aman Rice"] * 4,
+    }).to_csv(samples, index=False)
+    out = tmp_path / output
+
+    rows, _ = run(str(samples), str(out), chunk_size=2)
+
+    assert rows == 4
+    result = pd.concat(read_chunks(str(out), 10), ignore_index=True)
+    assert result["note"].isna().tolist() == [True, True, False, False]
+    assert result["note"].iloc[2:].tolist() == ["resampled", "plot 7"]
+    assert result["N_product"].notna().all()
+    assert (result["N_product"] > 0).any()
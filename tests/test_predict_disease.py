@@ -0,0 +1,34 @@
+import io
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+
+import predict_disease  # noqa: E402
+
+SAMPLE = os.path.join(PROJECT_ROOT, "public", "samples", "corn.jpg")
+
+
+def test_pipelined_requests_share_a_batch(monkeypatch):
+    # Pretend the framework is installed; the batch function is a stub
+    monkeypatch.setattr(predict_disease, "has_packages", lambda *args: True)
+    worker = predict_disease.DiseaseWorker(max_batch=8, max_wait_ms=50, runtime="framework")
+    monkeypatch.setattr(
+        worker, "_run_batch",
+        lambda backend, images: [{"label": "x", "confidence": 1.0, "treatment": ""} for _ in images],
+    )
+    n = 32
+    lines = b"".join(
+        json.dumps({"id": i, "model": "keras", "image_path": SAMPLE}).encode() + b"\n" for i in range(n)
+    )
+    out = io.BytesIO()
+    predict_disease.serve_lines(worker, io.BytesIO(lines), out)
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(response["id"] for response in responses) == list(range(n))
+    assert all(response["label"] == "x" for response in responses)
+    stats = worker.stats()["keras"]
+    assert stats["requests"] == n
+    assert max(int(size) for size in stats["batch_sizes"]) > 1
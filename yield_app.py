@@ -1,28 +1,23 @@
 import gradio as gr
-import pandas as pd
 from catboost import CatBoostRegressor
 
+from yield_model import CROPS, SOIL_TYPES, FeatureEncoder, predict_rows
+
 # Load the saved CatBoost model
 model = CatBoostRegressor()
 model.load_model("catboost_yield_model.cbm")
 
 # Define the unique values for dropdown inputs
-unique_soil_types = ['Sandy', 'Clay', 'Loam', 'Silt', 'Peaty', 'Chalky']
-unique_crops = ['Cotton', 'Rice', 'Barley', 'Soybean', 'Wheat', 'Maize']
+unique_soil_types = SOIL_TYPES
+unique_crops = CROPS
 unique_irrigation_used = [True, False]
 unique_fertilizer_used = [True, False]
 
 # Prediction function
 def predict_yield(soil_type, crop, rainfall, temperature, fertilizer_used, irrigation_used):
-    input_data = pd.DataFrame({
-        'Soil_Type': [soil_type],
-        'Crop': [crop],
-        'Rainfall_mm': [float(rainfall)],
-        'Temperature_Celsius': [float(temperature)],
-        'Fertilizer_Used': [fertilizer_used],
-        'Irrigation_Used': [irrigation_used]
-    })
-    prediction = model.predict(input_data)
+    # One row, in yield_model.FEATURES order, encoded without a DataFrame
+    row = (soil_type, crop, float(rainfall), float(temperature), fertilizer_used, irrigation_used)
+    prediction = predict_rows(model, [row], FeatureEncoder())
     return f"Predicted Yield (tons per hectare): {prediction[0]:.2f}"
 
 # Create the Gradio interface
@@ -0,0 +1,182 @@
+"""
+Local climate normals by location, so yield requests can give lat/lon
+instead of typing rainfall and temperature.
+
+A normals store is a regular lat/lon grid of mean annual rainfall (mm)
+and mean temperature (Celsius), kept in two files:
+    climate_normals.npy   float32 array (2, rows, cols): rainfall, then
+                          temperature; NaN where there is no data (sea)
+    climate_normals.json  grid geometry (centre of the south-west cell,
+                          cell size) and the data source
+The array is memory-mapped: opening a continental grid costs nothing and
+only the cells that are looked up are read. A location resolves to its
+cell by arithmetic on the grid (no search), for a whole batch of
+coordinates at once, without network access.
+
+Build a store from a CSV with one row per grid cell, e.g. WorldClim or
+CRU normals exported to lat, lon, rainfall_mm, temperature_c:
+
+    python yield_climate.py build normals.csv climate_normals.npy
+    python yield_climate.py lookup climate_normals.npy 23.81 90.41
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CLIMATE_PATH = os.path.join(PROJECT_ROOT, "climate_normals.npy")
+VARIABLES = ("Rainfall_mm", "Temperature_Celsius")
+METHODS = ("bilinear", "nearest")
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def write_normals(path, grid, lat0, lon0, step_lat, step_lon, source=None):
+    """
+    Write a store: `grid` is (2, rows, cols) with row 0 at latitude lat0
+    and column 0 at longitude lon0 (cell centres).
+    """
+    grid = np.asarray(grid, dtype=np.float32)
+    if grid.ndim != 3 or grid.shape[0] != len(VARIABLES):
+        raise ValueError(f"Expected a (2, rows, cols) grid, got shape {grid.shape}.")
+    if step_lat <= 0 or step_lon <= 0:
+        raise ValueError("Cell sizes must be positive.")
+    np.save(path, grid)
+    meta = {
+        "variables": list(VARIABLES),
+        "lat0": float(lat0),
+        "lon0": float(lon0),
+        "step_lat": float(step_lat),
+        "step_lon": float(step_lon),
+        "rows": grid.shape[1],
+        "cols": grid.shape[2],
+        "source": source,
+    }
+    with open(_meta_path(path), "w") as f:
+        json.dump(meta, f, indent=1)
+
+
+def _regular_axis(values, name):
+    """(first, step, index of each value) for coordinates on a regular axis."""
+    axis = np.unique(values)
+    if len(axis) == 1:
+        return axis[0], 1.0, np.zeros(len(values), dtype=np.intp)
+    # Span over cell count, so float noise in the input does not creep into the step
+    step = (axis[-1] - axis[0]) / np.rint((axis[-1] - axis[0]) / np.diff(axis).min())
+    index = np.rint((values - axis[0]) / step).astype(np.intp)
+    if not np.allclose(axis[0] + index * step, values, atol=step * 1e-3):
+        raise ValueError(f"{name} values are not on a regular grid.")
+    return axis[0], step, index
+
+
+def normals_from_table(lat, lon, rainfall, temperature):
+    """(grid, lat0, lon0, step_lat, step_lon) from one row per grid cell."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat0, step_lat, rows = _regular_axis(lat, "Latitude")
+    lon0, step_lon, cols = _regular_axis(lon, "Longitude")
+    grid = np.full((len(VARIABLES), rows.max() + 1, cols.max() + 1), np.nan, dtype=np.float32)
+    grid[0, rows, cols] = rainfall
+    grid[1, rows, cols] = temperature
+    return grid, lat0, lon0, step_lat, step_lon
+
+
+class ClimateNormals:
+    """A memory-mapped normals store (see the module docstring)."""
+
+    def __init__(self, path=CLIMATE_PATH):
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+        if meta.get("variables") != list(VARIABLES):
+            raise ValueError(f"{path}: expected variables {list(VARIABLES)}.")
+        self.path = path
+        self.source = meta.get("source")
+        self.lat0, self.lon0 = meta["lat0"], meta["lon0"]
+        self.step_lat, self.step_lon = meta["step_lat"], meta["step_lon"]
+        self.grid = np.load(path, mmap_mode="r")
+        self.rows, self.cols = self.grid.shape[1:]
+        if (self.rows, self.cols) != (meta["rows"], meta["cols"]):
+            raise ValueError(f"{path}: grid shape does not match {_meta_path(path)}.")
+
+    def lookup(self, lat, lon, method="bilinear"):
+        """
+        (rainfall, temperature) arrays for arrays of coordinates; NaN
+        outside the grid or where there is no data. "bilinear" blends the
+        four surrounding cells, skipping cells without data.
+        """
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}.")
+        # Fractional row/column of each location, cell centres at integers
+        r = (np.asarray(lat, dtype=np.float64) - self.lat0) / self.step_lat
+        c = (np.asarray(lon, dtype=np.float64) - self.lon0) / self.step_lon
+        inside = (r >= -0.5) & (r <= self.rows - 0.5) & (c >= -0.5) & (c <= self.cols - 0.5)
+        r = np.where(inside, r, 0.0)
+        c = np.where(inside, c, 0.0)
+
+        if method == "nearest":
+            values = self.grid[:, np.rint(r).astype(np.intp), np.rint(c).astype(np.intp)]
+        else:
+            r0 = np.clip(np.floor(r), 0, max(self.rows - 2, 0)).astype(np.intp)
+            c0 = np.clip(np.floor(c), 0, max(self.cols - 2, 0)).astype(np.intp)
+            r1 = np.minimum(r0 + 1, self.rows - 1)
+            c1 = np.minimum(c0 + 1, self.cols - 1)
+            fr = np.clip(r - r0, 0.0, 1.0)
+            fc = np.clip(c - c0, 0.0, 1.0)
+            total = np.zeros((len(VARIABLES),) + r.shape)
+            weight = np.zeros((len(VARIABLES),) + r.shape)
+            for rows, cols, w in (
+                (r0, c0, (1 - fr) * (1 - fc)), (r0, c1, (1 - fr) * fc),
+                (r1, c0, fr * (1 - fc)), (r1, c1, fr * fc),
+            ):
+                cell = self.grid[:, rows, cols].astype(np.float64)
+                valid = ~np.isnan(cell)
+                total += np.where(valid, cell, 0.0) * w
+                weight += valid * w
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = np.where(weight > 0, total / weight, np.nan)
+
+        values = np.where(inside, values, np.nan)
+        return values[0], values[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a climate normals store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="grid a CSV of cells into a store")
+    build.add_argument("csv")
+    build.add_argument("output", nargs="?", default=CLIMATE_PATH)
+    build.add_argument("--lat", default="lat")
+    build.add_argument("--lon", default="lon")
+    build.add_argument("--rainfall", default="rainfall_mm")
+    build.add_argument("--temperature", default="temperature_c")
+    build.add_argument("--source", help="where the normals come from (kept in the metadata)")
+    lookup = sub.add_parser("lookup", help="print the normals at one location")
+    lookup.add_argument("store")
+    lookup.add_argument("lat", type=float)
+    lookup.add_argument("lon", type=float)
+    lookup.add_argument("--method", choices=METHODS, default="bilinear")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        import pandas as pd
+
+        table = pd.read_csv(args.csv, usecols=[args.lat, args.lon, args.rainfall, args.temperature])
+        grid, lat0, lon0, step_lat, step_lon = normals_from_table(
+            table[args.lat], table[args.lon], table[args.rainfall], table[args.temperature],
+        )
+        write_normals(args.output, grid, lat0, lon0, step_lat, step_lon, args.source or os.path.basename(args.csv))
+        print(f"Wrote {args.output}: {grid.shape[1]} x {grid.shape[2]} cells of "
+              f"{step_lat:g} x {step_lon:g} degrees", file=sys.stderr)
+    else:
+        rainfall, temperature = ClimateNormals(args.store).lookup([args.lat], [args.lon], args.method)
+        print(json.dumps({VARIABLES[0]: float(rainfall[0]), VARIABLES[1]: float(temperature[0])}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Per-feature contributions (SHAP values) for yield predictions.
+
+base_value plus the contributions equals the model's prediction for the
+row. With the NumPy export (yield_model.npz) they come from its SHAP
+tables, which reproduce CatBoost's ShapValues: one gather per tree, about
+the cost of a prediction, so explanations can be on for every request.
+score_rows() returns those predictions with the explanations, so
+explained rows need no separate model call.
+
+With a CatBoost model file they come from CatBoost's ShapValues, computed
+for a whole batch with one get_feature_importance call. The model only sees a float feature through "value > border" comparisons.
+Rows with the same categories whose float features fall between the same
+borders therefore get identical SHAP values. That (categories, border
+bins) signature is the cache key, so cached explanations are exact, not
+approximations for nearby inputs. Repeated soil/crop/management
+combinations are served from the cache; only new signatures cost a
+CatBoost call (about 5 ms per call, plus ~0.4 ms per row in a batch).
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from yield_model import (
+    CROPS, FEATURES, FLOAT_FEATURES, NPZ_PATH, SOIL_TYPES, FeatureEncoder, catboost_pool, load_model,
+)
+
+DEFAULT_CACHE_SIZE = 10_000
+DECIMALS = 4
+
+
+def has_shap_tables(npz_path=NPZ_PATH):
+    """Whether `npz_path` is a NumPy export with SHAP tables."""
+    try:
+        with np.load(npz_path) as data:
+            return "shap_tables" in data.files
+    except (OSError, ValueError):
+        return False
+
+
+class YieldExplainer:
+    """
+    Batched SHAP explanations from a NumPy export with SHAP tables
+    (model_path ending in .npz) or a CatBoost model file (needs catboost;
+    explanations cached by signature). The model is loaded on first use
+    or by warm_up(). Thread-safe.
+
+    With an export, `catboost_model` may be the already loaded
+    CatBoostRegressor it was exported from: rows are then routed to their
+    leaves by its calc_leaf_indexes, which is faster than in NumPy.
+    """
+
+    def __init__(self, model_path=NPZ_PATH, cache_size=DEFAULT_CACHE_SIZE, catboost_model=None):
+        self.model_path = model_path
+        self.catboost_model = catboost_model
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._model = None
+        self._borders = None
+
+    @property
+    def numpy(self):
+        return self.model_path.endswith(".npz")
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is None and self.numpy:
+                model = load_model(self.model_path)
+                if not model.has_explanations:
+                    raise ValueError(f"{self.model_path} has no SHAP tables; re-run `python yield_model.py export`.")
+                self._model = model
+            elif self._model is None:
+                from catboost import CatBoostRegressor
+
+                model = CatBoostRegressor()
+                model.load_model(self.model_path)
+                borders = model.get_borders()  # flat feature index -> borders
+                self._borders = [
+                    np.array(sorted(borders.get(FEATURES.index(name), [])), dtype=np.float32)
+                    for name in FLOAT_FEATURES
+                ]
+                self._model = model
+        return self._model
+
+    def warm_up(self):
+        """Load the model and run one explanation (the first call is slow)."""
+        model = self._load()
+        encoder = FeatureEncoder()
+        encoder.fill([(SOIL_TYPES[0], CROPS[0], 0.0, 0.0, False, False)])
+        if self.numpy:
+            self.explain_rows([(SOIL_TYPES[0], CROPS[0], 0.0, 0.0, False, False)])
+        else:
+            model.get_feature_importance(encoder.pool(), type="ShapValues")
+
+    def _signatures(self, numbers, categories):
+        # searchsorted puts NaN above every border; give it its own bin (-1)
+        bins = np.column_stack([
+            np.where(np.isnan(numbers[:, j]), -1, np.searchsorted(borders, numbers[:, j], side="left"))
+            for j, borders in enumerate(self._borders)
+        ])
+        return [tuple(cats) + tuple(row) for cats, row in zip(categories.tolist(), bins.tolist())]
+
+    def score_rows(self, rows):
+        """
+        (predictions, explanations) for feature rows from the SHAP tables;
+        each prediction is the base value plus the row's contributions.
+        NumPy exports only.
+        """
+        if not self.numpy:
+            raise ValueError("score_rows needs a NumPy export with SHAP tables.")
+        model = self._load()
+        encoder = FeatureEncoder(len(rows))
+        encoder.fill(rows)
+        numbers, categories = encoder.arrays()
+        if self.catboost_model is not None:
+            shap = model.explain_leaves(self.catboost_model.calc_leaf_indexes(catboost_pool(numbers, categories)))
+        else:
+            shap = model.explain_arrays(numbers, categories)
+        base_value = round(float(model.shap_base), DECIMALS)
+        explanations = [
+            {"base_value": base_value, "contributions": dict(zip(FEATURES, values))}
+            for values in shap.round(DECIMALS).tolist()
+        ]
+        return shap.sum(axis=1) + model.shap_base, explanations
+
+    def explain_rows(self, rows):
+        """
+        {"base_value", "contributions": {feature: value}} for each feature
+        row (tuples in FEATURES order): from the SHAP tables, or with one
+        CatBoost call for all rows not in the cache.
+        """
+        if self.numpy:
+            return self.score_rows(rows)[1]
+        model = self._load()
+        encoder = FeatureEncoder(len(rows))
+        encoder.fill(rows)
+        numbers, categories = encoder.arrays()
+        keys = self._signatures(numbers, categories)
+
+        explanations = [None] * len(rows)
+        missing = {}  # signature -> positions
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    explanations[i] = cached
+                elif key in missing:
+                    self.hits += 1
+                    missing[key].append(i)
+                else:
+                    self.misses += 1
+                    missing[key] = [i]
+
+        if missing:
+            first = [positions[0] for positions in missing.values()]
+            shap = model.get_feature_importance(
+                catboost_pool(numbers[first], categories[first]), type="ShapValues",
+            )
+            with self._lock:
+                for (key, positions), values in zip(missing.items(), shap.tolist()):
+                    explanation = {
+                        "base_value": round(values[-1], DECIMALS),
+                        "contributions": {
+                            name: round(value, DECIMALS) for name, value in zip(FEATURES, values)
+                        },
+                    }
+                    for i in positions:
+                        explanations[i] = explanation
+                    self._cache[key] = explanation
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        # Copies, so callers cannot modify cached entries
+        return [
+            {"base_value": e["base_value"], "contributions": dict(e["contributions"])}
+            for e in explanations
+        ]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
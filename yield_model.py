@@ -0,0 +1,736 @@
+"""
+Pure-NumPy evaluator for the CatBoost yield model.
+
+`export` turns yield_model.cbm (through CatBoost's JSON model dump) into
+flat arrays in yield_model.npz: split features and thresholds, leaf values
+per oblivious tree, and the CTR tables for the categorical features. The
+evaluator only needs NumPy: a batch is binarized against all split
+thresholds at once, each tree's leaf index is built from its split bits,
+and the leaf values are summed.
+
+Categorical values are hashed exactly as CatBoost does (CityHash64 v1.0,
+low 32 bits), so unseen values fall back to the CTR priors just like
+CatBoostRegressor.predict. Float inputs and CTR values are compared with
+the float32 borders in float32, as CatBoost does.
+
+SHAP values: within one tree, a row's contributions depend only on the
+leaf it reaches. The export runs CatBoost's TreeSHAP (path-dependent,
+weighted by the training leaf weights) once per tree and leaf and stores
+the (tree, leaf, feature) table, so explaining a row costs one more
+gather than predicting it. As in CatBoost, the last split of a tree is
+its root and a CTR split is credited to its categorical features.
+
+    python yield_model.py export            # yield_model.cbm -> yield_model.npz
+    python yield_model.py verify            # compare with CatBoostRegressor (predictions, SHAP)
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CBM_PATH = os.path.join(PROJECT_ROOT, "yield_model.cbm")
+NPZ_PATH = os.path.join(PROJECT_ROOT, "yield_model.npz")
+FORMAT_VERSION = 1
+
+# Model inputs, in the order the model was trained with
+FEATURES = ["Soil_Type", "Crop", "Rainfall_mm", "Temperature_Celsius", "Fertilizer_Used", "Irrigation_Used"]
+CAT_FEATURES = FEATURES[:2]
+FLOAT_FEATURES = FEATURES[2:]
+
+# Categories the model was trained on
+SOIL_TYPES = ["Sandy", "Clay", "Loam", "Silt", "Peaty", "Chalky"]
+CROPS = ["Cotton", "Rice", "Barley", "Soybean", "Wheat", "Maize"]
+
+# Rows evaluated per block, keeping the (trees x rows) temporaries in cache
+_BLOCK = 1024
+
+# CTR kinds stored in ctr_type
+_CTR_BORDERS = 0
+_CTR_COUNTER = 1
+
+# Projection element kinds stored in proj_kind
+_CAT_VALUE = 0
+_FLOAT_BIN = 1
+
+_EMPTY_HASH = 0xFFFFFFFFFFFFFFFF
+_HASH_MULT = np.uint64(0x4906BA494954CB65)
+
+
+# ------------------------------------
+# CityHash64 (v1.0), as used by CatBoost for categorical values
+# ------------------------------------
+_M64 = 0xFFFFFFFFFFFFFFFF
+_K0 = 0xC3A5C85C97CB3127
+_K1 = 0xB492B66FBE98F273
+_K2 = 0x9AE16A3B2F90404F
+_K3 = 0xC949D7C7509E6557
+_KMUL = 0x9DDFEA08EB382D69
+
+
+def _fetch64(s, i):
+    return struct.unpack_from("<Q", s, i)[0]
+
+
+def _fetch32(s, i):
+    return struct.unpack_from("<I", s, i)[0]
+
+
+def _rotate(v, shift):
+    return v if shift == 0 else ((v >> shift) | (v << (64 - shift))) & _M64
+
+
+def _shift_mix(v):
+    return v ^ (v >> 47)
+
+
+def _hash_len16(u, v):
+    a = ((u ^ v) * _KMUL) & _M64
+    a ^= a >> 47
+    b = ((v ^ a) * _KMUL) & _M64
+    b ^= b >> 47
+    return (b * _KMUL) & _M64
+
+
+def _hash_len0to16(s):
+    n = len(s)
+    if n > 8:
+        a = _fetch64(s, 0)
+        b = _fetch64(s, n - 8)
+        return _hash_len16(a, _rotate((b + n) & _M64, n)) ^ b
+    if n >= 4:
+        return _hash_len16((n + (_fetch32(s, 0) << 3)) & _M64, _fetch32(s, n - 4))
+    if n > 0:
+        y = (s[0] + (s[n >> 1] << 8)) & 0xFFFFFFFF
+        z = (n + (s[n - 1] << 2)) & 0xFFFFFFFF
+        return (_shift_mix(((y * _K2) ^ (z * _K3)) & _M64) * _K2) & _M64
+    return _K2
+
+
+def _hash_len17to32(s):
+    n = len(s)
+    a = (_fetch64(s, 0) * _K1) & _M64
+    b = _fetch64(s, 8)
+    c = (_fetch64(s, n - 8) * _K2) & _M64
+    d = (_fetch64(s, n - 16) * _K0) & _M64
+    return _hash_len16(
+        (_rotate((a - b) & _M64, 43) + _rotate(c, 30) + d) & _M64,
+        (a + _rotate(b ^ _K3, 20) - c + n) & _M64,
+    )
+
+
+def _hash_len33to64(s):
+    n = len(s)
+    z = _fetch64(s, 24)
+    a = (_fetch64(s, 0) + (n + _fetch64(s, n - 16)) * _K0) & _M64
+    b = _rotate((a + z) & _M64, 52)
+    c = _rotate(a, 37)
+    a = (a + _fetch64(s, 8)) & _M64
+    c = (c + _rotate(a, 7)) & _M64
+    a = (a + _fetch64(s, 16)) & _M64
+    vf = (a + z) & _M64
+    vs = (b + _rotate(a, 31) + c) & _M64
+    a = (_fetch64(s, 16) + _fetch64(s, n - 32)) & _M64
+    z = _fetch64(s, n - 8)
+    b = _rotate((a + z) & _M64, 52)
+    c = _rotate(a, 37)
+    a = (a + _fetch64(s, n - 24)) & _M64
+    c = (c + _rotate(a, 7)) & _M64
+    a = (a + _fetch64(s, n - 16)) & _M64
+    wf = (a + z) & _M64
+    ws = (b + _rotate(a, 31) + c) & _M64
+    r = _shift_mix(((vf + ws) * _K2 + (wf + vs) * _K0) & _M64)
+    return (_shift_mix((r * _K0 + vs) & _M64) * _K2) & _M64
+
+
+def _weak_hash_len32(s, i, a, b):
+    w, x, y, z = _fetch64(s, i), _fetch64(s, i + 8), _fetch64(s, i + 16), _fetch64(s, i + 24)
+    a = (a + w) & _M64
+    b = _rotate((b + a + z) & _M64, 21)
+    c = a
+    a = (a + x + y) & _M64
+    b = (b + _rotate(a, 44)) & _M64
+    return (a + z) & _M64, (b + c) & _M64
+
+
+def city_hash64(s):
+    """CityHash64 (v1.0) of a bytes object."""
+    n = len(s)
+    if n <= 16:
+        return _hash_len0to16(s)
+    if n <= 32:
+        return _hash_len17to32(s)
+    if n <= 64:
+        return _hash_len33to64(s)
+
+    x = _fetch64(s, 0)
+    y = _fetch64(s, n - 16) ^ _K1
+    z = _fetch64(s, n - 56) ^ _K0
+    v = _weak_hash_len32(s, n - 64, n, y)
+    w = _weak_hash_len32(s, n - 32, (n * _K1) & _M64, _K0)
+    z = (z + _shift_mix(v[1]) * _K1) & _M64
+    x = (_rotate((z + x) & _M64, 39) * _K1) & _M64
+    y = (_rotate(y, 33) * _K1) & _M64
+    for i in range(0, (n - 1) & ~63, 64):
+        x = (_rotate((x + y + v[0] + _fetch64(s, i + 16)) & _M64, 37) * _K1) & _M64
+        y = (_rotate((y + v[1] + _fetch64(s, i + 48)) & _M64, 42) * _K1) & _M64
+        x ^= w[1]
+        y ^= v[0]
+        z = _rotate(z ^ w[0], 33)
+        v = _weak_hash_len32(s, i, (v[1] * _K1) & _M64, (x + w[0]) & _M64)
+        w = _weak_hash_len32(s, i + 32, (z + w[1]) & _M64, y)
+        z, x = x, z
+    return _hash_len16(
+        (_hash_len16(v[0], w[0]) + _shift_mix(y) * _K1 + z) & _M64,
+        (_hash_len16(v[1], w[1]) + x) & _M64,
+    )
+
+
+def cat_feature_hash(value):
+    """
+    CatBoost's hash of a categorical value: low 32 bits of CityHash64 of
+    its string form, sign-extended to 64 bits as the model does.
+    """
+    h = city_hash64(str(value).encode("utf-8")) & 0xFFFFFFFF
+    return (h | 0xFFFFFFFF00000000) if h >= 1 << 31 else h
+
+
+# ------------------------------------
+# EXPORT (needs catboost)
+# ------------------------------------
+def _json_dump(cbm_path):
+    import tempfile
+
+    from catboost import CatBoostRegressor
+
+    model = CatBoostRegressor()
+    model.load_model(cbm_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            return model.feature_names_, json.load(f)
+
+
+def export_arrays(cbm_path=CBM_PATH):
+    """Flat NumPy arrays for yield_model.cbm (see the module docstring)."""
+    feature_names, dump = _json_dump(cbm_path)
+    info = dump["features_info"]
+    float_features = info.get("float_features", [])
+    cat_features = info.get("categorical_features", [])
+    ctrs = info.get("ctrs", [])
+    if dump.get("oblivious_trees") is None:
+        raise ValueError("Only models with oblivious (symmetric) trees are supported.")
+
+    # CatBoost numbers the binary features: every float border, then every CTR border
+    split_table = []
+    for f, feature in enumerate(float_features):
+        split_table += [(f, border) for border in feature.get("borders") or []]
+    for c, ctr in enumerate(ctrs):
+        split_table += [(len(float_features) + c, border) for border in ctr["borders"]]
+
+    # Used splits only, plus an always-false split to pad shallow trees
+    used = sorted({s["split_index"] for tree in dump["oblivious_trees"] for s in tree["splits"]})
+    used_pos = {split: i for i, split in enumerate(used)}
+    split_feature = np.array([split_table[s][0] for s in used] + [0], dtype=np.int32)
+    split_border = np.array([split_table[s][1] for s in used] + [np.inf], dtype=np.float32)
+    never = len(used)
+
+    trees = dump["oblivious_trees"]
+    depth = max(len(tree["splits"]) for tree in trees)
+    tree_splits = np.full((len(trees), depth), never, dtype=np.int32)
+    leaf_values = np.zeros((len(trees), 1 << depth), dtype=np.float64)
+    leaf_weights = np.zeros((len(trees), 1 << depth), dtype=np.float64)
+    for t, tree in enumerate(trees):
+        for d, split in enumerate(tree["splits"]):
+            if split["split_type"] not in ("FloatFeature", "OnlineCtr"):
+                raise ValueError(f"Unsupported split type: {split['split_type']}.")
+            tree_splits[t, d] = used_pos[split["split_index"]]
+        values = np.asarray(tree["leaf_values"], dtype=np.float64)
+        # Unused high index bits are always 0, so only the first entries are reached
+        leaf_values[t, :len(values)] = values
+        leaf_weights[t, :len(values)] = tree["leaf_weights"]
+
+    ctr_type, ctr_prior_num, ctr_prior_denom, ctr_shift, ctr_scale = [], [], [], [], []
+    proj_offsets, proj_kind, proj_index, proj_border = [0], [], [], []
+    table_offsets, table_keys, table_num, table_den = [0], [], [], []
+    cat_positions = {feature["feature_index"]: i for i, feature in enumerate(cat_features)}
+    for ctr in ctrs:
+        kind = {"Borders": _CTR_BORDERS, "Counter": _CTR_COUNTER}.get(ctr["ctr_type"])
+        if kind is None:
+            raise ValueError(f"Unsupported CTR type: {ctr['ctr_type']}.")
+        ctr_type.append(kind)
+        ctr_prior_num.append(ctr["prior_numerator"])
+        ctr_prior_denom.append(ctr["prior_denomerator"])
+        ctr_shift.append(ctr["shift"])
+        ctr_scale.append(ctr["scale"])
+
+        for element in ctr["elements"]:
+            if element["combination_element"] == "cat_feature_value":
+                proj_kind.append(_CAT_VALUE)
+                proj_index.append(cat_positions[element["cat_feature_index"]])
+                proj_border.append(0.0)
+            elif element["combination_element"] == "float_feature":
+                proj_kind.append(_FLOAT_BIN)
+                proj_index.append(element["float_feature_index"])
+                proj_border.append(element["border"])
+            else:
+                raise ValueError(f"Unsupported CTR element: {element['combination_element']}.")
+        proj_offsets.append(len(proj_kind))
+
+        data = dump["ctr_data"][ctr["identifier"]]
+        stride = data["hash_stride"]
+        entries = data["hash_map"]
+        rows = {}
+        for i in range(0, len(entries), stride):
+            key = int(entries[i])
+            if key == _EMPTY_HASH:
+                continue
+            counts = [float(c) for c in entries[i + 1:i + stride]]
+            if kind == _CTR_COUNTER:
+                rows[key] = (counts[0], float(data["counter_denominator"]))
+            else:
+                # Target classes above target_border_idx count as "good"
+                good = sum(counts[ctr["target_border_idx"] + 1:])
+                rows[key] = (good, sum(counts))
+        keys = sorted(rows)
+        table_keys += keys
+        table_num += [rows[k][0] for k in keys]
+        table_den += [rows[k][1] for k in keys]
+        table_offsets.append(len(table_keys))
+
+    scale, bias = dump.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    # Flat features each split is credited to in SHAP values; None for padding
+    split_credit = []
+    for f in split_feature[:-1].tolist():
+        if f < len(float_features):
+            split_credit.append((float_features[f]["flat_feature_index"],))
+        else:
+            elements = ctrs[f - len(float_features)]["elements"]
+            split_credit.append(tuple(sorted({
+                cat_features[cat_positions[e["cat_feature_index"]]]["flat_feature_index"]
+                for e in elements if e["combination_element"] == "cat_feature_value"
+            })))
+    split_credit.append(None)
+    shap_tables, shap_base = _shap_tables(tree_splits, split_credit, leaf_values, leaf_weights, len(feature_names))
+    return {
+        "format_version": np.array(FORMAT_VERSION),
+        "feature_names": np.array(feature_names),
+        "float_columns": np.array([f["flat_feature_index"] for f in float_features], dtype=np.int32),
+        "cat_columns": np.array([f["flat_feature_index"] for f in cat_features], dtype=np.int32),
+        "split_feature": split_feature,
+        "split_border": split_border,
+        "tree_splits": tree_splits,
+        "leaf_values": leaf_values,
+        "scale": np.array(scale, dtype=np.float64),
+        "bias": np.array(bias, dtype=np.float64),
+        "ctr_type": np.array(ctr_type, dtype=np.int8),
+        "ctr_prior_num": np.array(ctr_prior_num, dtype=np.float32),
+        "ctr_prior_denom": np.array(ctr_prior_denom, dtype=np.float32),
+        "ctr_shift": np.array(ctr_shift, dtype=np.float32),
+        "ctr_scale": np.array(ctr_scale, dtype=np.float32),
+        "proj_offsets": np.array(proj_offsets, dtype=np.int32),
+        "proj_kind": np.array(proj_kind, dtype=np.int8),
+        "proj_index": np.array(proj_index, dtype=np.int32),
+        "proj_border": np.array(proj_border, dtype=np.float32),
+        "table_offsets": np.array(table_offsets, dtype=np.int64),
+        "table_keys": np.array(table_keys, dtype=np.uint64),
+        "table_num": np.array(table_num, dtype=np.float32),
+        "table_den": np.array(table_den, dtype=np.float32),
+        "shap_tables": shap_tables * scale,
+        "shap_base": np.array(shap_base * scale + bias, dtype=np.float64),
+    }
+
+
+def _shap_tables(tree_splits, split_credit, leaf_values, leaf_weights, n_features):
+    """
+    (trees, leaves, features) SHAP values of each tree for a row reaching
+    each leaf, and the summed expected value of the trees. Exact Shapley
+    values over each tree's players (the distinct feature sets its splits
+    are credited to), each shared equally by the player's features.
+    """
+    depth = tree_splits.shape[1]
+    leaves = np.arange(1 << depth)
+    bits = (leaves[:, None] >> np.arange(depth)) & 1  # (leaf, level)
+    same = bits[:, None, :] == bits[None, :, :]  # (reached leaf, leaf, level)
+    tables = np.zeros((len(tree_splits), 1 << depth, n_features))
+    base = 0.0
+    for t, splits in enumerate(tree_splits):
+        weights = leaf_weights[t]
+        # Share of a node's training weight in each child: the last split is
+        # the root, so the node above level l has fixed levels l+1..depth-1
+        ratio = np.zeros((1 << depth, depth))
+        for level in range(depth):
+            below = leaves & -(1 << level)
+            above = leaves & -(2 << level)
+            node = np.bincount(above, weights, minlength=1 << depth)[above]
+            child = np.bincount(below, weights, minlength=1 << depth)[below]
+            np.divide(child, node, out=ratio[:, level], where=node > 0)
+
+        credit = [split_credit[s] for s in splits]
+        players = sorted({c for c in credit if c is not None})
+        level_player = np.array([players.index(c) if c is not None else -1 for c in credit])
+        subsets = np.arange(1 << len(players))
+        # A level is fixed to the row's side when its player is in the subset;
+        # padding levels are always fixed (the row and all weight go left)
+        fixed = (level_player < 0) | ((subsets[:, None] >> np.maximum(level_player, 0)) & 1).astype(bool)
+        factor = np.where(fixed[:, None, None, :], same[None], ratio[None, None])
+        expected = factor.prod(axis=3) @ leaf_values[t]  # (subset, reached leaf)
+
+        sizes = np.array([bin(subset).count("1") for subset in subsets])
+        for i, player in enumerate(players):
+            without = subsets[(subsets >> i) & 1 == 0]
+            k = sizes[without]
+            shapley = np.array([
+                math.factorial(a) * math.factorial(len(players) - a - 1) for a in k
+            ]) / math.factorial(len(players))
+            value = shapley @ (expected[without | (1 << i)] - expected[without])
+            for feature in player:
+                tables[t, :, feature] += value / len(player)
+        base += expected[0, 0]
+    return tables, base
+
+
+def export_model(cbm_path=CBM_PATH, npz_path=NPZ_PATH):
+    np.savez_compressed(npz_path, **export_arrays(cbm_path))
+
+
+# ------------------------------------
+# EVALUATION (NumPy only)
+# ------------------------------------
+class ObliviousTreeModel:
+    """A yield_model.npz loaded for prediction."""
+
+    def __init__(self, arrays):
+        version = int(arrays["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {version}.")
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.depth = self.tree_splits.shape[1]
+        # Leaf values flattened, with each tree's offset into them
+        self._leaves = self.leaf_values.ravel()
+        self._leaf_offsets = (np.arange(len(self.tree_splits)) << self.depth)[:, None]
+        if self.has_explanations:
+            self._shap_rows = self.shap_tables.reshape(-1, self.shap_tables.shape[-1])
+        # Hashes of the known categories only: caching every value a request
+        # sends would let arbitrary input grow the dict without bound
+        self._known_hashes = {value: cat_feature_hash(value) for value in SOIL_TYPES + CROPS}
+        self._prepare_ctrs()
+
+    def _prepare_ctrs(self):
+        # Float features enter CTR projections only as "value > border" bins;
+        # each distinct bin is computed once per batch
+        is_float = self.proj_kind == _FLOAT_BIN
+        bins = sorted(set(zip(self.proj_index[is_float].tolist(), self.proj_border[is_float].tolist())))
+        bin_pos = {b: i for i, b in enumerate(bins)}
+        self._bin_feature = np.array([f for f, _ in bins], dtype=np.intp)
+        self._bin_border = np.array([b for _, b in bins], dtype=np.float32)
+
+        # CTR projections as (ctrs x elements) arrays, so all CTRs are hashed at once
+        lengths = np.diff(self.proj_offsets)
+        width = int(lengths.max()) if len(lengths) else 0
+        self._proj_active = np.arange(width) < lengths[:, None]
+        # Columns of [category hashes, bins] each element hashes in
+        self._proj_column = np.zeros((len(lengths), width), dtype=np.intp)
+        for c, start in enumerate(self.proj_offsets[:-1]):
+            for e in range(start, self.proj_offsets[c + 1]):
+                if self.proj_kind[e] == _CAT_VALUE:
+                    self._proj_column[c, e - start] = self.proj_index[e]
+                else:
+                    key = (int(self.proj_index[e]), float(self.proj_border[e]))
+                    self._proj_column[c, e - start] = len(self.cat_columns) + bin_pos[key]
+
+        # Lookups binary-search each CTR's slice of the sorted keys; one
+        # padding entry keeps every probe in bounds
+        sizes = np.diff(self.table_offsets)
+        self._search_steps = int(sizes.max()).bit_length() if len(sizes) else 0
+        self._table_keys = np.append(self.table_keys, np.uint64(0))
+        self._table_num = np.append(self.table_num, np.float32(0))
+        self._table_den = np.append(self.table_den, np.float32(0))
+
+    def _hash_column(self, values):
+        known = self._known_hashes
+        out = np.empty(len(values), dtype=np.uint64)
+        for i, value in enumerate(values):
+            h = known.get(value)
+            out[i] = h if h is not None else cat_feature_hash(value)
+        return out
+
+    def _ctr_values(self, floats, hashes):
+        bins = floats[:, self._bin_feature] > self._bin_border
+        # CTRs depend only on the categories and bins, which repeat a lot
+        # within a batch: compute them once per distinct combination
+        signature = np.hstack([hashes, np.packbits(bins, axis=1)])
+        _, first, inverse = np.unique(signature, axis=0, return_index=True, return_inverse=True)
+        columns = np.hstack([hashes[first], bins[first].astype(np.uint64)])
+        return self._ctr_table(columns)[inverse.reshape(-1)]
+
+    def _ctr_table(self, columns):
+        key = np.zeros((len(columns), len(self.ctr_type)), dtype=np.uint64)
+        for e in range(self._proj_active.shape[1]):
+            value = columns[:, self._proj_column[:, e]]
+            # CatBoost's CalcHash(a, b) = MULT * (a + MULT * b), mod 2**64
+            key = np.where(self._proj_active[:, e], _HASH_MULT * (key + _HASH_MULT * value), key)
+
+        # Lower bound of each key within its CTR's slice of table_keys
+        end = self.table_offsets[1:]
+        lo = np.broadcast_to(self.table_offsets[:-1], key.shape)
+        hi = np.broadcast_to(end, key.shape)
+        for _ in range(self._search_steps):
+            mid = (lo + hi) >> 1
+            right = self._table_keys[mid] < key
+            lo = np.where(right, np.minimum(mid + 1, hi), lo)
+            hi = np.where(right, hi, mid)
+        found = (lo < end) & (self._table_keys[lo] == key)
+        num = np.where(found, self._table_num[lo], np.float32(0))
+        den = np.where(found, self._table_den[lo], np.float32(0))
+
+        ctr = (num + self.ctr_prior_num) / (den + self.ctr_prior_denom)
+        return (ctr + self.ctr_shift) * self.ctr_scale
+
+    def _leaf_index(self, floats, hashes):
+        """(trees x rows) flat index into the leaves of all trees."""
+        # Feature-major (features x rows), so every gather below copies whole rows
+        values = floats.T
+        if len(self.ctr_type):
+            values = np.vstack([values, self._ctr_values(floats, hashes).T])
+        bits = (values[self.split_feature] > self.split_border[:, None]).view(np.uint8)
+
+        index = bits[self.tree_splits[:, 0]]
+        for d in range(1, self.depth):
+            index += bits[self.tree_splits[:, d]] * np.uint8(1 << d)
+        return index + self._leaf_offsets
+
+    def _predict_block(self, floats, hashes):
+        return self._leaves.take(self._leaf_index(floats, hashes)).sum(axis=0) * self.scale + self.bias
+
+    @property
+    def has_explanations(self):
+        """Whether the export carries SHAP tables (older exports do not)."""
+        return hasattr(self, "shap_tables")
+
+    def predict(self, features):
+        """
+        Predictions for a batch. `features` maps feature name -> column
+        (a dict of sequences or a pandas DataFrame).
+        """
+        names = self.feature_names
+        n = len(features[names[0]])
+        numbers = np.empty((n, len(self.float_columns)), dtype=np.float32)
+        for j, i in enumerate(self.float_columns):
+            numbers[:, j] = np.asarray(features[names[i]], dtype=np.float64)
+        categories = np.empty((n, len(self.cat_columns)), dtype=object)
+        for j, i in enumerate(self.cat_columns):
+            categories[:, j] = list(features[names[i]])
+        return self.predict_arrays(numbers, categories)
+
+    def predict_arrays(self, numbers, categories):
+        """
+        Predictions from the float features (rows x features, model order)
+        and the categorical ones (object array, model order), as laid out
+        by FeatureEncoder.
+        """
+        numbers = np.asarray(numbers, dtype=np.float32)
+        hashes = np.empty(categories.shape, dtype=np.uint64)
+        for j in range(categories.shape[1]):
+            hashes[:, j] = self._hash_column(categories[:, j])
+
+        out = np.empty(len(numbers), dtype=np.float64)
+        for start in range(0, len(numbers), _BLOCK):
+            block = slice(start, start + _BLOCK)
+            out[block] = self._predict_block(numbers[block], hashes[block])
+        return out
+
+    def explain_arrays(self, numbers, categories):
+        """
+        (rows, features) SHAP values in feature_names order, as
+        CatBoost's ShapValues without the last column; that expected value
+        is shap_base for every row. Needs an export with SHAP tables.
+        """
+        if not self.has_explanations:
+            raise ValueError("This export has no SHAP tables; re-run `python yield_model.py export`.")
+        numbers = np.asarray(numbers, dtype=np.float32)
+        hashes = np.empty(categories.shape, dtype=np.uint64)
+        for j in range(categories.shape[1]):
+            hashes[:, j] = self._hash_column(categories[:, j])
+
+        out = np.empty((len(numbers), len(self.feature_names)), dtype=np.float64)
+        for start in range(0, len(numbers), _BLOCK):
+            block = slice(start, start + _BLOCK)
+            out[block] = self._shap_rows.take(self._leaf_index(numbers[block], hashes[block]), axis=0).sum(axis=0)
+        return out
+
+    def explain_leaves(self, leaf_indexes):
+        """
+        explain_arrays for rows whose (rows, trees) leaf indexes are known,
+        as CatBoostRegressor.calc_leaf_indexes returns them for this model.
+        """
+        if not self.has_explanations:
+            raise ValueError("This export has no SHAP tables; re-run `python yield_model.py export`.")
+        # (trees, rows) like _leaf_index: summing over the leading axis is much faster
+        return self._shap_rows.take(np.asarray(leaf_indexes).T + self._leaf_offsets, axis=0).sum(axis=0)
+
+
+def load_model(npz_path=NPZ_PATH):
+    with np.load(npz_path, allow_pickle=False) as data:
+        return ObliviousTreeModel({name: data[name] for name in data.files})
+
+
+# ------------------------------------
+# FEATURE ENCODING
+# ------------------------------------
+def feature_row(data):
+    """Model inputs for one request dict, in FEATURES order; raises on bad values."""
+    return (
+        data.get("Soil_Type"),
+        data.get("Crop"),
+        float(data.get("Rainfall_mm")),
+        float(data.get("Temperature_Celsius")),
+        bool(data.get("Fertilizer_Used")),
+        bool(data.get("Irrigation_Used")),
+    )
+
+
+class FeatureEncoder:
+    """
+    Reusable input buffers for batches of feature rows: the categorical
+    features in an object array and the rest in a float32 array, the
+    layout both backends take directly. The buffers are allocated once and
+    grow as needed. Not thread-safe; use one encoder per thread.
+    """
+
+    def __init__(self, capacity=1):
+        self._allocate(capacity)
+        self.size = 0
+
+    def _allocate(self, capacity):
+        self.categories = np.empty((capacity, len(CAT_FEATURES)), dtype=object)
+        self.numbers = np.empty((capacity, len(FLOAT_FEATURES)), dtype=np.float32)
+
+    def fill(self, rows):
+        """Write feature rows (tuples in FEATURES order); returns the row count."""
+        n = len(rows)
+        if n > len(self.numbers):
+            self._allocate(max(n, 2 * len(self.numbers)))
+        if n:
+            columns = list(zip(*rows))
+            for j in range(len(CAT_FEATURES)):
+                self.categories[:n, j] = columns[j]
+            for j in range(len(FLOAT_FEATURES)):
+                self.numbers[:n, j] = columns[len(CAT_FEATURES) + j]
+        self.size = n
+        return n
+
+    def arrays(self):
+        """(numbers, categories) views of the filled rows."""
+        return self.numbers[:self.size], self.categories[:self.size]
+
+    def pool(self):
+        """The filled rows as a catboost.Pool (needs catboost)."""
+        return catboost_pool(*self.arrays())
+
+
+def catboost_pool(numbers, categories):
+    """A catboost.Pool over arrays in FeatureEncoder layout (needs catboost)."""
+    from catboost import FeaturesData, Pool
+
+    # Named columns: CatBoost matches them to the model's features by name
+    return Pool(FeaturesData(
+        num_feature_data=numbers,
+        cat_feature_data=categories,
+        num_feature_names=FLOAT_FEATURES,
+        cat_feature_names=CAT_FEATURES,
+    ))
+
+
+def predict_arrays(model, numbers, categories, thread_count=-1):
+    """
+    Predictions for arrays in FeatureEncoder layout with either an
+    ObliviousTreeModel or a CatBoost model (which uses `thread_count`
+    threads, -1 = all cores).
+    """
+    if isinstance(model, ObliviousTreeModel):
+        return model.predict_arrays(numbers, categories)
+    return model.predict(catboost_pool(numbers, categories), thread_count=thread_count)
+
+
+def predict_rows(model, rows, encoder=None):
+    """Predictions for feature rows, without building a DataFrame."""
+    encoder = encoder if encoder is not None else FeatureEncoder(len(rows))
+    encoder.fill(rows)
+    return predict_arrays(model, *encoder.arrays())
+
+
+def verify(npz_path=NPZ_PATH, cbm_path=CBM_PATH, n=100_000, seed=0):
+    """Largest |difference| from CatBoostRegressor.predict on random inputs."""
+    import pandas as pd
+    from catboost import CatBoostRegressor
+
+    rng = np.random.default_rng(seed)
+    soils = SOIL_TYPES + ["Unseen soil"]
+    crops = CROPS + ["Unseen crop"]
+    frame = pd.DataFrame({
+        "Soil_Type": rng.choice(soils, n),
+        "Crop": rng.choice(crops, n),
+        "Rainfall_mm": rng.uniform(50, 1200, n),
+        "Temperature_Celsius": rng.uniform(10, 45, n),
+        "Fertilizer_Used": rng.random(n) < 0.5,
+        "Irrigation_Used": rng.random(n) < 0.5,
+    })
+    reference = CatBoostRegressor()
+    reference.load_model(cbm_path)
+    expected = reference.predict(frame)
+    actual = load_model(npz_path).predict(frame)
+    return float(np.max(np.abs(actual - expected)))
+
+
+def verify_shap(npz_path=NPZ_PATH, cbm_path=CBM_PATH, n=20_000, seed=0):
+    """Largest |difference| from CatBoost's ShapValues (expected value included) on random inputs."""
+    from catboost import CatBoostRegressor
+
+    rng = np.random.default_rng(seed)
+    encoder = FeatureEncoder(n)
+    encoder.fill(list(zip(
+        rng.choice(SOIL_TYPES + ["Unseen soil"], n).tolist(),
+        rng.choice(CROPS + ["Unseen crop"], n).tolist(),
+        rng.uniform(50, 1200, n).tolist(),
+        rng.uniform(10, 45, n).tolist(),
+        (rng.random(n) < 0.5).tolist(),
+        (rng.random(n) < 0.5).tolist(),
+    )))
+    numbers, categories = encoder.arrays()
+    reference = CatBoostRegressor()
+    reference.load_model(cbm_path)
+    expected = reference.get_feature_importance(catboost_pool(numbers, categories), type="ShapValues")
+    model = load_model(npz_path)
+    worst = np.max(np.abs(model.explain_arrays(numbers, categories) - expected[:, :-1]))
+    return float(max(worst, np.max(np.abs(model.shap_base - expected[:, -1]))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or check the NumPy yield model.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--cbm", default=CBM_PATH)
+    parser.add_argument("--npz", default=NPZ_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_model(args.cbm, args.npz)
+        print(f"Wrote {args.npz} ({os.path.getsize(args.npz)} bytes)", file=sys.stderr)
+    else:
+        worst = verify(args.npz, args.cbm)
+        print(f"Max |prediction difference| vs CatBoostRegressor: {worst:.3g}", file=sys.stderr)
+        worst = verify_shap(args.npz, args.cbm)
+        print(f"Max |SHAP value difference| vs CatBoostRegressor: {worst:.3g}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Yield response surfaces: predicted yield over a rainfall x temperature
+grid for every soil type and crop, with and without fertilizer and
+irrigation.
+
+The grid is never built in memory. It is numbered point by point and cut
+into blocks; each worker process loads the model once, decodes the
+coordinates of its blocks from their point numbers, scores a whole block
+with one model call and writes the predictions straight into the output.
+
+Output directory:
+    yield.npy   float32 predictions (t/ha), a memory-mapped array of shape
+                (soil, crop, fertilizer, irrigation, rainfall, temperature)
+    axes.json   the values along each of those axes, plus the model used
+
+    python yield_sweep.py sweep_dir --rainfall 100 1000 10 --temperature 15 40 0.5 --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+
+import numpy as np
+
+import yield_model
+from perf_utils import peak_rss_mb
+
+AXES = ("Soil_Type", "Crop", "Fertilizer_Used", "Irrigation_Used", "Rainfall_mm", "Temperature_Celsius")
+DEFAULT_RAINFALL = (100.0, 1000.0, 10.0)
+DEFAULT_TEMPERATURE = (15.0, 40.0, 0.5)
+DEFAULT_BLOCK_SIZE = 65_536
+PREDICTIONS_FILE = "yield.npy"
+AXES_FILE = "axes.json"
+
+HAS_CATBOOST = find_spec("catboost") is not None
+
+
+def axis_range(start, stop, step):
+    """start, start + step, ... up to and including stop."""
+    if step <= 0 or stop < start:
+        raise ValueError("Expected start <= stop and step > 0.")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    # Rounded so 0.1-style steps give the values a user would type
+    return np.round(start + step * np.arange(count), 10)
+
+
+def grid_axes(rainfall=DEFAULT_RAINFALL, temperature=DEFAULT_TEMPERATURE,
+              soils=yield_model.SOIL_TYPES, crops=yield_model.CROPS):
+    """Axis values in AXES order; rainfall and temperature are (start, stop, step)."""
+    return {
+        "Soil_Type": list(soils),
+        "Crop": list(crops),
+        "Fertilizer_Used": [False, True],
+        "Irrigation_Used": [False, True],
+        "Rainfall_mm": axis_range(*rainfall).tolist(),
+        "Temperature_Celsius": axis_range(*temperature).tolist(),
+    }
+
+
+def grid_shape(axes):
+    return tuple(len(axes[name]) for name in AXES)
+
+
+def grid_block(axes, start, stop):
+    """Model inputs (FeatureEncoder layout) for grid points start..stop-1."""
+    index = np.unravel_index(np.arange(start, stop), grid_shape(axes))
+    categories = np.empty((stop - start, 2), dtype=object)
+    categories[:, 0] = np.array(axes["Soil_Type"], dtype=object)[index[0]]
+    categories[:, 1] = np.array(axes["Crop"], dtype=object)[index[1]]
+    numbers = np.empty((stop - start, 4), dtype=np.float32)
+    numbers[:, 0] = np.asarray(axes["Rainfall_mm"])[index[4]]
+    numbers[:, 1] = np.asarray(axes["Temperature_Celsius"])[index[5]]
+    numbers[:, 2] = index[2]  # False, True
+    numbers[:, 3] = index[3]
+    return numbers, categories
+
+
+def default_model_path():
+    """
+    yield_model.cbm when catboost is installed (several times faster on
+    large blocks), otherwise the NumPy export.
+    """
+    return yield_model.CBM_PATH if HAS_CATBOOST else yield_model.NPZ_PATH
+
+
+def load_model(model_path):
+    """A NumPy export (.npz) or a CatBoost model file."""
+    if model_path.endswith(".npz"):
+        return yield_model.load_model(model_path)
+    from catboost import CatBoostRegressor
+
+    model = CatBoostRegressor()
+    model.load_model(model_path)
+    return model
+
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, axes, predictions_path, thread_count):
+    _worker["model"] = load_model(model_path)
+    _worker["threads"] = thread_count
+    _worker["axes"] = axes
+    _worker["out"] = np.load(predictions_path, mmap_mode="r+").reshape(-1)
+
+
+def _score_block(start, stop):
+    numbers, categories = grid_block(_worker["axes"], start, stop)
+    model = _worker["model"]
+    _worker["out"][start:stop] = yield_model.predict_arrays(model, numbers, categories, _worker["threads"])
+    return stop - start
+
+
+def _blocks(points, block_size):
+    for start in range(0, points, block_size):
+        yield start, min(start + block_size, points)
+
+
+def sweep(out_dir, axes, model_path=None, workers=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Score the whole grid into out_dir; returns (points, seconds)."""
+    workers = workers or os.cpu_count() or 1
+    model_path = model_path or default_model_path()
+    os.makedirs(out_dir, exist_ok=True)
+    predictions_path = os.path.join(out_dir, PREDICTIONS_FILE)
+    shape = grid_shape(axes)
+    points = int(np.prod(shape))
+    np.lib.format.open_memmap(predictions_path, mode="w+", dtype=np.float32, shape=shape).flush()
+    with open(os.path.join(out_dir, AXES_FILE), "w") as f:
+        json.dump({"axes": list(AXES), "values": axes, "model": os.path.basename(model_path)}, f, indent=1)
+
+    start = time.perf_counter()
+    # One CatBoost thread per process when the pool provides the parallelism
+    init_args = (model_path, axes, predictions_path, -1 if workers == 1 else 1)
+    if workers == 1:
+        _init_worker(*init_args)
+        for block in _blocks(points, block_size):
+            _score_block(*block)
+        _worker.clear()
+        return points, time.perf_counter() - start
+
+    # Keep a bounded number of blocks in flight
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        pending = []
+        for block in _blocks(points, block_size):
+            pending.append(pool.submit(_score_block, *block))
+            if len(pending) >= max_pending:
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+    return points, time.perf_counter() - start
+
+
+def load_sweep(out_dir):
+    """(predictions memmap, axes dict) of a finished sweep."""
+    with open(os.path.join(out_dir, AXES_FILE)) as f:
+        meta = json.load(f)
+    return np.load(os.path.join(out_dir, PREDICTIONS_FILE), mmap_mode="r"), meta["values"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yield response surfaces over rainfall x temperature.")
+    parser.add_argument("out_dir", help="directory for yield.npy and axes.json")
+    parser.add_argument("--rainfall", type=float, nargs=3, default=DEFAULT_RAINFALL,
+                        metavar=("START", "STOP", "STEP"), help="rainfall axis in mm")
+    parser.add_argument("--temperature", type=float, nargs=3, default=DEFAULT_TEMPERATURE,
+                        metavar=("START", "STOP", "STEP"), help="temperature axis in degrees Celsius")
+    parser.add_argument("--soil", action="append", help="soil type (repeatable; default: all)")
+    parser.add_argument("--crop", action="append", help="crop (repeatable; default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="grid points per model call")
+    parser.add_argument("--model", help="yield_model.npz or a CatBoost .cbm file "
+                                        "(default: yield_model.cbm if catboost is installed)")
+    args = parser.parse_args(argv)
+
+    axes = grid_axes(
+        args.rainfall, args.temperature,
+        args.soil or yield_model.SOIL_TYPES, args.crop or yield_model.CROPS,
+    )
+    model_path = args.model or default_model_path()
+    points, seconds = sweep(args.out_dir, axes, model_path, args.workers, args.block_size)
+
+    rate = points / seconds if seconds > 0 else float("inf")
+    shape = " x ".join(str(n) for n in grid_shape(axes))
+    print(f"Scored {points:,} grid points ({shape}) in {seconds:.2f} s ({rate:,.0f} points/s) with {os.path.basename(model_path)}", file=sys.stderr)
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS (main process): {peak:.1f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()